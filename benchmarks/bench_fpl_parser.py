@@ -0,0 +1,43 @@
+"""Compare the .fpl parser with the configparser based loader
+
+usage: python -m benchmarks.bench_fpl_parser [flight plan files...]
+"""
+
+import glob
+import sys
+import timeit
+
+from rich import print
+
+from condor.flight_plan import load_flight_plan, load_flight_plan_configparser
+from condor.fpl_parser import read_flight_plan_header
+
+LOADERS = {
+    "configparser": load_flight_plan_configparser,
+    "fpl parser": load_flight_plan,
+    "fpl parser (trusted)": lambda filepath: load_flight_plan(filepath, trusted=True),
+    "fpl parser (header only)": read_flight_plan_header,
+}
+
+
+def bench(filepaths: list[str], number: int = 200) -> dict[str, float]:
+    """Mean time (seconds) to load one file, for each loader"""
+    results: dict[str, float] = {}
+    for name, loader in LOADERS.items():
+        timer = timeit.Timer(lambda loader=loader: [loader(filepath) for filepath in filepaths])
+        results[name] = min(timer.repeat(repeat=5, number=number)) / number / len(filepaths)
+
+    return results
+
+
+def main():
+    filepaths = sys.argv[1:] or sorted(glob.glob("tests/files/*.fpl"))
+    results = bench(filepaths)
+
+    reference = results["configparser"]
+    for name, duration in results.items():
+        print(f"{name:25s} [blue]{duration * 1e6:8.1f} µs[/blue] per file  x{reference / duration:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Memory used by the flight plans library, on a synthetic corpus (see benchmarks.corpus)
+
+Compares the summaries kept by the catalog with the baseline: the full flight plans of list_flight_plans, the eager
+loading the catalog replaced.
+
+usage: python -m benchmarks.bench_memory [--files 20000] [--turnpoints 2 100]
+"""
+
+import argparse
+import gc
+import os
+import tempfile
+import tracemalloc
+from collections.abc import Callable
+
+from rich import print
+
+from benchmarks.corpus import generate_flight_plans
+from benchmarks.suite import write_benchmark_config
+from condor.config import CONFIG_FILENAME_ENV
+
+
+def measure_memory(func: Callable[[], object]) -> tuple[object, int]:
+    """Result of func, and the memory (bytes) still allocated for it once it returns"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func()
+        gc.collect()
+        allocated, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return result, allocated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=20000)
+    parser.add_argument("--turnpoints", type=int, nargs=2, default=(2, 100), metavar=("MIN", "MAX"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--catalog-only", action="store_true", help="skip list_flight_plans (slow)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        flight_plans_path = os.path.join(directory, "FlightPlans")
+        landscapes = {"Synthetic0": (4096, 4096), "Synthetic1": (8192, 8192)}
+        generate_flight_plans(flight_plans_path, args.files, landscapes, tuple(args.turnpoints), args.seed)
+        os.environ[CONFIG_FILENAME_ENV] = write_benchmark_config(directory, flight_plans_path)
+
+        # imported once the config points to the synthetic corpus
+        from condor.catalog import FlightPlanCatalog
+        from condor.flight_plan import list_flight_plans
+
+        flight_plans_bytes = 0
+        if not args.catalog_only:
+            flight_plans, flight_plans_bytes = measure_memory(list_flight_plans)
+            del flight_plans
+
+        index_path = os.path.join(directory, "catalog.json")
+        FlightPlanCatalog(flight_plans_path, index_path).refresh()
+
+        def load_catalog() -> FlightPlanCatalog:
+            catalog = FlightPlanCatalog(flight_plans_path, index_path)
+            catalog.load()
+            return catalog
+
+        catalog, catalog_bytes = measure_memory(load_catalog)
+        entries = len(catalog.entries)
+
+    print(f"{args.files} flight plans, {args.turnpoints[0]} to {args.turnpoints[1]} turn points")
+    if flight_plans_bytes:
+        print(f"baseline: list_flight_plans [blue]{flight_plans_bytes / 2**20:8.1f} MiB[/blue]")
+    print(f"catalog ({entries} entries) [blue]{catalog_bytes / 2**20:8.1f} MiB[/blue]")
+    print(f"catalog per entry   [blue]{catalog_bytes / max(entries, 1):8.0f} bytes[/blue]")
+
+
+if __name__ == "__main__":
+    main()
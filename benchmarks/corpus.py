@@ -0,0 +1,126 @@
+"""Synthetic flight plans and landscapes, laid out like a Condor installation
+
+    <condor_path>/Landscapes/<landscape>/<landscape>.bmp
+    <flight_plans_path>/<task>.fpl
+
+Flight plans have every section Condor writes (weather, plane, game options, ...), their turnpoints are spread on the
+landscape with legs of a few kilometers to a few tens of kilometers. Generation is seeded, the same arguments always
+produce the same corpus.
+
+usage: python -m benchmarks.corpus <condor_path> <flight_plans_path> [--files 1000] [--turnpoints 2 100]
+"""
+
+import argparse
+import os
+import random
+from math import cos, sin, tau
+
+from PIL import Image
+from rich import print
+
+LANDSCAPE_PIXEL_METERS = 90  # see services.flight_plan_service.transpose_map_xy
+TURNPOINT_NAMES = ["Ajdovscina", "Nanos Tv Stolp", "Lesce", "Bovec", "Kobarid", "Tolmin", "Idrija", "Postojna"]
+
+
+def generate_flight_plan(rng: random.Random, landscape: str, landscape_size: tuple[int, int], turnpoints: int) -> str:
+    width = landscape_size[0] * LANDSCAPE_PIXEL_METERS
+    height = landscape_size[1] * LANDSCAPE_PIXEL_METERS
+    margin = min(width, height) / 10
+
+    x, y = rng.uniform(margin, width - margin), rng.uniform(margin, height - margin)
+    lines = ["[Version]", "Condor version=3000", "", "[Task]", f"Landscape={landscape}", f"Count={turnpoints}"]
+    for index in range(turnpoints):
+        if index > 0:
+            heading, leg = rng.uniform(0, tau), rng.uniform(5_000, 40_000)
+            x = min(max(x + leg * cos(heading), margin), width - margin)
+            y = min(max(y + leg * sin(heading), margin), height - margin)
+
+        name = "NewTP" if rng.random() < 0.2 else f"{rng.choice(TURNPOINT_NAMES)} {index}"
+        lines += [
+            f"TPName{index}={name}",
+            f"TPPosX{index}={x}",
+            f"TPPosY{index}={y}",
+            f"TPPosZ{index}={rng.randint(100, 2000)}",
+            f"TPAirport{index}={int(index in (0, turnpoints - 1))}",
+            f"TPSectorType{index}=0",
+            f"TPSectorDirection{index}=0",
+            f"TPRadius{index}={rng.choice((500, 1000, 3000))}",
+            f"TPAngle{index}={rng.choice((90, 180))}",
+            f"TPAltitude{index}=1500",
+            f"TPWidth{index}=0",
+            f"TPHeight{index}=10000",
+            f"TPAzimuth{index}=0",
+        ]
+
+    lines += ["PZCount=0", f"DisabledAirspaces={','.join(str(i) for i in range(8, 356, 3))}", ""]
+    lines += ["[Weather]", "RandomizeWeatherOnEachFlight=0", "WZCount=1", "", "[WeatherZone0]", "Name=Base"]
+    lines += [f"WindDir={rng.uniform(0, 360)}", f"WindSpeed={rng.uniform(0, 20)}", "ThermalsStrength=3", ""]
+    lines += ["[Plane]", "Class=15-meter", "Name=AS33Es-15", "Skin=Default", "Water=0", ""]
+    lines += [
+        "[GameOptions]",
+        f"TaskDate={rng.randint(45000, 46000)}",
+        "StartTime=13",
+        f"RandSeed={rng.getrandbits(30)}",
+    ]
+    lines += ["", "[Description]", f"Text={turnpoints} turnpoints synthetic task on {landscape}", ""]
+
+    return "\n".join(lines)
+
+
+def generate_flight_plans(
+    flight_plans_path: str,
+    files: int,
+    landscapes: dict[str, tuple[int, int]],
+    turnpoints: tuple[int, int] = (2, 100),
+    seed: int = 0,
+) -> list[str]:
+    """Write `files` flight plans (with turnpoints[0] to turnpoints[1] turnpoints), return their filenames"""
+    rng = random.Random(seed)
+    os.makedirs(flight_plans_path, exist_ok=True)
+
+    filenames = []
+    for index in range(files):
+        landscape = rng.choice(sorted(landscapes))
+        content = generate_flight_plan(rng, landscape, landscapes[landscape], rng.randint(*turnpoints))
+        filename = f"synthetic-{index:05d}.fpl"
+        with open(os.path.join(flight_plans_path, filename), "wt", encoding="utf-8") as file:
+            file.write(content)
+        filenames.append(filename)
+
+    return filenames
+
+
+def generate_landscape(condor_path: str, landscape: str, size: tuple[int, int], seed: int = 0) -> str:
+    """Write a 24 bits landscape bitmap (smooth noise, like terrain) and return its path"""
+    landscape_path = os.path.join(condor_path, "Landscapes", landscape)
+    os.makedirs(landscape_path, exist_ok=True)
+    filepath = os.path.join(landscape_path, f"{landscape}.bmp")
+
+    rng = random.Random(seed)
+    noise = Image.frombytes("RGB", (64, 64), rng.randbytes(64 * 64 * 3))
+    noise.resize(size, Image.Resampling.BILINEAR).save(filepath, format="BMP")
+
+    return filepath
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("condor_path")
+    parser.add_argument("flight_plans_path")
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--turnpoints", type=int, nargs=2, default=(2, 100), metavar=("MIN", "MAX"))
+    parser.add_argument("--landscapes", type=int, default=2)
+    parser.add_argument("--landscape-size", type=int, default=4096, help="landscape bitmap width and height (pixels)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    landscapes = {f"Synthetic{index}": (args.landscape_size, args.landscape_size) for index in range(args.landscapes)}
+    for index, (landscape, size) in enumerate(landscapes.items()):
+        print(f"landscape [blue]{generate_landscape(args.condor_path, landscape, size, seed=args.seed + index)}[/blue]")
+
+    generate_flight_plans(args.flight_plans_path, args.files, landscapes, tuple(args.turnpoints), seed=args.seed)
+    print(f"[blue]{args.files}[/blue] flight plans written to [blue]{args.flight_plans_path}[/blue]")
+
+
+if __name__ == "__main__":
+    main()
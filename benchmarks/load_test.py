@@ -0,0 +1,160 @@
+"""Load test of the slash commands against the simulated condor server
+
+Hundreds of concurrent /status and /list invocations run through the command handlers, with a fake discord
+interaction, while the simulated server goes through its timeline. Discord itself (network, rate limits) is not
+simulated: the measured latency is the bot's own.
+
+usage: python -m benchmarks.load_test [--invocations 500] [--concurrency 200] [--status-latency-ms 50]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from types import SimpleNamespace
+
+import yaml
+from rich import print
+
+from condor.config import CONFIG_FILENAME_ENV
+
+
+class FakeResponse:
+    def __init__(self, interaction: "FakeInteraction"):
+        self.interaction = interaction
+        self.done = False
+
+    def is_done(self) -> bool:
+        return self.done
+
+    async def defer(self, **kwargs) -> None:
+        self.done = True
+
+    async def send_message(self, content: str, **kwargs) -> None:
+        self.done = True
+        self.interaction.messages.append(content)
+
+
+class FakeFollowup:
+    def __init__(self, interaction: "FakeInteraction"):
+        self.interaction = interaction
+
+    async def send(self, content: str, **kwargs) -> None:
+        self.interaction.messages.append(content)
+
+
+class FakeInteraction:
+    def __init__(self):
+        self.messages: list[str] = []
+        self.user = SimpleNamespace(display_name="load test")
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+
+def write_load_test_config(directory: str, args: argparse.Namespace) -> str:
+    config = {
+        "discord": {"api_token": "load-test", "admin_channel_id": 0},
+        "condor_server": {"server_name": "load test"},
+        "flight_plans_path": os.path.abspath(args.flight_plans_path),
+        "condor_path": directory,
+        "cache_path": os.path.join(directory, "cache"),
+        "status": {"poll_interval": 1.0, "max_age_ms": args.max_age_ms},
+        "server_backend": "simulated",
+        "simulated_server": {
+            "status_latency_ms": args.status_latency_ms,
+            "start_latency_ms": 10,
+            "stop_latency_ms": 10,
+            "latency_jitter_ms": args.status_latency_ms / 2,
+            "startup_delay": 0.5,
+            "join_duration": 1.0,
+            "race_duration": 5.0,
+            "player_interval": 0.1,
+            "seed": 0,
+        },
+    }
+    filename = os.path.join(directory, "config.yaml")
+    with open(filename, "wt") as file:
+        yaml.safe_dump(config, file)
+
+    return filename
+
+
+def percentile(durations: list[float], ratio: float) -> float:
+    return durations[min(int(len(durations) * ratio), len(durations) - 1)]
+
+
+async def run_load(invocations: int, concurrency: int, flight_plan_filename: str) -> dict[str, list[float]]:
+    # imported once the config points to the simulated server
+    from condor.server_manager import get_backend
+    from services.agent import on_list_flight_plans, on_status
+    from services.flight_plan_list import ListQuery
+    from services.lifecycle import get_lifecycle
+    from services.status_service import get_status_service
+
+    await get_lifecycle().start(flight_plan_filename, "load test")
+    get_status_service().start()
+
+    async def on_list(interaction: FakeInteraction) -> None:
+        await on_list_flight_plans(interaction, ListQuery())
+
+    handlers = {"status": on_status, "list": on_list}
+    durations: dict[str, list[float]] = {name: [] for name in handlers}
+    slots = asyncio.Semaphore(concurrency)
+
+    async def invoke(name: str) -> None:
+        async with slots:
+            interaction = FakeInteraction()
+            started = time.perf_counter()
+            await handlers[name](interaction)
+            durations[name].append(time.perf_counter() - started)
+            if not interaction.messages:
+                raise RuntimeError(f"/{name} sent no response")
+
+    # 4 status for 1 list, status is the command players use while waiting for the race
+    names = ["list" if index % 5 == 4 else "status" for index in range(invocations)]
+    await asyncio.gather(*[invoke(name) for name in names])
+
+    await get_status_service().stop()
+    print(f"[yellow]simulated server calls[/yellow]: {get_backend().calls}")
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--invocations", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--status-latency-ms", type=float, default=50)
+    parser.add_argument("--max-age-ms", type=int, default=2000)
+    parser.add_argument("--flight-plans-path", default="tests/files")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ[CONFIG_FILENAME_ENV] = write_load_test_config(directory, args)
+        flight_plans = sorted(name for name in os.listdir(args.flight_plans_path) if name.endswith(".fpl"))
+
+        started = time.perf_counter()
+        durations = asyncio.run(run_load(args.invocations, args.concurrency, flight_plans[0]))
+        elapsed = time.perf_counter() - started
+
+        from services.workers import shutdown_workers
+
+        shutdown_workers()
+
+    print(
+        f"{args.invocations} invocations in {elapsed:.2f} s: [blue]{args.invocations / elapsed:.0f}[/blue] commands/s"
+    )
+    for name, command_durations in durations.items():
+        command_durations.sort()
+        print(
+            f"/{name:7s} {len(command_durations):5d} calls"
+            f" mean [blue]{statistics.mean(command_durations) * 1000:6.1f}[/blue]"
+            f" p50 [blue]{percentile(command_durations, 0.50) * 1000:6.1f}[/blue]"
+            f" p95 [blue]{percentile(command_durations, 0.95) * 1000:6.1f}[/blue]"
+            f" p99 [blue]{percentile(command_durations, 0.99) * 1000:6.1f}[/blue] ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
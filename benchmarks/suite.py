@@ -0,0 +1,184 @@
+"""Benchmark suite, on a synthetic corpus (see benchmarks.corpus)
+
+Results are written to benchmarks/results/<release version>.json (machine specific, not committed), and compared
+with the results of another release with --compare. Functions the bot doesn't use anymore are kept as baselines.
+
+usage: python -m benchmarks.suite [--files 1000] [--turnpoints 2 100] [--compare 0.2.0]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import timeit
+from collections.abc import Callable
+
+import yaml
+from rich import print
+
+from benchmarks.corpus import generate_flight_plans, generate_landscape
+from condor import release
+from condor.config import CONFIG_FILENAME_ENV
+
+RESULTS_PATH = os.path.join(os.path.dirname(__file__), "results")
+STATUS_LIST_BOX_ITEMS = ["Status: joining enabled", "Time: 10:07:49", "Stop join in: 00:01:59"]
+
+
+def write_benchmark_config(directory: str, flight_plans_path: str) -> str:
+    config = {
+        "discord": {"api_token": "benchmark", "admin_channel_id": 0},
+        "condor_server": {"server_name": "benchmark"},
+        "flight_plans_path": flight_plans_path,
+        "condor_path": directory,
+        "cache_path": os.path.join(directory, "cache"),
+    }
+    filename = os.path.join(directory, "config.yaml")
+    with open(filename, "wt") as file:
+        yaml.safe_dump(config, file)
+
+    return filename
+
+
+def measure(func: Callable[[], object], items: int = 1, repeat: int = 5, min_time: float = 0.2) -> dict:
+    """Time of one call of func (divided by the items it processes), best and mean of `repeat` runs"""
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        duration = timer.timeit(number)
+        if duration >= min_time or number >= 1000:
+            break
+        number *= 10 if duration < min_time / 10 else 2
+
+    durations = [duration, *timer.repeat(repeat=max(repeat - 1, 0), number=number)]
+    per_item = [duration / number / items for duration in durations]
+
+    return {"best": min(per_item), "mean": sum(per_item) / len(per_item), "number": number, "items": items}
+
+
+def run_suite(filenames: list[str], sample_size: int = 100, seed: int = 0) -> dict[str, dict]:
+    # imported once the config points to the synthetic corpus
+    from condor.catalog import get_catalog, list_flight_plan_summaries
+    from condor.flight_plan import flight_plan_to_markdown, get_flight_plan_path, list_flight_plans, load_flight_plan
+    from condor.server_manager import ServerStatus, parse_server_status_list_box_items, save_host_ini
+    from services.flight_plan_service import get_image_of_flight_plan
+
+    sample = random.Random(seed).sample(filenames, min(sample_size, len(filenames)))
+    filepaths = [get_flight_plan_path(filename) for filename in sample]
+    flight_plans = [load_flight_plan(filepath) for filepath in filepaths]
+    preview_sample = flight_plans[:10]
+    get_catalog().refresh()
+
+    benchmarks: dict[str, tuple[Callable[[], object], int]] = {
+        "load_flight_plan": (lambda: [load_flight_plan(filepath) for filepath in filepaths], len(filepaths)),
+        "list_flight_plan_summaries": (list_flight_plan_summaries, 1),
+        "baseline: list_flight_plans": (list_flight_plans, 1),  # eager loading replaced by the catalog
+        "FlightPlan.distance": (lambda: [flight_plan.distance for flight_plan in flight_plans], len(flight_plans)),
+        "flight_plan_to_markdown": (lambda: [flight_plan_to_markdown(fp) for fp in flight_plans], len(flight_plans)),
+        "get_image_of_flight_plan": (
+            lambda: [get_image_of_flight_plan(flight_plan) for flight_plan in preview_sample],
+            len(preview_sample),
+        ),
+        "get_image_of_flight_plan(max_size=512)": (
+            lambda: [get_image_of_flight_plan(flight_plan, max_size=512) for flight_plan in preview_sample],
+            len(preview_sample),
+        ),
+        "parse_server_status_list_box_items": (
+            lambda: parse_server_status_list_box_items(ServerStatus(), STATUS_LIST_BOX_ITEMS),
+            1,
+        ),
+        "save_host_ini": (save_host_ini, 1),
+    }
+
+    # landscape tiles are built once, not measured
+    for flight_plan in preview_sample:
+        get_image_of_flight_plan(flight_plan, max_size=512)
+
+    results = {}
+    for name, (func, items) in benchmarks.items():
+        results[name] = measure(func, items=items, repeat=3 if items == 1 else 5)
+        print(f"{name:40s} [blue]{format_duration(results[name]['best'])}[/blue]")
+
+    return results
+
+
+def format_duration(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:8.1f} µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:8.1f} ms"
+    return f"{seconds:8.2f} s "
+
+
+def compare(results: dict, reference: dict) -> None:
+    print(f"\ncompared with [blue]{reference['version']}[/blue] ({reference['date']})")
+    if reference["corpus"] != results["corpus"]:
+        print("[yellow]the corpus is different, results are not comparable[/yellow]")
+
+    for name, result in results["results"].items():
+        if name not in reference["results"]:
+            continue
+        ratio = result["best"] / reference["results"][name]["best"]
+        color = "red" if ratio > 1.1 else "green" if ratio < 0.9 else "white"
+        print(f"{name:40s} [{color}]x{ratio:.2f}[/{color}]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--turnpoints", type=int, nargs=2, default=(2, 100), metavar=("MIN", "MAX"))
+    parser.add_argument("--landscapes", type=int, default=2)
+    parser.add_argument("--landscape-size", type=int, default=4096)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<version>.json)")
+    parser.add_argument("--compare", help="release version (or results file) to compare with")
+    args = parser.parse_args()
+
+    corpus = {
+        "files": args.files,
+        "turnpoints": list(args.turnpoints),
+        "landscapes": args.landscapes,
+        "landscape_size": args.landscape_size,
+        "seed": args.seed,
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        flight_plans_path = os.path.join(directory, "FlightPlans")
+        os.makedirs(os.path.join(directory, "Settings"))
+        landscapes = {
+            f"Synthetic{index}": (args.landscape_size, args.landscape_size) for index in range(args.landscapes)
+        }
+        for index, (landscape, size) in enumerate(landscapes.items()):
+            generate_landscape(directory, landscape, size, seed=args.seed + index)
+        filenames = generate_flight_plans(flight_plans_path, args.files, landscapes, tuple(args.turnpoints), args.seed)
+        print(f"corpus: [blue]{args.files}[/blue] flight plans, [blue]{args.landscapes}[/blue] landscapes\n")
+
+        os.environ[CONFIG_FILENAME_ENV] = write_benchmark_config(directory, flight_plans_path)
+        results = {
+            "version": release.version,
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "corpus": corpus,
+            "results": run_suite(filenames, seed=args.seed),
+        }
+
+    output = args.output or os.path.join(RESULTS_PATH, f"{release.version}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "wt", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+    print(f"\nresults written to [blue]{output}[/blue]")
+
+    if args.compare:
+        reference_path = args.compare
+        if not os.path.isfile(reference_path):
+            reference_path = os.path.join(RESULTS_PATH, f"{args.compare}.json")
+        with open(reference_path, "rt", encoding="utf-8") as file:
+            compare(results, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,181 @@
+import os
+import time
+from dataclasses import replace
+from io import BytesIO
 import typer
+from PIL import Image
+from rich import print
+from condor.catalog import get_catalog, list_flight_plan_summaries
+from condor.config import get_config
 from condor.flight_plan import get_flight_plan_path, load_flight_plan
+from condor.flight_plan_store import get_flight_plan_store
 from services.flight_plan_service import get_image_of_flight_plan
+from services.library_service import LibraryReport, import_library, run_library_job, validate_library
+from services.preview_cache import get_preview_cache
+from services.preview_encoding import PREVIEW_FORMATS, EncodeOptions, encode_preview
 
 app = typer.Typer(no_args_is_help=True)
 
+DEFAULT_WORKERS = os.cpu_count() or 1
+
 
 @app.command()
-def preview(flightplan: str):
+def preview(
+    flightplan: str,
+    max_size: int | None = typer.Option(None, help="maximum preview size in pixels (0 for full resolution)"),
+    max_width: int | None = typer.Option(None, help="preview downscaled to this width (0 for no limit)"),
+    max_height: int | None = typer.Option(None, help="preview downscaled to this height (0 for no limit)"),
+    max_bytes: int | None = typer.Option(None, help="encoded preview budget in bytes (0 for no budget)"),
+    formats: str | None = typer.Option(None, help=f"formats tried in this order: {','.join(PREVIEW_FORMATS)}"),
+    quality: int | None = typer.Option(None, help="first quality of the webp and jpeg formats"),
+    output: str | None = typer.Option(None, help="save the encoded preview in this file, instead of displaying it"),
+):
+    """Render and encode a flight plan preview like the bot, with the preview settings of config.yaml or these ones"""
+    config = get_config().preview
     fp = load_flight_plan(get_flight_plan_path(flightplan))
 
-    image = get_image_of_flight_plan(fp)
-    image.show()
+    if max_size is None:
+        max_size = config.max_size
+    overrides = {"max_width": max_width, "max_height": max_height, "max_bytes": max_bytes, "quality": quality}
+    if formats is not None:
+        overrides["formats"] = tuple(fmt.strip() for fmt in formats.split(","))
+    options = replace(
+        EncodeOptions.from_config(config), **{key: value for key, value in overrides.items() if value is not None}
+    )
+
+    started = time.perf_counter()
+    image = get_image_of_flight_plan(fp, max_size=max_size)
+    print(
+        f"[yellow]rendered[/yellow]: {image.size[0]}x{image.size[1]} in {(time.perf_counter() - started) * 1000:.0f} ms"
+    )
+    encoded = encode_preview(image, options)
+    print(f"[yellow]encoded[/yellow]: {encoded.describe()}")
+
+    if output:
+        with open(output, "wb") as file:
+            file.write(encoded.data)
+    else:
+        Image.open(BytesIO(encoded.data)).show()
+
+
+@app.command()
+def preview_cache():
+    """Display the rendered previews cache usage"""
+    stats = get_preview_cache().stats()
+
+    print(f"[yellow]hits[/yellow]: {stats.hits} [yellow]misses[/yellow]: {stats.misses} ({stats.hit_ratio:.0%})")
+    print(f"[yellow]memory[/yellow]: {stats.memory_entries} previews, {stats.memory_bytes}/{stats.memory_budget} bytes")
+    print(f"[yellow]disk[/yellow]: {stats.disk_entries} previews, {stats.disk_bytes}/{stats.disk_budget} bytes")
+
+
+@app.command()
+def stats(
+    sort: str = typer.Option("filename", help="sort key: filename, landscape, distance, turnpoints_count, longest_leg"),
+    reverse: bool = False,
+    limit: int = 20,
+):
+    """Display the flight plans library statistics, and its flight plans sorted"""
+    summaries = list_flight_plan_summaries()
+    catalog_stats = get_catalog().stats()
+
+    print(f"[yellow]flight plans[/yellow]: {catalog_stats.flight_plans}")
+    print(
+        f"[yellow]distance[/yellow]: mean {catalog_stats.mean_distance / 1000:.0f} km,"
+        f" min {catalog_stats.min_distance / 1000:.0f} km, max {catalog_stats.max_distance / 1000:.0f} km"
+    )
+    print(f"[yellow]turn points[/yellow]: mean {catalog_stats.mean_turnpoints:.1f}")
+    print(f"[yellow]longest leg[/yellow]: {catalog_stats.longest_leg / 1000:.0f} km")
+    for landscape, count in sorted(catalog_stats.landscapes.items(), key=lambda item: -item[1]):
+        print(f"  - [blue]{landscape}[/blue]: {count}")
+
+    if summaries:
+        print()
+        for summary in get_catalog().list(sort=sort, reverse=reverse)[:limit]:
+            print(
+                f"{summary.filename} [blue]{summary.landscape}[/blue] {summary.distance / 1000:.0f} km,"
+                f" {summary.turnpoints_count} turn points"
+            )
+
+
+def print_library_report(report: LibraryReport, report_path: str | None) -> None:
+    print(
+        f"[yellow]files[/yellow]: {report.files}, [green]{report.valid} valid[/green],"
+        f" [red]{report.invalid} invalid[/red], {report.missing_landscape} with a missing landscape"
+    )
+    if report.imported:
+        print(f"[yellow]imported[/yellow]: {report.imported} ({report.duplicates} with the content of another name)")
+    if report_path:
+        print(f"[yellow]report[/yellow]: [blue]{report_path}[/blue]")
+    print(f"{report.files} files in {report.duration:.2f} s: [blue]{report.files_per_second:.0f}[/blue] files/s")
+
+
+@app.command()
+def validate(
+    directory: str,
+    report: str | None = typer.Option(None, help="JSON lines report, one line per flight plan"),
+    workers: int = typer.Option(DEFAULT_WORKERS, help="parsing processes, 0 to parse in this process"),
+    catalog: bool = typer.Option(False, help="index the bot library in the catalog afterwards"),
+):
+    """Check the flight plans of a directory tree (syntax, landscape installed)"""
+    library_report = run_library_job(validate_library(directory, workers=workers), report_path=report)
+    print_library_report(library_report, report)
+
+    if catalog:
+        get_catalog().refresh()
+        print(f"[yellow]catalog[/yellow]: {len(get_catalog().entries)} flight plans indexed")
+
+
+@app.command(name="import")
+def import_(
+    directory: str,
+    report: str | None = typer.Option(None, help="JSON lines report, one line per flight plan"),
+    workers: int = typer.Option(DEFAULT_WORKERS, help="parsing processes, 0 to parse in this process"),
+    overwrite: bool = typer.Option(False, help="replace the flight plans already in the library"),
+    require_landscape: bool = typer.Option(True, help="skip the flight plans of landscapes not installed"),
+    catalog: bool = typer.Option(True, help="index the imported flight plans in the catalog"),
+):
+    """Copy the valid flight plans of a directory tree in the bot library"""
+    results = import_library(
+        directory,
+        get_config().flight_plans_path,
+        workers=workers,
+        overwrite=overwrite,
+        require_landscape=require_landscape,
+        store_path=get_config().flight_plans_store_path,
+    )
+    library_report = run_library_job(results, report_path=report)
+    print_library_report(library_report, report)
+
+    if catalog:
+        get_catalog().refresh()
+        print(f"[yellow]catalog[/yellow]: {len(get_catalog().entries)} flight plans indexed")
+
+
+@app.command()
+def store(prune: bool = typer.Option(True, help="remove the stored contents no flight plan uses anymore")):
+    """Move the flight plans of the library to the content-addressed store, display their duplicates"""
+    catalog = get_catalog()
+    flight_plan_store = get_flight_plan_store()
+    catalog.refresh()
+
+    for filename in list(catalog.entries):
+        try:
+            flight_plan_store.adopt(filename)
+        except OSError as exc:
+            print(f"[yellow]flight plan [blue]{filename}[/blue] couldn't be stored: {exc}[/yellow]")
+    catalog.refresh()  # linked files have a new mtime, their summaries are reused by hash
+
+    duplicates = [aliases for aliases in catalog.filenames_by_hash.values() if len(aliases) > 1]
+    for aliases in sorted(sorted(aliases) for aliases in duplicates):
+        print(f"[yellow]same content[/yellow]: {', '.join(aliases)}")
+
+    print(
+        f"[yellow]flight plans[/yellow]: {len(catalog.entries)} names, {len(catalog.filenames_by_hash)} contents"
+        f" ({len(duplicates)} with several names)"
+    )
+    if prune:
+        removed = flight_plan_store.prune(set(catalog.filenames_by_hash))
+        print(f"[yellow]pruned[/yellow]: {removed} contents no flight plan uses")
+
+    blobs = list(flight_plan_store.blobs())
+    print(f"[yellow]store[/yellow]: {len(blobs)} contents, {sum(size for _, size in blobs)} bytes")
@@ -0,0 +1,261 @@
+"""CondorDedicated.exe control through UI automation (windows only)
+
+Each server instance is tracked by the PID of the process the bot started (saved in the cache directory, so the
+bot finds its servers again after a restart). A server started outside the bot is found by its executable path,
+only when no other instance uses the same condor installation.
+"""
+
+import json
+import os
+
+import psutil
+from pywinauto import Application, handleprops
+from pywinauto.application import ProcessNotFoundError, WindowSpecification
+from rich import print
+
+from condor.config import CondorServerConfig, LifecycleConfig, get_config
+from condor.flight_plan import get_server_flight_plans_list_path, save_flight_plans_list
+from condor.server_manager import (
+    CONDOR_DEDICATED_EXE,
+    CONDOR_DEDICATED_WINDOW_TITLE_PREFIX,
+    LifecycleStep,
+    OnlineStatus,
+    ServerBackend,
+    ServerStatus,
+    parse_players_list_box_items,
+    parse_server_status_list_box_items,
+    save_host_ini,
+)
+
+# SERVER_NAME_LIST_ID = 0
+SERVER_STATUS_LIST_ID = 1
+# SERVER_FPL_LIST_ID = 2
+SERVER_PLAYERS_LIST_ID = 3
+
+
+class ServerProcess:
+    """Connected CondorDedicated.exe, with its window and list boxes handles.
+
+    Handles are discovered once, then only checked (process identity and window handles still valid) before each
+    use: reading the status costs a couple of list boxes reads instead of a full windows enumeration.
+    """
+
+    def __init__(self, app: Application, window: WindowSpecification):
+        self.app = app
+        self.window = window
+        self.pid: int = app.process
+        self.create_time: float = psutil.Process(self.pid).create_time()
+        self.version = "unknown"
+        self.status_list_box = None
+        self.players_list_box = None
+
+        window_title: str = window.window_text()
+        if window_title.startswith(CONDOR_DEDICATED_WINDOW_TITLE_PREFIX):
+            self.version = window_title[len(CONDOR_DEDICATED_WINDOW_TITLE_PREFIX) + 1 :].strip()
+
+        self.resolve_list_boxes()
+
+    def resolve_list_boxes(self) -> None:
+        # a better way than searching all listbox, and matching the top position ?
+        list_boxes = self.window.descendants(class_name="TspListBox")
+        self.status_list_box = list_boxes[SERVER_STATUS_LIST_ID] if len(list_boxes) > SERVER_STATUS_LIST_ID else None
+        self.players_list_box = list_boxes[SERVER_PLAYERS_LIST_ID] if len(list_boxes) > SERVER_PLAYERS_LIST_ID else None
+
+        if not self.status_list_box:
+            raise Exception("server status list not found in condor server window")
+
+    def is_alive(self) -> bool:
+        """Same process (not restarted) and window handles still valid"""
+        try:
+            if psutil.Process(self.pid).create_time() != self.create_time:
+                return False
+        except psutil.NoSuchProcess:
+            return False
+
+        handles = [self.window.handle, self.status_list_box.handle]
+        if self.players_list_box:
+            handles.append(self.players_list_box.handle)
+
+        return all(handleprops.iswindow(handle) for handle in handles)
+
+
+def connect_process(pid: int | None = None, path: str | None = None) -> ServerProcess | None:
+    """Connect to the server process by PID, or by executable path"""
+    if pid is not None:
+        app = Application().connect(process=pid, timeout=0.2)
+    else:
+        app = Application().connect(path=path, timeout=0.2)
+
+    main_window = None
+    for window in app.windows():
+        if window.friendly_class_name() == "TDedicatedForm":
+            main_window = window
+            break
+
+    if not main_window:
+        return None
+
+    return ServerProcess(app=app, window=window)
+
+
+def read_server_status(process: ServerProcess) -> ServerStatus:
+    status = ServerStatus(online_status=OnlineStatus.NOT_RUNNING, version=process.version)
+
+    parse_server_status_list_box_items(status, process.status_list_box.item_texts())
+    if process.players_list_box:
+        parse_players_list_box_items(status, process.players_list_box.item_texts())
+
+    return status
+
+
+class PywinautoBackend(ServerBackend):
+    def __init__(self, server: CondorServerConfig, condor_path: str, cache_path: str):
+        self.server = server
+        self.condor_path = condor_path
+        self.exe_path = f"{condor_path}\\{CONDOR_DEDICATED_EXE}"
+        self.pid_path = os.path.join(cache_path, "servers", f"{server.name}.pid")
+        # last connected process, reused while it's alive
+        self.process: ServerProcess | None = None
+
+    def read_pid(self) -> tuple[int, float] | None:
+        """PID and creation time of the process started by the bot, if it's still running"""
+        try:
+            with open(self.pid_path, "rt") as file:
+                tracked = json.load(file)
+            if psutil.Process(tracked["pid"]).create_time() == tracked["create_time"]:
+                return tracked["pid"], tracked["create_time"]
+        except (OSError, ValueError, KeyError, psutil.NoSuchProcess):
+            pass
+
+        return None
+
+    def write_pid(self, pid: int) -> None:
+        os.makedirs(os.path.dirname(self.pid_path), exist_ok=True)
+        with open(self.pid_path, "wt") as file:
+            json.dump({"pid": pid, "create_time": psutil.Process(pid).create_time()}, file)
+
+    def remove_pid(self) -> None:
+        if os.path.exists(self.pid_path):
+            os.remove(self.pid_path)
+
+    def shares_installation(self) -> bool:
+        config = get_config()
+        return any(
+            config.get_condor_path(server) == self.condor_path
+            for server in config.condor_servers
+            if server.name != self.server.name
+        )
+
+    def get_process(self) -> ServerProcess | None:
+        if self.process and self.process.is_alive():
+            return self.process
+
+        tracked = self.read_pid()
+        if tracked:
+            self.process = connect_process(pid=tracked[0])
+        elif not self.shares_installation():
+            self.process = connect_process(path=self.exe_path)
+        else:
+            # another instance runs the same executable, only the tracked process is this server
+            raise ProcessNotFoundError()
+
+        return self.process
+
+    def is_running(self) -> bool:
+        if self.read_pid():
+            return True
+        if self.shares_installation():
+            return False
+
+        exe_path = os.path.normcase(os.path.abspath(self.exe_path))
+        return any(
+            process.info["exe"] and os.path.normcase(process.info["exe"]) == exe_path
+            for process in psutil.process_iter(["exe"])
+        )
+
+    def forget_process(self) -> None:
+        """The server process is stopped or restarted, next status call will discover it again"""
+        self.process = None
+
+    def get_status(self) -> tuple[ServerStatus, ServerProcess | None]:
+        try:
+            process = self.get_process()
+        except ProcessNotFoundError:
+            self.forget_process()
+            return ServerStatus(online_status=OnlineStatus.OFFLINE), None
+
+        if not process:
+            raise Exception("condor server window not found")
+
+        try:
+            return read_server_status(process), process
+        except Exception:  # noqa: BLE001 - UI automation errors of any kind (COM, stale handles)
+            # a handle went stale between the check and the read, discover the window again
+            self.forget_process()
+            process = self.get_process()
+            return read_server_status(process), process
+
+    def start_steps(self, flight_plan_filename: str, config: LifecycleConfig) -> list[LifecycleStep]:
+        app: Application | None = None
+        window: WindowSpecification | None = None
+
+        def write_configuration(timeout: float) -> None:
+            host_ini_path = save_host_ini(self.server)
+            print(f"[blue]{host_ini_path}[/blue] [yellow]saved[/yellow]")
+            flight_plans_list_path = get_server_flight_plans_list_path(self.condor_path, self.server.name)
+            save_flight_plans_list(flight_plans=[flight_plan_filename], list_path=flight_plans_list_path)
+            print(f"flight plans list [blue]{flight_plans_list_path}[/blue] [yellow]saved[/yellow]")
+
+        def launch(timeout: float) -> None:
+            nonlocal app
+            # started in the condor installation, without changing the bot working directory (process wide)
+            app = Application().start(cmd_line=self.exe_path, work_dir=self.condor_path, timeout=timeout)
+            self.write_pid(app.process)
+            self.forget_process()
+
+        def wait_window(timeout: float) -> None:
+            nonlocal window
+            window = app.window(title_re="Condor dedicated server.*", class_name="TDedicatedForm")
+            window.wait("ready", timeout=timeout)
+
+        def click_start(timeout: float) -> None:
+            start_button = window.child_window(title="START", class_name="TspSkinButton")
+            start_button.wait("enabled", timeout=timeout)
+            start_button.click()
+
+        # Host.ini is read at launch: instances sharing a condor installation are started one at a time
+        host_ini = f"host_ini:{os.path.normcase(os.path.abspath(self.condor_path))}"
+        return [
+            LifecycleStep("writing configuration", write_configuration, config.action_timeout, host_ini),
+            LifecycleStep("launching", launch, config.launch_timeout, host_ini),
+            LifecycleStep("window ready", wait_window, config.launch_timeout, host_ini),
+            LifecycleStep("START clicked", click_start, config.action_timeout, host_ini),
+        ]
+
+    def stop_steps(self, process: ServerProcess, config: LifecycleConfig) -> list[LifecycleStep]:
+        running = False
+
+        def click_stop(timeout: float) -> None:
+            nonlocal running
+            stop_button = process.app.window(title="STOP", class_name="TspSkinButton")
+            running = stop_button.exists()
+            if running:
+                stop_button.click()
+                ok_button = process.app.window(title="Confirm").child_window(title="OK", class_name="TspSkinButton")
+                ok_button.wait("enabled", timeout=timeout)
+                ok_button.click()
+
+        def wait_stopped(timeout: float) -> None:
+            if running:
+                process.window.child_window(title="START", class_name="TspSkinButton").wait("visible", timeout=timeout)
+
+        def close(timeout: float) -> None:
+            process.app.kill()
+            self.remove_pid()
+            self.forget_process()
+
+        return [
+            LifecycleStep("STOP clicked", click_stop, config.action_timeout),
+            LifecycleStep("server stopped", wait_stopped, config.stop_timeout),
+            LifecycleStep("process closed", close, config.action_timeout),
+        ]
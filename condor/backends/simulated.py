@@ -0,0 +1,121 @@
+"""Simulated condor dedicated server, to run the bot (and load tests) without windows and Condor
+
+The server follows a scripted timeline from its start: NOT_RUNNING while starting, JOINING_ENABLED while players
+join, RACE_IN_PROGRESS while they leave one by one, then JOINING_DISABLED. Every call waits for a configurable
+latency, like the UI automation calls it replaces.
+"""
+
+import random
+import threading
+import time
+from collections.abc import Callable
+
+from condor.config import LifecycleConfig, SimulatedServerConfig
+from condor.server_manager import LifecycleStep, OnlineStatus, ServerBackend, ServerStatus
+
+SIMULATED_VERSION = "simulated"
+
+
+def format_duration(seconds: float) -> str:
+    seconds = max(int(seconds), 0)
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class SimulatedBackend(ServerBackend):
+    def __init__(
+        self,
+        config: SimulatedServerConfig,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.config = config
+        self.clock = clock
+        self.sleep = sleep
+        self.random = random.Random(config.seed)
+        self.started_at: float | None = None
+        self.flight_plan_filename: str | None = None
+        self.calls = 0
+
+        self._state_lock = threading.Lock()
+        self._call_lock = threading.Lock() if config.serialize_calls else None
+
+    def _wait(self, latency_ms: float) -> None:
+        with self._state_lock:
+            self.calls += 1
+            jitter_ms = self.random.uniform(0, self.config.latency_jitter_ms) if self.config.latency_jitter_ms else 0
+
+        delay = (latency_ms + jitter_ms) / 1000
+        if delay <= 0:
+            return
+
+        if self._call_lock:
+            with self._call_lock:
+                self.sleep(delay)
+        else:
+            self.sleep(delay)
+
+    def status_at(self, elapsed: float) -> ServerStatus:
+        """Status of the server `elapsed` seconds after its start"""
+        config = self.config
+        status = ServerStatus(version=SIMULATED_VERSION, online_status=OnlineStatus.NOT_RUNNING)
+        if elapsed < config.startup_delay:
+            return status
+
+        joining_elapsed = elapsed - config.startup_delay
+        joined = min(int(joining_elapsed // config.player_interval) + 1, config.max_players)
+        status.time = format_duration(joining_elapsed)
+
+        if joining_elapsed < config.join_duration:
+            status.online_status = OnlineStatus.JOINING_ENABLED
+            status.stop_join_in = format_duration(config.join_duration - joining_elapsed)
+            players = joined
+        else:
+            joined = min(int(config.join_duration // config.player_interval) + 1, config.max_players)
+            race_elapsed = joining_elapsed - config.join_duration
+            left = int(race_elapsed // config.player_interval)
+            players = max(joined - left, 0)
+            if race_elapsed < config.race_duration:
+                status.online_status = OnlineStatus.RACE_IN_PROGRESS
+            else:
+                status.online_status = OnlineStatus.JOINING_DISABLED
+
+        status.players = [f"Player {index + 1}" for index in range(players)]
+        return status
+
+    def get_status(self) -> tuple[ServerStatus, "SimulatedBackend | None"]:
+        self._wait(self.config.status_latency_ms)
+
+        with self._state_lock:
+            started_at = self.started_at
+
+        if started_at is None:
+            return ServerStatus(online_status=OnlineStatus.OFFLINE), None
+
+        return self.status_at(self.clock() - started_at), self
+
+    def is_running(self) -> bool:
+        with self._state_lock:
+            return self.started_at is not None
+
+    def start_steps(self, flight_plan_filename: str, config: LifecycleConfig) -> list[LifecycleStep]:
+        return [LifecycleStep("launching", lambda timeout: self.start(flight_plan_filename), config.launch_timeout)]
+
+    def stop_steps(self, process: "SimulatedBackend", config: LifecycleConfig) -> list[LifecycleStep]:
+        return [LifecycleStep("stopping", lambda timeout: self.stop(process), config.stop_timeout)]
+
+    def start(self, flight_plan_filename: str) -> bool:
+        """Start of the simulated timeline, the server is launched at once"""
+        self._wait(self.config.start_latency_ms)
+
+        with self._state_lock:
+            self.started_at = self.clock()
+            self.flight_plan_filename = flight_plan_filename
+
+        return True
+
+    def stop(self, process: "SimulatedBackend") -> None:
+        self._wait(self.config.stop_latency_ms)
+
+        with self._state_lock:
+            self.started_at = None
+            self.flight_plan_filename = None
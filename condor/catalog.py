@@ -0,0 +1,413 @@
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+from dataclasses import asdict, dataclass, replace
+from functools import cache
+
+import numpy as np
+from pydantic import BaseModel
+from rich import print
+
+from condor.config import get_config
+from condor.fpl_parser import FlightPlanHeader, decode_fpl, parse_flight_plan_header
+from condor.geometry import BatchGeometry, compute_batch_geometry
+from condor.metrics import CATALOG_SECONDS, measure
+from condor.search_index import SearchIndex
+
+logger = logging.getLogger("catalog")
+
+CATALOG_INDEX_FILENAME = "catalog.json"
+CATALOG_INDEX_VERSION = 3
+CATALOG_SORT_KEYS = ("filename", "landscape", "distance", "turnpoints_count", "longest_leg")
+
+
+@dataclass(slots=True, frozen=True)
+class FlightPlanSummary:
+    """What the bot needs to know about a flight plan without parsing it again.
+
+    The catalog keeps one summary per flight plan in memory, so it's a slotted dataclass (about 3 times smaller than
+    a pydantic model) and landscape names are interned. The full FlightPlan is loaded on demand.
+    """
+
+    filename: str
+    size: int
+    mtime_ns: int
+    sha256: str
+    version: str | None = None
+    landscape: str | None = None
+    distance: float = 0.0
+    turnpoints_count: int = 0
+    longest_leg: float = 0.0
+    bbox: tuple[float, float, float, float] = (0.0, 0.0, 0.0, 0.0)  # min x, min y, max x, max y
+    turnpoint_names: tuple[str, ...] = ()
+
+    def __post_init__(self) -> None:
+        # a few landscapes, versions and turnpoints shared by thousands of flight plans
+        if self.landscape is not None:
+            object.__setattr__(self, "landscape", sys.intern(self.landscape))
+        if self.version is not None:
+            object.__setattr__(self, "version", sys.intern(self.version))
+        object.__setattr__(self, "turnpoint_names", tuple(sys.intern(name) for name in self.turnpoint_names))
+
+    @classmethod
+    def from_dict(cls, raw: dict) -> "FlightPlanSummary":
+        return cls(**{**raw, "bbox": tuple(raw.get("bbox", (0.0, 0.0, 0.0, 0.0)))})
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @property
+    def human_filename(self) -> str:
+        return self.filename[: -len(".fpl")]
+
+
+def hash_file(filepath: str) -> str:
+    with open(filepath, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def summarize_flight_plan(
+    header: FlightPlanHeader, filename: str, stat: os.stat_result, sha256: str, geometry: BatchGeometry, index: int
+) -> FlightPlanSummary:
+    """Summary of a flight plan, its metrics are the index-th of a batch geometry"""
+    return FlightPlanSummary(
+        filename=filename,
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+        sha256=sha256,
+        version=header.version,
+        landscape=header.landscape,
+        distance=float(geometry.total[index]),
+        turnpoints_count=header.turnpoints_count,
+        turnpoint_names=tuple(header.turnpoint_names),
+        longest_leg=float(geometry.longest_leg[index]),
+        bbox=(
+            float(geometry.min_x[index]),
+            float(geometry.min_y[index]),
+            float(geometry.max_x[index]),
+            float(geometry.max_y[index]),
+        ),
+    )
+
+
+@dataclass(frozen=True)
+class CatalogColumns:
+    """The catalog as one array per field, for statistics and sorting of the whole library"""
+
+    filename: np.ndarray
+    landscape: np.ndarray
+    distance: np.ndarray
+    turnpoints_count: np.ndarray
+    longest_leg: np.ndarray
+
+    @classmethod
+    def from_summaries(cls, summaries: list[FlightPlanSummary]) -> "CatalogColumns":
+        count = len(summaries)
+        return cls(
+            filename=np.array([summary.filename.lower() for summary in summaries], dtype=str),
+            landscape=np.array([(summary.landscape or "").lower() for summary in summaries], dtype=str),
+            distance=np.fromiter((summary.distance for summary in summaries), dtype=np.float64, count=count),
+            turnpoints_count=np.fromiter((summary.turnpoints_count for summary in summaries), np.int64, count=count),
+            longest_leg=np.fromiter((summary.longest_leg for summary in summaries), dtype=np.float64, count=count),
+        )
+
+    def order(self, sort: str = "filename", reverse: bool = False) -> np.ndarray:
+        """Indexes of the summaries sorted by a column (then by filename)"""
+        if sort not in CATALOG_SORT_KEYS:
+            raise ValueError(f"unknown sort key {sort}, expected one of {', '.join(CATALOG_SORT_KEYS)}")
+
+        # lexsort sorts by the last key first, filenames are unique so the order is total
+        order = np.lexsort((self.filename, getattr(self, sort)))
+        return order[::-1] if reverse else order
+
+
+class CatalogStats(BaseModel):
+    flight_plans: int = 0
+    total_distance: float = 0.0
+    mean_distance: float = 0.0
+    min_distance: float = 0.0
+    max_distance: float = 0.0
+    mean_turnpoints: float = 0.0
+    longest_leg: float = 0.0
+    landscapes: dict[str, int] = {}
+
+
+class FlightPlanCatalog:
+    """Persistent index of the flight plans library.
+
+    Entries are keyed by filename and revalidated with (size, mtime), then with the content hash: only new content is
+    parsed, a renamed, copied or re-uploaded flight plan reuses the summary of its hash. The catalog can be used from
+    several threads.
+    """
+
+    def __init__(self, flight_plans_path: str, index_path: str):
+        self.flight_plans_path = flight_plans_path
+        self.index_path = index_path
+        self.entries: dict[str, FlightPlanSummary] = {}
+        self.filenames_by_hash: dict[str, set[str]] = {}  # aliases of each content
+        self.search_index = SearchIndex()  # updated with the entries
+        self.rejected: dict[str, tuple[int, int]] = {}  # invalid files => (size, mtime), not parsed again
+        self.generation = 0  # incremented on every change of the entries, invalidates what is built from them
+        self._columns: tuple[list[FlightPlanSummary], CatalogColumns] | None = None  # built on demand
+        self._lock = threading.RLock()
+
+    def load(self) -> None:
+        """Load the index from disk, an unreadable or outdated index is just ignored"""
+        self._clear_entries()
+        if not os.path.isfile(self.index_path):
+            return
+
+        try:
+            with open(self.index_path, "rt", encoding="utf-8") as file:
+                raw_index = json.load(file)
+        except (OSError, ValueError) as exc:
+            logger.warning(f"catalog index {self.index_path} ignored: {exc}")
+            return
+
+        if raw_index.get("version") != CATALOG_INDEX_VERSION:
+            return
+        if raw_index.get("flight_plans_path") != self.flight_plans_path:
+            return
+
+        try:
+            for raw_entry in raw_index.get("entries", []):
+                entry = FlightPlanSummary.from_dict(raw_entry)
+                self._set_entry(entry.filename, entry)
+        except (TypeError, ValueError) as exc:
+            logger.warning(f"catalog index {self.index_path} ignored: {exc}")
+            self._clear_entries()
+
+    def _clear_entries(self) -> None:
+        self.entries = {}
+        self.filenames_by_hash = {}
+        self.search_index = SearchIndex()
+        self._columns = None
+        self.generation += 1
+
+    def _set_entry(self, filename: str, entry: FlightPlanSummary | None) -> None:
+        """Add, replace (or remove with None) an entry, and keep the search index and the columns in sync"""
+        previous = self.entries.get(filename)
+        if previous:
+            aliases = self.filenames_by_hash.get(previous.sha256, set())
+            aliases.discard(filename)
+            if not aliases:
+                self.filenames_by_hash.pop(previous.sha256, None)
+
+        if entry:
+            self.entries[filename] = entry
+            self.filenames_by_hash.setdefault(entry.sha256, set()).add(filename)
+            self.search_index.add(filename, entry.human_filename, entry.landscape or "", entry.turnpoint_names)
+        else:
+            self.entries.pop(filename, None)
+            self.search_index.remove(filename)
+        self._columns = None
+        self.generation += 1
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        raw_index = {
+            "version": CATALOG_INDEX_VERSION,
+            "flight_plans_path": self.flight_plans_path,
+            "entries": [entry.to_dict() for entry in self.entries.values()],
+        }
+
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "wt", encoding="utf-8") as file:
+            json.dump(raw_index, file)
+        os.replace(tmp_path, self.index_path)
+
+    def refresh(self) -> bool:
+        """Synchronize the index with the flight plans folder, return True if something changed"""
+        with self._lock, measure(CATALOG_SECONDS, "refresh"):
+            return self._refresh()
+
+    def _refresh(self) -> bool:
+        seen: set[str] = set()
+        modified: list[tuple[str, os.stat_result]] = []
+
+        with os.scandir(self.flight_plans_path) as it:
+            for dir_entry in it:
+                if not dir_entry.name.endswith(".fpl") or not dir_entry.is_file():
+                    continue
+                seen.add(dir_entry.name)
+
+                stat = dir_entry.stat()
+                entry = self.entries.get(dir_entry.name)
+                if entry and entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+                    continue
+                if self.rejected.get(dir_entry.name) == (stat.st_size, stat.st_mtime_ns):
+                    continue
+
+                modified.append((dir_entry.name, stat))
+
+        changed = bool(modified)
+        for filename, new_entry in self._index_files(modified).items():
+            self._set_entry(filename, new_entry)
+
+        for filename in set(self.entries) - seen:
+            self._set_entry(filename, None)
+            changed = True
+        for filename in set(self.rejected) - seen:
+            del self.rejected[filename]
+
+        if changed:
+            self.save()
+
+        return changed
+
+    def _index_files(self, files: list[tuple[str, os.stat_result]]) -> dict[str, FlightPlanSummary | None]:
+        """Summaries of the files (None for invalid ones), the geometry of all parsed files is computed at once"""
+        summaries: dict[str, FlightPlanSummary | None] = {}
+        parsed: list[tuple[str, os.stat_result, str, FlightPlanHeader]] = []
+
+        for filename, stat in files:
+            filepath = os.path.join(self.flight_plans_path, filename)
+            self.rejected.pop(filename, None)
+            try:
+                with open(filepath, "rb") as file:
+                    content = file.read()
+                sha256 = hashlib.sha256(content).hexdigest()
+
+                # same content (touched, copied, renamed or re-uploaded file), no need to parse it again
+                known = self.find_hash(sha256)
+                if known:
+                    summaries[filename] = replace(
+                        known, filename=filename, size=stat.st_size, mtime_ns=stat.st_mtime_ns
+                    )
+                    continue
+
+                header = parse_flight_plan_header(decode_fpl(content))
+                parsed.append((filename, stat, sha256, header))
+            except (OSError, ValueError):
+                print(f"[yellow] flight plan [blue]{filename}[/blue] couldn't be loaded[/yellow]")
+                self.rejected[filename] = (stat.st_size, stat.st_mtime_ns)
+                summaries[filename] = None
+
+        geometry = compute_batch_geometry([(header.pos_x, header.pos_y) for _, _, _, header in parsed])
+        for index, (filename, stat, sha256, header) in enumerate(parsed):
+            summaries[filename] = summarize_flight_plan(header, filename, stat, sha256, geometry, index)
+
+        return summaries
+
+    def update_files(self, filenames: list[str]) -> dict[str, FlightPlanSummary | None]:
+        """Index (or re-index) flight plans, ex: just after an upload, the index is saved once for all of them"""
+        files: list[tuple[str, os.stat_result]] = []
+        for filename in filenames:
+            filepath = os.path.join(self.flight_plans_path, filename)
+            if os.path.isfile(filepath):
+                files.append((filename, os.stat(filepath)))
+
+        with self._lock:
+            summaries = self._index_files(files)
+            entries = {filename: summaries.get(filename) for filename in filenames}  # None for removed files
+            for filename, entry in entries.items():
+                self._set_entry(filename, entry)
+            if entries:
+                self.save()
+
+        return entries
+
+    def update_file(self, filename: str) -> FlightPlanSummary | None:
+        """Index (or re-index) a single flight plan"""
+        return self.update_files([filename])[filename]
+
+    def remove_file(self, filename: str) -> None:
+        with self._lock:
+            if filename in self.entries:
+                self._set_entry(filename, None)
+                self.save()
+
+    def get(self, filename: str) -> FlightPlanSummary | None:
+        return self.entries.get(filename)
+
+    def find_hash(self, sha256: str) -> FlightPlanSummary | None:
+        """Summary of a content, under any of its names"""
+        with self._lock:
+            for filename in self.filenames_by_hash.get(sha256, ()):
+                return self.entries[filename]
+        return None
+
+    def aliases(self, sha256: str) -> list[str]:
+        """Names of a content in the library"""
+        with self._lock:
+            return sorted(self.filenames_by_hash.get(sha256, ()))
+
+    def content_hash(self, filename: str) -> str | None:
+        """Hash of a flight plan, from its entry while the file is unchanged (None if the file doesn't exist)"""
+        filepath = os.path.join(self.flight_plans_path, filename)
+        try:
+            stat = os.stat(filepath)
+        except FileNotFoundError:
+            return None
+
+        entry = self.entries.get(filename)
+        if entry and entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+            return entry.sha256
+        return hash_file(filepath)
+
+    def search(self, query: str, limit: int = 25) -> list[FlightPlanSummary]:
+        """Best flight plans for a query on their name, landscape and turnpoint names"""
+        entries = self.entries
+        return [entries[filename] for filename in self.search_index.search(query, limit) if filename in entries]
+
+    def _get_columns(self) -> tuple[list[FlightPlanSummary], CatalogColumns]:
+        with self._lock:
+            if self._columns is None:
+                summaries = list(self.entries.values())
+                self._columns = (summaries, CatalogColumns.from_summaries(summaries))
+
+            return self._columns
+
+    def list(self, sort: str = "filename", reverse: bool = False) -> list[FlightPlanSummary]:
+        summaries, columns = self._get_columns()
+        return [summaries[index] for index in columns.order(sort, reverse)]
+
+    def stats(self) -> CatalogStats:
+        summaries, columns = self._get_columns()
+        if not summaries:
+            return CatalogStats()
+
+        landscapes, counts = np.unique([summary.landscape or "" for summary in summaries], return_counts=True)
+        return CatalogStats(
+            flight_plans=len(summaries),
+            total_distance=float(columns.distance.sum()),
+            mean_distance=float(columns.distance.mean()),
+            min_distance=float(columns.distance.min()),
+            max_distance=float(columns.distance.max()),
+            mean_turnpoints=float(columns.turnpoints_count.mean()),
+            longest_leg=float(columns.longest_leg.max()),
+            landscapes={str(landscape): int(count) for landscape, count in zip(landscapes, counts, strict=True)},
+        )
+
+
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> FlightPlanCatalog:
+    """The catalog of the library, loaded from its index by the first call (which can be in a worker thread)"""
+    with _catalog_lock:
+        return _load_catalog()
+
+
+@cache
+def _load_catalog() -> FlightPlanCatalog:
+    config = get_config()
+    catalog = FlightPlanCatalog(
+        flight_plans_path=config.flight_plans_path,
+        index_path=os.path.join(config.cache_path, CATALOG_INDEX_FILENAME),
+    )
+    with measure(CATALOG_SECONDS, "load"):
+        catalog.load()
+
+    return catalog
+
+
+def list_flight_plan_summaries() -> list[FlightPlanSummary]:
+    """Up to date list of the flight plans available, only changed files are parsed"""
+    catalog = get_catalog()
+    catalog.refresh()
+
+    return catalog.list()
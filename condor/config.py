@@ -1,12 +1,15 @@
 import yaml
 import logging
 import os
-from pydantic import BaseModel
+from typing import Literal
+from pydantic import BaseModel, model_validator
 from functools import cache
 from rich import print
 
 logger = logging.getLogger("config")
 
+CONFIG_FILENAME_ENV = "CONDOR_BOT_CONFIG"
+
 
 class DiscordConfig(BaseModel):
     api_token: str
@@ -14,6 +17,8 @@ class DiscordConfig(BaseModel):
 
 
 class CondorServerConfig(BaseModel):
+    name: str = "default"  # instance name, in the commands server option
+    condor_path: str | None = None  # condor installation of this instance, default: condor_path
     server_name: str = "Default Server Name"
     port: int = 56278
     password: str | None = None
@@ -29,13 +34,145 @@ class CondorServerConfig(BaseModel):
     allow_clients_to_save_flight_plan: bool = True
 
 
+class PreviewConfig(BaseModel):
+    max_size: int = 1024  # flight plan previews larger than this (pixels) use a lower resolution landscape
+    max_width: int = 1024  # previews are downscaled to fit in max_width x max_height pixels (0: no limit)
+    max_height: int = 1024
+    max_bytes: int = 1024 * 1024  # encoded preview budget (0: no budget)
+    formats: list[Literal["png", "png8", "webp", "jpeg"]] = ["png", "png8", "webp", "jpeg"]  # first within max_bytes
+    quality: int = 85  # webp and jpeg, lowered to fit in max_bytes
+    tile_size: int = 512  # landscape pyramid tiles size (pixels)
+    memory_cache_bytes: int = 32 * 1024 * 1024  # rendered previews kept in memory
+    disk_cache_bytes: int = 512 * 1024 * 1024  # rendered previews kept on disk
+
+
+class WorkersConfig(BaseModel):
+    io_threads: int = 4  # catalog scans, flight plans loading, caches
+    render_processes: int = 0  # previews rendering processes, 0 to render in the I/O threads (see config.yaml.dist)
+    max_concurrent_renders: int = 4  # renders in progress (or waiting for a render process)
+
+
+class ServerLogConfig(BaseModel):
+    path: str = "Logs/DedicatedServer.log"  # relative to the condor installation of the server
+    encoding: str = "utf-8"
+    # events recognized in the log lines (regular expressions, case sensitive), player events capture the player name
+    # placeholders, not checked against a real CondorDedicated log: to be adjusted to the lines of your server
+    version: str = r"dedicated server version (?P<version>\S+)"
+    server_start: str = r"Server (?:started|is running)"
+    server_stop: str = r"Server (?:stopped|shut down)"
+    player_join: str = r"Player (?:joined|connected):? (?P<player>.+?)\s*$"
+    player_leave: str = r"Player (?:left|disconnected):? (?P<player>.+?)\s*$"
+    race_start: str = r"Race started"
+    race_end: str = r"Race (?:finished|ended)"
+
+
+class StatusConfig(BaseModel):
+    poll_interval: float = 5.0  # seconds between two server status readings
+    max_age_ms: int = 2000  # commands use the last status read if not older than this
+    source: Literal["ui", "log"] = "ui"  # server window (UI automation), or new lines of the server log
+    log: ServerLogConfig = ServerLogConfig()
+
+
+class LifecycleConfig(BaseModel):
+    conflicts: Literal["reject", "queue"] = "reject"  # a start or stop of a server already starting or stopping
+    max_queued: int = 2  # operations waiting for the server, with conflicts: queue
+    action_timeout: float = 10.0  # seconds: status read, configuration written, button clicked, process killed
+    launch_timeout: float = 30.0  # seconds: CondorDedicated.exe launched, its window ready
+    stop_timeout: float = 60.0  # seconds for the server to stop once STOP is confirmed
+    joinable_timeout: float = 120.0  # seconds from START clicked to joining enabled
+    joinable_poll_interval: float = 1.0  # seconds between two status reads while waiting for joining enabled
+
+
+class UploadConfig(BaseModel):
+    max_file_bytes: int = 1024 * 1024  # a single .fpl (uploaded or in an archive)
+    max_archive_bytes: int = 20 * 1024 * 1024  # a .zip attachment, and the total size of the files it contains
+    max_files: int = 500  # flight plans in one upload (message attachments and archives contents)
+    concurrent_downloads: int = 4  # attachments read at the same time
+
+
+class HistoryConfig(BaseModel):
+    enabled: bool = True  # servers sessions and players recorded, see /condor-stats
+    path: str = "history.sqlite3"  # in cache_path
+    flush_interval: float = 60.0  # seconds, finished sessions are written in batches
+    flush_sessions: int = 20  # finished sessions written at once, even before flush_interval
+
+
+class MetricsConfig(BaseModel):
+    enabled: bool = False  # latency histograms and counters, see /condor-metrics
+    http_host: str = "127.0.0.1"
+    http_port: int | None = None  # Prometheus endpoint http://<http_host>:<http_port>/metrics, none by default
+
+
+class ProfilingConfig(BaseModel):
+    interactions: int = 0  # slash commands profiled after the bot start, see also /condor-profile
+    mode: Literal["deterministic", "sampling"] = "deterministic"  # cProfile, or stacks of all threads sampled
+    sample_interval_ms: float = 5.0  # sampling mode
+    top: int = 30  # functions in the summaries
+    output_path: str = "profiles"  # profile dumps and summaries
+
+
+class SimulatedServerConfig(BaseModel):
+    status_latency_ms: float = 50  # reading the status through UI automation
+    start_latency_ms: float = 2000  # launching CondorDedicated.exe and clicking START
+    stop_latency_ms: float = 1000
+    latency_jitter_ms: float = 0  # random extra latency, up to this value
+    serialize_calls: bool = True  # UI automation handles one call at a time
+    startup_delay: float = 5.0  # seconds NOT_RUNNING after the start, before joining is enabled
+    join_duration: float = 60.0  # seconds of JOINING_ENABLED, then RACE_IN_PROGRESS
+    race_duration: float = 600.0  # seconds of RACE_IN_PROGRESS, then JOINING_DISABLED
+    player_interval: float = 5.0  # a player joins (while joining is enabled) or leaves (during the race) every ...
+    max_players: int = 8
+    seed: int | None = None  # latency jitter random seed
+
+
 class Config(BaseModel):
     discord: DiscordConfig
     command_prefix: str = "condor-"
 
-    condor_server: CondorServerConfig
+    condor_server: CondorServerConfig | None = None  # a single server, or the first one of condor_servers
+    condor_servers: list[CondorServerConfig] = []  # several instances, with different names and ports
     flight_plans_path: str
+    flight_plans_store_path: str = ".store"  # content-addressed flight plans, relative to flight_plans_path
     condor_path: str
+    cache_path: str = "cache"  # bot local data (catalog index, landscape tiles, ...)
+    preview: PreviewConfig = PreviewConfig()
+    workers: WorkersConfig = WorkersConfig()
+    status: StatusConfig = StatusConfig()
+    upload: UploadConfig = UploadConfig()
+    lifecycle: LifecycleConfig = LifecycleConfig()
+    history: HistoryConfig = HistoryConfig()
+    metrics: MetricsConfig = MetricsConfig()
+    profiling: ProfilingConfig = ProfilingConfig()
+    server_backend: Literal["pywinauto", "simulated"] = "pywinauto"  # simulated: no condor server, for tests
+    simulated_server: SimulatedServerConfig = SimulatedServerConfig()
+
+    @model_validator(mode="after")
+    def check_servers(self) -> "Config":
+        if self.condor_server and self.condor_servers:
+            raise ValueError("condor_server and condor_servers are exclusive, add the server to condor_servers")
+        if not self.condor_servers:
+            self.condor_servers = [self.condor_server or CondorServerConfig()]
+        self.condor_server = self.condor_servers[0]
+
+        names = [server.name for server in self.condor_servers]
+        if len(set(names)) != len(names):
+            raise ValueError(f"condor_servers names must be unique: {', '.join(names)}")
+
+        return self
+
+    def get_server(self, name: str | None = None) -> CondorServerConfig:
+        """Config of a server instance, the first one by default"""
+        if name is None:
+            return self.condor_servers[0]
+
+        for server in self.condor_servers:
+            if server.name == name:
+                return server
+
+        raise ValueError(f"unknown server {name}, expected one of {', '.join(s.name for s in self.condor_servers)}")
+
+    def get_condor_path(self, server: CondorServerConfig) -> str:
+        return server.condor_path or self.condor_path
 
 
 def load_config(filename: str) -> Config:
@@ -52,7 +189,7 @@ def load_config(filename: str) -> Config:
 
 @cache
 def get_config() -> Config:
-    return load_config(filename="config.yaml")
+    return load_config(filename=os.environ.get(CONFIG_FILENAME_ENV, "config.yaml"))
 
 
 def check_config(config: Config):
@@ -1,9 +1,10 @@
 import os
 import configparser
-from math import sqrt
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 from rich import print
 from condor.config import get_config
+from condor.geometry import TaskGeometry, compute_task_geometry
+from condor.fpl_parser import decode_fpl, parse_flight_plan_sections, read_flight_plan_sections
 
 BOT_FLIGHT_PLAN_LIST = "condor_bot.sfl"
 
@@ -29,16 +30,21 @@ class FlightPlan(BaseModel):
     description: str
     turnpoints: list[TurnPoint] = Field(default_factory=list)
 
+    _geometry: TaskGeometry | None = PrivateAttr(default=None)
+
     @property
-    def distance(self) -> float:
-        total_dist = 0
+    def geometry(self) -> TaskGeometry:
+        """Legs, bearings and distances, computed once (turnpoints are not expected to change once loaded)"""
+        if self._geometry is None:
+            self._geometry = compute_task_geometry(
+                [tp.pos_x for tp in self.turnpoints], [tp.pos_y for tp in self.turnpoints]
+            )
 
-        for i in range(1, len(self.turnpoints)):
-            point_from = self.turnpoints[i - 1]
-            point_to = self.turnpoints[i]
-            total_dist += sqrt((point_to.pos_x - point_from.pos_x) ** 2 + (point_to.pos_y - point_from.pos_y) ** 2)
+        return self._geometry
 
-        return total_dist
+    @property
+    def distance(self) -> float:
+        return self.geometry.total
 
     @property
     def filename(self) -> str:
@@ -49,12 +55,40 @@ class FlightPlan(BaseModel):
         return self.filename[: -len(".fpl")]
 
 
-def load_flight_plan(filepath: str) -> FlightPlan:
+def build_flight_plan(filepath: str, raw_flight_plan: dict, trusted: bool = False) -> FlightPlan:
+    """Build a FlightPlan from parsed fields, trusted input (already validated files) skips pydantic validation"""
+    if not trusted:
+        return FlightPlan.model_validate({"filepath": filepath, **raw_flight_plan})
+
+    return FlightPlan.model_construct(
+        filepath=filepath,
+        version=raw_flight_plan["version"],
+        landscape=raw_flight_plan["landscape"],
+        description=raw_flight_plan["description"],
+        turnpoints=[TurnPoint.model_construct(**tp) for tp in raw_flight_plan["turnpoints"]],
+    )
+
+
+def load_flight_plan(filepath: str, trusted: bool = False) -> FlightPlan:
+    if not os.path.isfile(filepath):
+        raise FileNotFoundError(filepath)
+
+    return build_flight_plan(filepath.split("/")[-1], read_flight_plan_sections(filepath), trusted=trusted)
+
+
+def parse_flight_plan(filename: str, content: bytes) -> FlightPlan:
+    """Validated flight plan from the content of a .fpl file (ex: an upload not written to disk yet)"""
+    return build_flight_plan(filename, parse_flight_plan_sections(decode_fpl(content)))
+
+
+def load_flight_plan_configparser(filepath: str) -> FlightPlan:
+    """Reference loader, based on configparser (slower, kept to check and benchmark the .fpl parser)"""
     if not os.path.isfile(filepath):
         raise FileNotFoundError(filepath)
 
     parser = configparser.ConfigParser()
-    parser.read(filepath, encoding="utf-8")
+    with open(filepath, "rb") as file:
+        parser.read_string("\n".join(decode_fpl(file.read())), source=filepath)
 
     turnpoints: list[TurnPoint] = []
 
@@ -91,8 +125,13 @@ def get_default_flight_plans_list_path() -> str:
     return f"{get_config().condor_path}\\{BOT_FLIGHT_PLAN_LIST}"
 
 
-def save_flight_plans_list(flight_plans: list[str]) -> None:
-    with open(get_default_flight_plans_list_path(), "wt") as file:
+def get_server_flight_plans_list_path(condor_path: str, server_name: str) -> str:
+    """Flight plans list of a server instance, instances don't share their lists"""
+    return f"{condor_path}\\{BOT_FLIGHT_PLAN_LIST.removesuffix('.sfl')}_{server_name}.sfl"
+
+
+def save_flight_plans_list(flight_plans: list[str], list_path: str | None = None) -> None:
+    with open(list_path or get_default_flight_plans_list_path(), "wt") as file:
         for flight_plan in flight_plans:
             print(f"writing {flight_plan} to list")
             file.write(f"{get_config().flight_plans_path}\\{flight_plan}\n")
@@ -109,7 +148,7 @@ def list_flight_plans() -> list[FlightPlan]:
     for filename in os.listdir(get_config().flight_plans_path):
         if filename.endswith(".fpl"):
             try:
-                fpl.append(load_flight_plan(get_config().flight_plans_path + "\\" + filename))
+                fpl.append(load_flight_plan(os.path.join(get_config().flight_plans_path, filename)))
             except Exception:
                 print(f"[yellow] flight plan [blue]{filename}[/blue] couldn't be loaded[/yellow]")
 
@@ -128,4 +167,4 @@ def flight_plan_to_markdown(flight_plan: FlightPlan) -> str:
 
 
 def get_landscape_image_filepath(landscape_name: str) -> str:
-    return f"{get_config().condor_path}\\Landscapes\\{landscape_name}\\{landscape_name}.bmp"
+    return os.path.join(get_config().condor_path, "Landscapes", landscape_name, f"{landscape_name}.bmp")
@@ -0,0 +1,146 @@
+"""Content-addressed storage of the flight plans library
+
+Each distinct flight plan content is stored once, as a blob named by its SHA-256 in the store directory (by default
+.store in flight_plans_path, <sha256[:2]>/<sha256>.fpl). The .fpl files of flight_plans_path, read by Condor and by the
+catalog, are aliases of the blobs: hard links to them, or copies when the file system can't link. An alias is written
+atomically (a temporary link renamed over the previous alias), so a re-upload under the same name just points the
+name to another blob.
+
+The catalog keeps the hash of each alias: content already in the library is detected before anything is written, and
+what is derived from a flight plan (summary, geometry, previews) is keyed by its hash, so renames and re-uploads are
+never processed again. Blobs without aliases are removed by prune.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import threading
+from collections.abc import Iterator
+from functools import cache
+
+from condor.config import get_config
+
+logger = logging.getLogger("flight_plan_store")
+
+BLOB_EXTENSION = ".fpl"
+
+
+def hash_content(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+class FlightPlanStore:
+    def __init__(self, flight_plans_path: str, store_path: str = ".store"):
+        self.flight_plans_path = flight_plans_path
+        self.store_path = os.path.join(flight_plans_path, store_path)  # an absolute store_path is kept as is
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.store_path, sha256[:2], f"{sha256}{BLOB_EXTENSION}")
+
+    def alias_path(self, filename: str) -> str:
+        return os.path.join(self.flight_plans_path, filename)
+
+    def _tmp_path(self, path: str) -> str:
+        directory, name = os.path.split(path)
+        return os.path.join(directory, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    def has_blob(self, sha256: str) -> bool:
+        """The blob exists and still has its content (an alias edited in place changes its blob)"""
+        try:
+            with open(self.blob_path(sha256), "rb") as file:
+                return hash_content(file.read()) == sha256
+        except FileNotFoundError:
+            return False
+
+    def put_blob(self, content: bytes, sha256: str | None = None) -> str:
+        """Store a content (once), return its hash"""
+        sha256 = sha256 or hash_content(content)
+        if self.has_blob(sha256):
+            return sha256
+
+        path = self.blob_path(sha256)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = self._tmp_path(path)
+        try:
+            with open(tmp_path, "wb") as file:
+                file.write(content)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return sha256
+
+    def is_linked(self, filename: str, sha256: str) -> bool:
+        """The alias is a hard link to the blob"""
+        try:
+            return os.path.samefile(self.alias_path(filename), self.blob_path(sha256))
+        except OSError:
+            return False
+
+    def link(self, filename: str, sha256: str) -> None:
+        """Point the alias to a stored blob, replacing its previous content"""
+        if self.is_linked(filename, sha256):
+            return  # renaming a link over another link of the same file does nothing (and keeps the temporary one)
+
+        tmp_path = self._tmp_path(self.alias_path(filename))
+        try:
+            try:
+                os.link(self.blob_path(sha256), tmp_path)
+            except OSError:
+                shutil.copyfile(self.blob_path(sha256), tmp_path)  # no hard links on this file system (or volume)
+            os.replace(tmp_path, self.alias_path(filename))
+        except OSError:
+            if os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def add(self, filename: str, content: bytes, sha256: str | None = None) -> str:
+        """Store a flight plan under a name, return its hash"""
+        sha256 = self.put_blob(content, sha256)
+        self.link(filename, sha256)
+        return sha256
+
+    def adopt(self, filename: str) -> str:
+        """Move a flight plan not stored yet (ex: copied in flight_plans_path by hand) to the store"""
+        with open(self.alias_path(filename), "rb") as file:
+            content = file.read()
+
+        sha256 = hash_content(content)
+        if not self.is_linked(filename, sha256) or not self.has_blob(sha256):
+            self.add(filename, content, sha256)
+
+        return sha256
+
+    def blobs(self) -> Iterator[tuple[str, int]]:
+        """Hash and size of the stored blobs"""
+        if not os.path.isdir(self.store_path):
+            return
+
+        for directory, _, filenames in os.walk(self.store_path):
+            for filename in filenames:
+                if filename.endswith(BLOB_EXTENSION) and not filename.startswith("."):
+                    yield filename[: -len(BLOB_EXTENSION)], os.path.getsize(os.path.join(directory, filename))
+
+    def remove_blob(self, sha256: str) -> None:
+        try:
+            os.remove(self.blob_path(sha256))
+        except FileNotFoundError:
+            pass
+
+    def prune(self, referenced: set[str]) -> int:
+        """Remove the blobs of no alias, return how many were removed"""
+        orphans = [sha256 for sha256, _ in self.blobs() if sha256 not in referenced]
+        for sha256 in orphans:
+            self.remove_blob(sha256)
+            logger.debug(f"blob {sha256} removed, no flight plan uses it")
+
+        return len(orphans)
+
+
+@cache
+def get_flight_plan_store() -> FlightPlanStore:
+    config = get_config()
+    return FlightPlanStore(config.flight_plans_path, config.flight_plans_store_path)
@@ -0,0 +1,190 @@
+"""Single pass reader for Condor flight plans (.fpl)
+
+A .fpl file is an ini file, but the bot only needs a few sections of it (most of the file is weather zones and game
+options). Lines are tokenized once, only the interesting sections are kept, and the summary mode stops reading as soon
+as the task geometry is known.
+
+Keys are case insensitive and values are stripped, like with configparser, so results are the same as the
+configparser based loader. Only the kept sections are checked for syntax errors.
+
+Files are UTF-8, but tasks edited with windows tools are often cp1252: text that isn't valid UTF-8 is read as cp1252.
+"""
+
+from collections.abc import Iterable
+
+from pydantic import BaseModel, Field
+
+from condor.geometry import compute_task_geometry
+
+FPL_SECTIONS = ("Version", "Task", "Description", "Plane")
+FPL_ENCODING = "utf-8"
+FPL_FALLBACK_ENCODING = "cp1252"  # windows western europe, bytes it doesn't define are replaced
+
+
+class FlightPlanParseError(ValueError):
+    pass
+
+
+class FlightPlanHeader(BaseModel):
+    """Flight plan fields needed to list it, without turn points details"""
+
+    version: str | None = None
+    landscape: str | None = None
+    turnpoints_count: int = 0
+    turnpoint_names: list[str] = Field(default_factory=list)
+    pos_x: list[float] = Field(default_factory=list)
+    pos_y: list[float] = Field(default_factory=list)
+
+    @property
+    def distance(self) -> float:
+        return compute_task_geometry(self.pos_x, self.pos_y).total
+
+
+def _summary_complete(task: dict[str, str]) -> bool:
+    if "landscape" not in task or "count" not in task:
+        return False
+
+    last_tp = int(task["count"]) - 1
+    return last_tp < 0 or (f"tpposx{last_tp}" in task and f"tpposy{last_tp}" in task)
+
+
+def tokenize_fpl(
+    lines: Iterable[str], sections: tuple[str, ...] = FPL_SECTIONS, summary_only: bool = False
+) -> dict[str, dict[str, str]]:
+    """Read the wanted sections of a .fpl, as {section: {lowercase key: value}}"""
+    result: dict[str, dict[str, str]] = {}
+    seen_sections: set[str] = set()
+    current: dict[str, str] | None = None
+    in_file_section = False
+    last_key: str | None = None
+
+    for line_number, line in enumerate(lines, start=1):
+        stripped = line.strip()
+        if not stripped or stripped[0] in "#;":
+            continue
+
+        if stripped[0] == "[" and stripped[-1] == "]":
+            name = stripped[1:-1]
+            if name in seen_sections:
+                raise FlightPlanParseError(f"line {line_number}: section [{name}] already exists")
+            seen_sections.add(name)
+
+            in_file_section = True
+            last_key = None
+            if name in sections:
+                current = result[name] = {}
+            else:
+                current = None
+            continue
+
+        if not in_file_section:
+            raise FlightPlanParseError(f"line {line_number}: file contains no section headers")
+
+        if current is None:
+            continue
+
+        if line[0] in " \t" and last_key is not None:
+            # continuation of a multiline value
+            current[last_key] = f"{current[last_key]}\n{stripped}"
+            continue
+
+        key, sep, value = _split_option(stripped)
+        if not sep:
+            raise FlightPlanParseError(f"line {line_number}: {stripped!r} is not a key=value pair")
+        if key in current:
+            raise FlightPlanParseError(f"line {line_number}: option {key!r} already exists")
+
+        current[key] = value
+        last_key = key
+
+        if summary_only and key.startswith("tppos") and current is result.get("Task") and _summary_complete(current):
+            break
+
+    return result
+
+
+def _split_option(line: str) -> tuple[str, str, str]:
+    # like configparser, the first "=" or ":" is the delimiter
+    equal = line.find("=")
+    colon = line.find(":")
+    if equal < 0 or (0 <= colon < equal):
+        equal = colon
+    if equal < 0:
+        return line, "", ""
+
+    return line[:equal].rstrip().lower(), line[equal], line[equal + 1 :].strip()
+
+
+def decode_fpl_line(line: bytes) -> str:
+    try:
+        return line.decode(FPL_ENCODING)
+    except UnicodeDecodeError:
+        return line.decode(FPL_FALLBACK_ENCODING, errors="replace")
+
+
+def decode_fpl(content: bytes) -> list[str]:
+    """Lines of the content of a .fpl file, each one decoded on its own (like when the file is read)"""
+    return [decode_fpl_line(line) for line in content.splitlines()]
+
+
+def _read_lines(filepath: str) -> Iterable[str]:
+    # decoded line by line, the summary mode stops reading early
+    with open(filepath, "rb") as file:
+        for line in file:
+            yield decode_fpl_line(line)
+
+
+def parse_flight_plan_header(lines: Iterable[str]) -> FlightPlanHeader:
+    sections = tokenize_fpl(lines, sections=("Version", "Task"), summary_only=True)
+    task = sections.get("Task", {})
+
+    turnpoints_count = int(task.get("count", 0))
+    return FlightPlanHeader.model_construct(
+        version=sections.get("Version", {}).get("condor version"),
+        landscape=task.get("landscape"),
+        turnpoints_count=turnpoints_count,
+        turnpoint_names=[task.get(f"tpname{i}", "") for i in range(turnpoints_count)],
+        pos_x=[float(task.get(f"tpposx{i}", 0)) for i in range(turnpoints_count)],
+        pos_y=[float(task.get(f"tpposy{i}", 0)) for i in range(turnpoints_count)],
+    )
+
+
+def read_flight_plan_header(filepath: str) -> FlightPlanHeader:
+    return parse_flight_plan_header(_read_lines(filepath))
+
+
+def parse_flight_plan_sections(lines: Iterable[str]) -> dict:
+    """Raw flight plan fields, ready to build a FlightPlan"""
+    sections = tokenize_fpl(lines)
+    task = sections.get("Task", {})
+    plane = sections.get("Plane", {})
+
+    turnpoints = []
+    for i in range(int(task.get("count", 0))):
+        turnpoints.append(
+            {
+                "name": task.get(f"tpname{i}"),
+                "pos_x": float(task.get(f"tpposx{i}", 0)),
+                "pos_y": float(task.get(f"tpposy{i}", 0)),
+                "pos_z": float(task.get(f"tpposz{i}", 0)),
+                "airport_id": int(task.get(f"tpairport{i}", 0)),
+                "radius": int(task.get(f"tpradius{i}", 0)),
+                "altitude": int(task.get(f"tpaltitude{i}", 0)),
+            }
+        )
+
+    return {
+        "version": sections.get("Version", {}).get("condor version"),
+        "landscape": task.get("landscape"),
+        "description": sections.get("Description", {}).get("text"),
+        "turnpoints": turnpoints,
+        "plane_class": {
+            "class": plane.get("class"),
+            "name": plane.get("name"),
+            "water": int(plane.get("water", 0)),
+        },
+    }
+
+
+def read_flight_plan_sections(filepath: str) -> dict:
+    return parse_flight_plan_sections(_read_lines(filepath))
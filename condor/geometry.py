@@ -0,0 +1,99 @@
+"""Task geometry: legs, bearings, distances and bounding box of flight plans, computed with numpy
+
+Condor landscape coordinates are in meters, X grows to the west and Y to the north (see
+services.flight_plan_service.transpose_map_xy). Bearings are in degrees, clockwise from the north.
+
+compute_task_geometry works on one task, compute_batch_geometry on many tasks at once: all turnpoints are
+concatenated in a single array, so the cost of a whole catalog is a few numpy operations.
+"""
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from itertools import chain
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class TaskGeometry:
+    legs: np.ndarray  # length of each leg (meters)
+    bearings: np.ndarray  # bearing of each leg (degrees)
+    cumulative: np.ndarray  # distance from the start to each turnpoint (meters)
+    bbox: tuple[float, float, float, float]  # min x, min y, max x, max y
+
+    @property
+    def total(self) -> float:
+        return float(self.cumulative[-1]) if len(self.cumulative) else 0.0
+
+
+@dataclass(frozen=True)
+class BatchGeometry:
+    """Metrics of many tasks, one array per metric, in the order of the tasks"""
+
+    turnpoints: np.ndarray
+    total: np.ndarray
+    longest_leg: np.ndarray
+    min_x: np.ndarray
+    min_y: np.ndarray
+    max_x: np.ndarray
+    max_y: np.ndarray
+
+
+def compute_task_geometry(pos_x: Sequence[float], pos_y: Sequence[float]) -> TaskGeometry:
+    x = np.asarray(pos_x, dtype=np.float64)
+    y = np.asarray(pos_y, dtype=np.float64)
+    if not len(x):
+        empty = np.zeros(0)
+        return TaskGeometry(legs=empty, bearings=empty, cumulative=empty, bbox=(0.0, 0.0, 0.0, 0.0))
+
+    dx, dy = np.diff(x), np.diff(y)
+    legs = np.hypot(dx, dy)
+
+    return TaskGeometry(
+        legs=legs,
+        bearings=np.degrees(np.arctan2(-dx, dy)) % 360,
+        cumulative=np.concatenate(([0.0], np.cumsum(legs))),
+        bbox=(float(x.min()), float(y.min()), float(x.max()), float(y.max())),
+    )
+
+
+def compute_batch_geometry(tasks: Sequence[tuple[Sequence[float], Sequence[float]]]) -> BatchGeometry:
+    """Metrics of (pos_x, pos_y) tasks"""
+    counts = np.fromiter((len(pos_x) for pos_x, _ in tasks), dtype=np.int64, count=len(tasks))
+    points = int(counts.sum())
+    x = np.fromiter(chain.from_iterable(pos_x for pos_x, _ in tasks), dtype=np.float64, count=points)
+    y = np.fromiter(chain.from_iterable(pos_y for _, pos_y in tasks), dtype=np.float64, count=points)
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+
+    # legs between the last turnpoint of a task and the first one of the next task don't exist
+    legs = np.hypot(np.diff(x), np.diff(y)) if points > 1 else np.zeros(0)
+    task_ends = offsets + counts - 1
+    legs[task_ends[(counts > 0) & (task_ends < len(legs))]] = 0.0
+
+    # total: difference of the cumulated legs at the last and the first turnpoint of each task
+    cumulative = np.concatenate(([0.0], np.cumsum(legs)))
+    total = np.where(counts > 1, cumulative[np.maximum(task_ends, 0)] - cumulative[offsets.clip(max=points - 1)], 0.0)
+
+    longest_leg = np.zeros(len(tasks))
+    with_legs = counts > 1
+    if with_legs.any():
+        longest_leg[with_legs] = np.maximum.reduceat(legs, offsets[with_legs])
+
+    bbox = [np.zeros(len(tasks)) for _ in range(4)]
+    not_empty = counts > 0
+    if not_empty.any():
+        starts = offsets[not_empty]
+        bbox[0][not_empty] = np.minimum.reduceat(x, starts)
+        bbox[1][not_empty] = np.minimum.reduceat(y, starts)
+        bbox[2][not_empty] = np.maximum.reduceat(x, starts)
+        bbox[3][not_empty] = np.maximum.reduceat(y, starts)
+
+    return BatchGeometry(
+        turnpoints=counts,
+        total=total,
+        longest_leg=longest_leg,
+        min_x=bbox[0],
+        min_y=bbox[1],
+        max_x=bbox[2],
+        max_y=bbox[3],
+    )
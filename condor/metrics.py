@@ -0,0 +1,296 @@
+"""Metrics: latency histograms and counters (slash commands, server calls, catalog, preview renders and cache)
+
+Metrics are disabled by default (metrics section of config.yaml): the instrumented functions then only check a flag.
+Once enabled by the bot, they are exposed in the Prometheus text format on a local HTTP endpoint (if a port is set), and
+summarized by the /condor-metrics command.
+"""
+
+import bisect
+import functools
+import threading
+import time
+from collections.abc import Callable
+from contextlib import AbstractContextManager, nullcontext
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from condor.config import MetricsConfig
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)  # seconds
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def escape_label(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    labels = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values, strict=False)]
+    if extra:
+        labels.append(extra)
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+class Counter:
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def snapshot(self) -> dict[tuple[str, ...], float]:
+        """Copy of the values, read under the lock"""
+        with self._lock:
+            return dict(self.values)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{format_labels(self.labels, labels)} {value:g}")
+        return lines
+
+
+class HistogramValues:
+    __slots__ = ("buckets", "count", "sum")
+
+    def __init__(self, size: int):
+        self.buckets = [0] * size  # not cumulated, the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def copy(self) -> "HistogramValues":
+        values = HistogramValues(0)
+        values.buckets = list(self.buckets)
+        values.sum = self.sum
+        values.count = self.count
+        return values
+
+
+class Histogram:
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.bounds = tuple(buckets)
+        self.values: dict[tuple[str, ...], HistogramValues] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            values = self.values.get(labels)
+            if values is None:
+                values = self.values[labels] = HistogramValues(len(self.bounds) + 1)
+            values.buckets[bisect.bisect_left(self.bounds, value)] += 1
+            values.sum += value
+            values.count += 1
+
+    def snapshot(self) -> dict[tuple[str, ...], HistogramValues]:
+        """Copy of the values, read under the lock"""
+        with self._lock:
+            return {labels: values.copy() for labels, values in self.values.items()}
+
+    def quantile(self, labels: tuple[str, ...], ratio: float) -> float:
+        with self._lock:
+            values = self.values[labels].copy()
+        return self.estimate_quantile(values, ratio)
+
+    def estimate_quantile(self, values: HistogramValues, ratio: float) -> float:
+        """Estimation from the buckets (linear interpolation in the bucket), like Prometheus histogram_quantile"""
+        rank = ratio * values.count
+        cumulated = 0
+        for index, count in enumerate(values.buckets):
+            if count and cumulated + count >= rank:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                if index == len(self.bounds):
+                    return lower  # +Inf bucket
+                return lower + (self.bounds[index] - lower) * (rank - cumulated) / count
+            cumulated += count
+        return 0.0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, values in sorted(self.values.items()):
+                cumulated = 0
+                for bound, count in zip((*self.bounds, "+Inf"), values.buckets, strict=True):
+                    cumulated += count
+                    le = 'le="{}"'.format(bound if isinstance(bound, str) else f"{bound:g}")
+                    lines.append(f"{self.name}_bucket{format_labels(self.labels, labels, le)} {cumulated}")
+                lines.append(f"{self.name}_sum{format_labels(self.labels, labels)} {values.sum:g}")
+                lines.append(f"{self.name}_count{format_labels(self.labels, labels)} {values.count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.metrics: dict[str, Counter | Histogram] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, metric_class: type, name: str, description: str, labels: tuple[str, ...]):
+        metric = self.metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self.metrics.setdefault(name, metric_class(name, description, labels))
+        return metric
+
+    def counter(self, name: str, description: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self._get(Counter, name, description, labels)
+
+    def histogram(self, name: str, description: str, labels: tuple[str, ...] = ()) -> Histogram:
+        return self._get(Histogram, name, description, labels)
+
+    def render(self) -> str:
+        """All the metrics in the Prometheus text format"""
+        lines = []
+        for name in sorted(self.metrics):
+            lines += self.metrics[name].render()
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """Counts and latencies in a few lines, for humans"""
+        lines = []
+        for name in sorted(self.metrics):
+            metric = self.metrics[name]
+            for labels, values in sorted(metric.snapshot().items()):  # copied under the lock, formatted without it
+                label = f"{name}{format_labels(metric.labels, labels)}"
+                if isinstance(metric, Histogram):
+                    p50, p95 = metric.estimate_quantile(values, 0.5), metric.estimate_quantile(values, 0.95)
+                    lines.append(
+                        f"{label} count={values.count} mean={values.sum / values.count * 1000:.1f}ms"
+                        f" p50={p50 * 1000:.1f}ms p95={p95 * 1000:.1f}ms"
+                    )
+                else:
+                    lines.append(f"{label} {values:g}")
+        return "\n".join(lines)
+
+
+@dataclass(frozen=True)
+class MetricSpec:
+    name: str
+    description: str
+    labels: tuple[str, ...] = ()
+
+    @property
+    def errors(self) -> "MetricSpec":
+        """Counter of the failures of a timed operation"""
+        return MetricSpec(
+            f"{self.name.removesuffix('_seconds')}_errors_total", f"{self.description}, errors", self.labels
+        )
+
+
+COMMAND_SECONDS = MetricSpec("condor_command_seconds", "Slash commands duration", ("command",))
+SERVER_CALL_SECONDS = MetricSpec("condor_server_call_seconds", "Server manager calls duration", ("call", "server"))
+STATUS_READS = MetricSpec("condor_status_reads_total", "Server status reads by commands", ("server", "result"))
+CATALOG_SECONDS = MetricSpec("condor_catalog_seconds", "Catalog operations duration", ("operation",))
+PREVIEW_RENDER_SECONDS = MetricSpec("condor_preview_render_seconds", "Flight plan previews rendering duration")
+PREVIEW_ENCODE_SECONDS = MetricSpec(
+    "condor_preview_encode_seconds", "Flight plan previews encoding duration", ("format",)
+)
+PREVIEW_BYTES = MetricSpec("condor_preview_bytes_total", "Encoded flight plan previews size", ("format",))
+PREVIEW_CACHE_LOOKUPS = MetricSpec("condor_preview_cache_lookups_total", "Preview cache lookups", ("result",))
+
+
+# instrumented modules (catalog, server manager) don't load the config, metrics are enabled by the bot at startup
+_metrics = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    return _metrics
+
+
+def configure_metrics(config: MetricsConfig) -> MetricsRegistry:
+    _metrics.enabled = config.enabled
+    return _metrics
+
+
+class Timer:
+    __slots__ = ("labels", "metrics", "spec", "started")
+
+    def __init__(self, metrics: MetricsRegistry, spec: MetricSpec, labels: tuple[str, ...]):
+        self.metrics = metrics
+        self.spec = spec
+        self.labels = labels
+
+    def __enter__(self) -> "Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        spec = self.spec
+        histogram = self.metrics.histogram(spec.name, spec.description, spec.labels)
+        histogram.observe(time.perf_counter() - self.started, *self.labels)
+        if exc_type is not None:
+            errors = spec.errors
+            self.metrics.counter(errors.name, errors.description, errors.labels).inc(*self.labels)
+
+
+_disabled_timer = nullcontext()
+
+
+def measure(spec: MetricSpec, *labels: str) -> AbstractContextManager:
+    """Context manager recording the duration of its block (and its failures), nothing when metrics are disabled"""
+    metrics = get_metrics()
+    if not metrics.enabled:
+        return _disabled_timer
+    return Timer(metrics, spec, labels)
+
+
+def count(spec: MetricSpec, *labels: str, amount: float = 1) -> None:
+    metrics = get_metrics()
+    if metrics.enabled:
+        metrics.counter(spec.name, spec.description, spec.labels).inc(*labels, amount=amount)
+
+
+def observe(spec: MetricSpec, value: float, *labels: str) -> None:
+    """Record a duration measured elsewhere (ex: in a render process)"""
+    metrics = get_metrics()
+    if metrics.enabled:
+        metrics.histogram(spec.name, spec.description, spec.labels).observe(value, *labels)
+
+
+def timed(spec: MetricSpec, labels: Callable[..., tuple[str, ...]] | None = None):
+    """Decorator measuring a coroutine function, labels are computed from its arguments"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not get_metrics().enabled:
+                return await func(*args, **kwargs)
+
+            with measure(spec, *(labels(*args, **kwargs) if labels else ())):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+
+        body = get_metrics().render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass  # scraped every few seconds, not worth a log line
+
+
+def start_metrics_server(host: str, port: int) -> ThreadingHTTPServer:
+    """Serve /metrics in a daemon thread"""
+    server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+    threading.Thread(target=server.serve_forever, name="condor-metrics", daemon=True).start()
+    return server
@@ -0,0 +1,262 @@
+"""On-demand profiling of the next slash commands, or of a console.py command
+
+Profiling is armed for a number of interactions (profiling section of config.yaml, or /condor-profile), each one of
+them is then run under a profiler, one at a time, and leaves two files in the profiling output directory:
+- <timestamp>-<name>.prof (deterministic mode): cProfile stats, for pstats, snakeviz, ...
+  <timestamp>-<name>.folded (sampling mode): collapsed stacks of all the threads, for flamegraph.pl, speedscope, ...
+- <timestamp>-<name>.txt: the top functions, by own and by cumulative time
+
+The deterministic profiler (cProfile) traces every call of the event loop thread, so it also records the other
+coroutines running meanwhile, and none of the work done in the I/O threads or render processes. The sampling profiler
+reads the stacks of all the threads of the bot every sample_interval_ms, at a lower cost, idle threads are ignored.
+"""
+
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+
+from rich import print
+
+from condor.config import ProfilingConfig
+
+logger = logging.getLogger("profiling")
+
+PROFILING_MODES = ("deterministic", "sampling")
+KEPT_REPORTS = 20  # last profiles listed by /condor-profile
+UNSAFE_FILENAME_CHARACTERS = re.compile(r"[^\w.-]+")
+
+# leaf frames of threads waiting for work: the event loop selector, the idle I/O threads, the timers
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+
+@dataclass
+class ProfileReport:
+    name: str
+    mode: str
+    duration: float  # seconds
+    dump_path: str
+    summary_path: str
+
+
+class DeterministicProfiler:
+    extension = "prof"
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self) -> None:
+        self.profile.enable()
+
+    def stop(self) -> None:
+        self.profile.disable()
+
+    def dump(self, filename: str) -> None:
+        self.profile.dump_stats(filename)
+
+    def summary(self, top: int) -> str:
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=stream).strip_dirs()
+        for sort_key, title in (("tottime", "own time"), ("cumulative", "cumulative time")):
+            stream.write(f"top {top} functions by {title}\n")
+            stats.sort_stats(sort_key).print_stats(top)
+        return stream.getvalue()
+
+
+def frame_label(filename: str, lineno: int, name: str) -> str:
+    return f"{name} ({os.path.basename(filename)}:{lineno})"
+
+
+class SamplingProfiler:
+    extension = "folded"
+
+    def __init__(self, interval: float):
+        self.interval = interval  # seconds
+        self.stacks: Counter[tuple[str, ...]] = Counter()  # thread name and frames (root first) -> samples
+        self.samples = 0  # sampling rounds
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="condor-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    self.sample(names.get(thread_id, str(thread_id)), frame)
+            self.samples += 1
+
+    def sample(self, thread_name: str, frame) -> None:
+        code = frame.f_code
+        if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+            return
+
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(frame_label(code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+        frames.append(thread_name)
+        self.stacks[tuple(reversed(frames))] += 1
+
+    def dump(self, filename: str) -> None:
+        with open(filename, "wt", encoding="utf-8") as file:
+            for stack, samples in self.stacks.most_common():
+                file.write(f"{';'.join(frame.replace(';', ',') for frame in stack)} {samples}\n")
+
+    def summary(self, top: int) -> str:
+        own: Counter[str] = Counter()
+        cumulative: Counter[str] = Counter()
+        for stack, samples in self.stacks.items():
+            own[stack[-1]] += samples
+            for frame in set(stack[1:]):  # recursive functions counted once per stack
+                cumulative[frame] += samples
+
+        total = sum(self.stacks.values())
+        lines = [f"{self.samples} sampling rounds every {self.interval * 1000:g} ms, {total} busy thread samples"]
+        for title, counter in (("own samples", own), ("cumulative samples", cumulative)):
+            lines += ["", f"top {top} functions by {title}"]
+            for frame, samples in counter.most_common(top):
+                lines.append(f"{samples:8d} {samples / max(total, 1):6.1%}  {frame}")
+        return "\n".join(lines) + "\n"
+
+
+def create_profiler(config: ProfilingConfig) -> DeterministicProfiler | SamplingProfiler:
+    if config.mode == "sampling":
+        return SamplingProfiler(config.sample_interval_ms / 1000)
+    return DeterministicProfiler()
+
+
+def profile_filename(output_path: str, name: str, started: datetime) -> str:
+    return os.path.join(output_path, f"{started:%Y%m%d-%H%M%S-%f}-{UNSAFE_FILENAME_CHARACTERS.sub('_', name)}")
+
+
+class ProfilingSession:
+    """Profiles the next interactions, as many as armed, one at a time (profilers don't nest)"""
+
+    def __init__(self, config: ProfilingConfig):
+        self.config = config
+        self.remaining = config.interactions
+        self.reports: list[ProfileReport] = []
+        self._active = False
+        self._lock = threading.Lock()
+
+    def arm(self, interactions: int, mode: str | None = None) -> None:
+        """Profile the next interactions (0 to disarm), in another mode than the configured one"""
+        if mode is not None and mode not in PROFILING_MODES:
+            raise ValueError(f"unknown profiling mode {mode}, expected one of {', '.join(PROFILING_MODES)}")
+        with self._lock:
+            if mode is not None:
+                self.config = self.config.model_copy(update={"mode": mode})
+            self.remaining = interactions
+
+    def _acquire(self) -> bool:
+        with self._lock:
+            if self.remaining <= 0 or self._active:
+                return False
+            self.remaining -= 1
+            self._active = True
+            return True
+
+    @contextmanager
+    def profile(self, name: str, details: str = "") -> Iterator[None]:
+        """Profile the block if armed and no other profile is in progress"""
+        if not self._acquire():
+            yield
+            return
+
+        config = self.config
+        profiler = create_profiler(config)
+        started_at = datetime.now()
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            try:
+                self.reports.append(self.write(profiler, config, name, details, started_at, started))
+                del self.reports[:-KEPT_REPORTS]
+            finally:
+                self._active = False
+
+    def write(
+        self,
+        profiler: DeterministicProfiler | SamplingProfiler,
+        config: ProfilingConfig,
+        name: str,
+        details: str,
+        started_at: datetime,
+        started: float,
+    ) -> ProfileReport:
+        duration = time.perf_counter() - started
+        os.makedirs(config.output_path, exist_ok=True)
+        filename = profile_filename(config.output_path, name, started_at)
+        dump_path = f"{filename}.{profiler.extension}"
+        summary_path = f"{filename}.txt"
+
+        profiler.dump(dump_path)
+        with open(summary_path, "wt", encoding="utf-8") as file:
+            file.write(f"{name}{f' ({details})' if details else ''}: {duration:.3f} s, {config.mode} profile\n\n")
+            file.write(profiler.summary(config.top))
+
+        logger.info(f"profile of {name} ({duration:.3f} s) written to {summary_path}")
+        print(f"[yellow]profile[/yellow] of [blue]{name}[/blue] ({duration:.3f} s): [blue]{summary_path}[/blue]")
+        return ProfileReport(name, config.mode, duration, dump_path, summary_path)
+
+
+# like the metrics, armed by the bot at startup (profiling section of config.yaml) or by /condor-profile
+_profiling = ProfilingSession(ProfilingConfig())
+
+
+def get_profiling() -> ProfilingSession:
+    return _profiling
+
+
+def configure_profiling(config: ProfilingConfig) -> ProfilingSession:
+    _profiling.config = config
+    _profiling.remaining = config.interactions
+    return _profiling
+
+
+def profiled(name: Callable[..., str]):
+    """Decorator profiling a coroutine function when profiling is armed, the name is computed from its arguments"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            profiling = get_profiling()
+            if profiling.remaining <= 0:
+                return await func(*args, **kwargs)
+
+            with profiling.profile(name(*args, **kwargs)):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,191 @@
+"""In memory search of flight plans by name, landscape and turnpoint names (slash commands autocomplete)
+
+Searched text is lowercased and accents are removed, then split into terms. Each term is indexed by its 1 and 2
+characters prefixes and by its trigrams, in one posting map per field: a query word of 3 characters or more matches
+the flight plans having all its trigrams in a field (then checked with a substring search), a shorter word matches
+the terms starting with it. Flight plans are added and removed one by one, when the catalog changes.
+
+Results are ordered by rank, then by name: names starting with the query (found by a binary search in the sorted
+names, enough to answer most keystrokes), then matches in names, in landscapes and in turnpoint names. Large candidate
+sets are not sorted, the sorted names are scanned until enough results are found.
+"""
+
+import bisect
+import re
+import threading
+import unicodedata
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import lru_cache
+
+NGRAM_SIZE = 3
+TERM_SEPARATOR = re.compile(r"[^0-9a-z]+")
+FIELDS = ("name", "landscape", "turnpoints")
+SELECTIVE_RATIO = 4  # words matching less than 1/4 of the documents select the candidates
+SCAN_RATIO = 32  # candidates above 1/32 of the documents are found by a scan of the sorted names, not sorted
+
+
+def normalize(text: str) -> str:
+    text = text.lower()
+    if text.isascii():
+        return text
+
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def split_terms(text: str) -> list[str]:
+    return [term for term in TERM_SEPARATOR.split(normalize(text)) if term]
+
+
+@lru_cache(maxsize=65536)
+def term_keys(term: str) -> frozenset[str]:
+    """Index keys of a term: its short prefixes, and all its trigrams"""
+    keys = {term[:size] for size in range(1, min(len(term), NGRAM_SIZE - 1) + 1)}
+    keys.update(term[i : i + NGRAM_SIZE] for i in range(len(term) - NGRAM_SIZE + 1))
+    return frozenset(keys)
+
+
+def query_keys(word: str) -> set[str]:
+    if len(word) < NGRAM_SIZE:
+        return {word}
+    return {word[i : i + NGRAM_SIZE] for i in range(len(word) - NGRAM_SIZE + 1)}
+
+
+@dataclass(frozen=True)
+class SearchDocument:
+    key: str
+    name: str  # normalized terms, separated by spaces
+    landscape: str
+    turnpoints: str
+    index_keys: tuple[frozenset[str], ...]  # by field
+
+    def contains(self, word: str, fields: tuple[str, ...] = FIELDS) -> bool:
+        """Trigrams of a word can be in different terms, check the word itself is in one of the fields"""
+        if len(word) < NGRAM_SIZE:
+            return any(f" {word}" in f" {getattr(self, field)}" for field in fields)
+        return any(word in getattr(self, field) for field in fields)
+
+
+class SearchIndex:
+    def __init__(self):
+        self.documents: dict[int, SearchDocument] = {}
+        self.ids: dict[str, int] = {}
+        self.postings: tuple[dict[str, set[int]], ...] = tuple({} for _ in FIELDS)
+        self.sorted_names: list[tuple[str, int]] = []  # (normalized name, document id)
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def add(self, key: str, name: str, landscape: str = "", turnpoints: list[str] | tuple[str, ...] = ()) -> None:
+        """Index (or index again) a document"""
+        fields_terms = (
+            split_terms(name),
+            split_terms(landscape),
+            split_terms(" ".join(turnpoints)),
+        )
+        document = SearchDocument(
+            key,
+            *(" ".join(terms) for terms in fields_terms),
+            index_keys=tuple(frozenset().union(*map(term_keys, set(terms))) for terms in fields_terms),
+        )
+
+        with self._lock:
+            self._remove(key)
+            document_id = self.ids[key] = self._next_id
+            self._next_id += 1
+
+            self.documents[document_id] = document
+            bisect.insort(self.sorted_names, (document.name, document_id))
+            for postings, index_keys in zip(self.postings, document.index_keys, strict=True):
+                for index_key in index_keys:
+                    postings.setdefault(index_key, set()).add(document_id)
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        document_id = self.ids.pop(key, None)
+        if document_id is None:
+            return
+
+        document = self.documents.pop(document_id)
+        self.sorted_names.pop(bisect.bisect_left(self.sorted_names, (document.name, document_id)))
+        for postings, index_keys in zip(self.postings, document.index_keys, strict=True):
+            for index_key in index_keys:
+                ids = postings[index_key]
+                ids.discard(document_id)
+                if not ids:
+                    del postings[index_key]
+
+    def _word_postings(self, word: str, field: int) -> list[set[int]]:
+        """Postings of the index keys of a word in a field, smallest first"""
+        postings = self.postings[field]
+        return sorted((postings.get(index_key, set()) for index_key in query_keys(word)), key=len)
+
+    def _select(
+        self, candidates: set[int] | None, found: set[int], accept: Callable[[SearchDocument], bool], limit: int
+    ) -> list[int]:
+        """Up to limit accepted candidates (all documents not found yet when None), in name order"""
+        selected = []
+        if candidates is None:
+            ordered = (document_id for _, document_id in self.sorted_names if document_id not in found)
+        elif len(candidates) * SCAN_RATIO >= len(self.sorted_names):
+            # many documents are candidates, the first ones in name order are quickly found
+            ordered = (document_id for _, document_id in self.sorted_names if document_id in candidates)
+        else:
+            ordered = iter(sorted(candidates, key=lambda document_id: self.documents[document_id].name))
+
+        for document_id in ordered:
+            if accept(self.documents[document_id]):
+                selected.append(document_id)
+                if len(selected) == limit:
+                    break
+
+        return selected
+
+    def search(self, query: str, limit: int = 25) -> list[str]:
+        """Keys of the best documents matching all the words of the query (all documents for an empty query)"""
+        words = split_terms(query)
+        normalized_query = " ".join(words)
+
+        with self._lock:
+            # rank 0: names starting with the query
+            start = bisect.bisect_left(self.sorted_names, (normalized_query,))
+            best = []
+            for name, document_id in self.sorted_names[start : start + limit]:
+                if not name.startswith(normalized_query):
+                    break
+                best.append(document_id)
+
+            if len(best) < limit and words:
+                # postings of each word by field: name, landscape, turnpoints
+                by_field = [[self._word_postings(word, field) for field in range(len(FIELDS))] for word in words]
+                found = set(best)
+                for rank in range(1, len(FIELDS) + 1):
+                    fields = FIELDS[:rank]
+
+                    # words matching a small part of the documents select the candidates, the others are only
+                    # checked on the candidates (or while scanning the documents in name order)
+                    candidates = None
+                    for fields_postings in by_field:
+                        fields_postings = fields_postings[:rank]
+                        if sum(len(postings[0]) for postings in fields_postings) * SELECTIVE_RATIO < len(self):
+                            word_ids = set().union(*(p[0].intersection(*p[1:]) for p in fields_postings))
+                            candidates = word_ids if candidates is None else candidates & word_ids
+                    if candidates is not None:
+                        candidates -= found
+
+                    def accept(document: SearchDocument, fields=fields) -> bool:
+                        return all(document.contains(word, fields) for word in words)
+
+                    selected = self._select(candidates, found, accept, limit - len(best))
+                    best.extend(selected)
+                    found.update(selected)
+                    if len(best) == limit:
+                        break
+
+            return [self.documents[document_id].key for document_id in best]
@@ -0,0 +1,178 @@
+"""Server status from the dedicated server log, an alternative to reading the server window (status.source: log)
+
+The log is tailed: each poll reads only the bytes written since the previous one, in fixed size chunks, so a large log
+costs its size once at the first poll, then only its new lines. A rotated log (another file under the same name) or a
+truncated one is read again from its start. The recognized events (patterns in status.log of config.yaml) update the
+status: server start and stop, players joining and leaving, race start and end. The default patterns are
+placeholders, written without a real dedicated server log: they have to be adjusted to the log of the server.
+
+The log doesn't tell when CondorDedicated.exe exits or crashes: the server is OFFLINE when its backend doesn't find the
+process (by PID, without UI automation).
+"""
+
+import logging
+import os
+import re
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from functools import cache
+
+from condor.config import ServerLogConfig, get_config
+from condor.metrics import SERVER_CALL_SECONDS, measure
+from condor.server_manager import OnlineStatus, ServerStatus, get_backend
+
+logger = logging.getLogger("server_log")
+
+CHUNK_SIZE = 64 * 1024
+MAX_LINE_BYTES = 16 * 1024  # longer lines are skipped, they are not server events
+FINGERPRINT_BYTES = 64  # start of the file, a different one means another file (rotation, truncation)
+
+LOG_EVENTS = ("version", "server_start", "server_stop", "player_join", "player_leave", "race_start", "race_end")
+
+
+@dataclass(frozen=True)
+class FileIdentity:
+    inode: int  # 0 when the file system has none
+    fingerprint: bytes
+
+    def same_file(self, other: "FileIdentity") -> bool:
+        if self.inode and other.inode and self.inode != other.inode:
+            return False
+        size = min(len(self.fingerprint), len(other.fingerprint))
+        return self.fingerprint[:size] == other.fingerprint[:size]
+
+
+class LogTailer:
+    """New lines of a log file, read from where the previous read stopped"""
+
+    def __init__(self, path: str, encoding: str = "utf-8", chunk_size: int = CHUNK_SIZE):
+        self.path = path
+        self.encoding = encoding
+        self.chunk_size = chunk_size
+        self.offset = 0
+        self.identity: FileIdentity | None = None
+        self.rotations = 0
+        self.truncations = 0
+        self._partial = b""  # end of the file, not a complete line yet
+        self._skip_line = False  # the current line is too long
+
+    def reset(self) -> None:
+        self.offset = 0
+        self._partial = b""
+        self._skip_line = False
+
+    def read_lines(self) -> Iterator[str]:
+        """Complete lines written since the last read (to be consumed entirely)"""
+        try:
+            file = open(self.path, "rb")
+        except FileNotFoundError:
+            return  # rotated and not created again yet
+
+        with file:
+            stat = os.fstat(file.fileno())
+            identity = FileIdentity(stat.st_ino, file.read(FINGERPRINT_BYTES))
+            if self.identity and not self.identity.same_file(identity):
+                logger.info(f"{self.path} rotated, reading the new file")
+                self.rotations += 1
+                self.reset()
+            elif stat.st_size < self.offset:
+                logger.info(f"{self.path} truncated, reading it again")
+                self.truncations += 1
+                self.reset()
+            if not self.identity or len(identity.fingerprint) >= len(self.identity.fingerprint):
+                self.identity = identity
+
+            file.seek(self.offset)
+            while chunk := file.read(self.chunk_size):
+                self.offset += len(chunk)
+                yield from self._split(chunk)
+
+    def _split(self, chunk: bytes) -> Iterator[str]:
+        lines = (self._partial + chunk).split(b"\n")
+        self._partial = lines.pop()
+        if len(self._partial) > MAX_LINE_BYTES:
+            self._partial = b""
+            self._skip_line = True
+
+        for line in lines:
+            if self._skip_line:
+                self._skip_line = False
+                continue
+            yield line.rstrip(b"\r").decode(self.encoding, errors="replace")
+
+
+class ServerLogMonitor:
+    """Server status built from the events of the log lines"""
+
+    def __init__(self, path: str, config: ServerLogConfig):
+        self.tailer = LogTailer(path, config.encoding)
+        self.patterns = [(event, re.compile(getattr(config, event))) for event in LOG_EVENTS]
+        self.online_status = OnlineStatus.OFFLINE
+        self.version = "unknown"
+        self.players: dict[str, None] = {}  # in joining order
+        self.lines = 0
+
+    def apply(self, line: str) -> str | None:
+        """Update the status with a log line, return the recognized event"""
+        for name, pattern in self.patterns:
+            match = pattern.search(line)
+            if match:
+                event = name
+                break
+        else:
+            return None
+
+        if event == "version":
+            self.version = match["version"]
+        elif event == "server_start":
+            self.online_status = OnlineStatus.JOINING_ENABLED
+            self.players.clear()
+        elif event == "server_stop":
+            self.online_status = OnlineStatus.NOT_RUNNING
+            self.players.clear()
+        elif event == "player_join":
+            self.players[match["player"]] = None
+        elif event == "player_leave":
+            self.players.pop(match["player"], None)
+        elif event == "race_start":
+            self.online_status = OnlineStatus.RACE_IN_PROGRESS
+        elif event == "race_end":
+            self.online_status = OnlineStatus.JOINING_DISABLED
+
+        return event
+
+    def poll(self) -> ServerStatus:
+        """Status after the lines written since the last poll"""
+        # the status is kept across a rotation: the server is still running, the new file has its next events
+        for line in self.tailer.read_lines():
+            self.lines += 1
+            self.apply(line)
+
+        return ServerStatus(version=self.version, online_status=self.online_status, players=list(self.players))
+
+
+class LogStatusSource:
+    """Status of a server instance from its log, OFFLINE when its process is not running"""
+
+    def __init__(self, name: str, monitor: ServerLogMonitor, is_running: Callable[[], bool]):
+        self.name = name
+        self.monitor = monitor
+        self.is_running = is_running
+
+    def get_status(self) -> ServerStatus:
+        with measure(SERVER_CALL_SECONDS, "log_status", self.name):
+            status = self.monitor.poll()
+            if not self.is_running():
+                return ServerStatus(version=status.version, online_status=OnlineStatus.OFFLINE)
+            if status.online_status == OnlineStatus.OFFLINE:
+                status.online_status = OnlineStatus.NOT_RUNNING  # launched, nothing logged yet
+            return status
+
+
+@cache
+def get_log_status_source(server_name: str) -> LogStatusSource:
+    config = get_config()
+    server = config.get_server(server_name)
+    path = os.path.join(config.get_condor_path(server), config.status.log.path)
+
+    return LogStatusSource(server.name, ServerLogMonitor(path, config.status.log), get_backend(server.name).is_running)
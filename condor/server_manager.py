@@ -1,11 +1,13 @@
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from dataclasses import dataclass
 from enum import IntEnum
+from functools import cache
 from pydantic import BaseModel, Field
 from rich import print
-from condor.flight_plan import BOT_FLIGHT_PLAN_LIST, get_default_flight_plans_list_path, save_flight_plans_list
-from condor.config import get_config
-import os
-from pywinauto import Application
-from pywinauto.application import WindowSpecification, ProcessNotFoundError
+from condor.flight_plan import get_server_flight_plans_list_path
+from condor.config import CondorServerConfig, LifecycleConfig, get_config
+from condor.metrics import SERVER_CALL_SECONDS, measure
 
 CONDOR_DEDICATED_EXE = "CondorDedicated.exe"
 CONDOR_DEDICATED_WINDOW_TITLE_PREFIX = "Condor dedicated server version"
@@ -27,31 +29,89 @@ class ServerStatus(BaseModel):
     players: list[str] = Field(default_factory=list)
 
 
-class ServerProcess:
-    def __init__(self, app: Application, window: WindowSpecification):
-        self.app = app
-        self.window = window
+@dataclass(frozen=True)
+class LifecycleStep:
+    """A step of a server start or stop, run in a worker thread (see services.lifecycle)
 
+    A thread can't be interrupted: run receives the step timeout (seconds) to bound its own waits.
+    """
 
-def save_host_ini() -> None:
+    name: str  # shown in the progress of the command
+    run: Callable[[float], object]
+    timeout: float  # seconds
+    exclusive: str | None = None  # steps with the same key never run at the same time (ex: a shared Host.ini)
+
+
+class ServerBackend(ABC):
+    """Condor dedicated server control, the process handle returned with the status is backend specific
+
+    A server is only started and stopped through its steps, run by its lifecycle (services.lifecycle), which
+    serializes the operations of the server and the exclusive steps shared by servers.
+    """
+
+    @abstractmethod
+    def get_status(self) -> tuple[ServerStatus, object | None]: ...
+
+    def is_running(self) -> bool:
+        """CondorDedicated.exe is launched (server running or not), without reading the window when possible"""
+        return self.get_status()[0].online_status != OnlineStatus.OFFLINE
+
+    @abstractmethod
+    def start_steps(self, flight_plan_filename: str, config: LifecycleConfig) -> list[LifecycleStep]:
+        """Steps launching the server with this flight plan (known to be offline), reported one by one to the user"""
+
+    @abstractmethod
+    def stop_steps(self, process: object, config: LifecycleConfig) -> list[LifecycleStep]:
+        """Steps stopping the running server, reported one by one to the user"""
+
+
+@cache
+def _create_backend(server_name: str) -> ServerBackend:
     config = get_config()
+    server = config.get_server(server_name)
+
+    # backends are imported on demand: pywinauto is only available on windows
+    if config.server_backend == "simulated":
+        from condor.backends.simulated import SimulatedBackend
+
+        return SimulatedBackend(config.simulated_server)
+
+    from condor.backends.pywinauto_backend import PywinautoBackend
+
+    return PywinautoBackend(server, config.get_condor_path(server), config.cache_path)
+
+
+def get_backend(server_name: str | None = None) -> ServerBackend:
+    """Backend of a server instance (the first one by default), one backend per instance"""
+    return _create_backend(get_config().get_server(server_name).name)
+
+
+def get_server_names() -> list[str]:
+    return [server.name for server in get_config().condor_servers]
+
+
+def save_host_ini(server: CondorServerConfig | None = None) -> str:
+    """Write the Host.ini read by the server instance at its launch, with its own flight plans list"""
+    config = get_config()
+    server = server or config.get_server()
+    condor_path = config.get_condor_path(server)
     host_ini: dict[str, str] = {}
 
-    host_ini["ServerName"] = config.condor_server.server_name
-    host_ini["Port"] = config.condor_server.port
-    host_ini["Password"] = config.condor_server.password
-    host_ini["AdminPassword"] = config.condor_server.admin_password
-    host_ini["MaxPlayers"] = config.condor_server.max_players
-    host_ini["MaxSpectators"] = config.condor_server.max_spectators
-    host_ini["MaxPing"] = config.condor_server.max_ping
-    host_ini["JoinTimeLimit"] = config.condor_server.join_time_limit
-    host_ini["MaxTowplanes"] = config.condor_server.max_two_planes
-    host_ini["AdvertiseOnWeb"] = int(config.condor_server.advertise_on_web)
-    host_ini["AutomaticPortForwarding"] = int(config.condor_server.automatic_port_forwarding)
-    host_ini["AdvertiseManualIP"] = config.condor_server.advertise_manual_ip
-    host_ini["AllowClientsToSaveFlightPlan"] = int(config.condor_server.allow_clients_to_save_flight_plan)
-
-    host_ini_path = f"{config.condor_path}/Settings/Host.ini"
+    host_ini["ServerName"] = server.server_name
+    host_ini["Port"] = server.port
+    host_ini["Password"] = server.password
+    host_ini["AdminPassword"] = server.admin_password
+    host_ini["MaxPlayers"] = server.max_players
+    host_ini["MaxSpectators"] = server.max_spectators
+    host_ini["MaxPing"] = server.max_ping
+    host_ini["JoinTimeLimit"] = server.join_time_limit
+    host_ini["MaxTowplanes"] = server.max_two_planes
+    host_ini["AdvertiseOnWeb"] = int(server.advertise_on_web)
+    host_ini["AutomaticPortForwarding"] = int(server.automatic_port_forwarding)
+    host_ini["AdvertiseManualIP"] = server.advertise_manual_ip
+    host_ini["AllowClientsToSaveFlightPlan"] = int(server.allow_clients_to_save_flight_plan)
+
+    host_ini_path = f"{condor_path}/Settings/Host.ini"
     with open(host_ini_path, "wt") as file:
         lines: list[str] = []
         lines.append("[General]")
@@ -59,27 +119,11 @@ def save_host_ini() -> None:
         for key, value in host_ini.items():
             lines.append(f"{key}={value if value else ''}")
         lines.append("[DedicatedServer]")
-        lines.append(f"LastSFL={get_default_flight_plans_list_path()}")
+        lines.append(f"LastSFL={get_server_flight_plans_list_path(condor_path, server.name)}")
 
         file.writelines([line + "\n" for line in lines])
 
-
-def get_flight_plan_path(flight_plan_filename: str) -> str:
-    return f"{get_config().flight_plans_path}/{flight_plan_filename}"
-
-
-def get_process() -> ServerProcess | None:
-    app = Application().connect(path=CONDOR_DEDICATED_EXE, timeout=0.2)
-    main_window = None
-    for window in app.windows():
-        if window.friendly_class_name() == "TDedicatedForm":
-            main_window = window
-            break
-
-    if not main_window:
-        return None
-
-    return ServerProcess(app=app, window=window)
+    return host_ini_path
 
 
 def parse_server_status_list_box_items(status: ServerStatus, list_box_items) -> None:
@@ -105,92 +149,13 @@ def parse_players_list_box_items(status: ServerStatus, list_box_items) -> None:
     status.players = list(list_box_items)
 
 
-def get_server_status() -> tuple[ServerStatus, ServerProcess | None]:
-    try:
-        process = get_process()
-    except ProcessNotFoundError:
-        return ServerStatus(online_status=OnlineStatus.OFFLINE), None
-
-    status = ServerStatus(online_status=OnlineStatus.NOT_RUNNING)
-
-    window_title: str = process.window.window_text()
-    if window_title.startswith(CONDOR_DEDICATED_WINDOW_TITLE_PREFIX):
-        status.version = window_title[len(CONDOR_DEDICATED_WINDOW_TITLE_PREFIX) + 1 :].strip()
-
-    # a better way than searching all listbox, and matching the top position ?
-    list_boxes = process.window.descendants(class_name="TspListBox")
-    server_status_list_box = None
-    players_list_box = None
-
-    # SERVER_NAME_LIST_ID = 0
-    SERVER_STATUS_LIST_ID = 1
-    # SERVER_FPL_LIST_ID = 2
-    SERVER_PLAYERS_LIST_ID = 3
-    for list_box_id, list_box in enumerate(list_boxes):
-        if list_box_id == SERVER_STATUS_LIST_ID:
-            server_status_list_box = list_box
-        if list_box_id == SERVER_PLAYERS_LIST_ID:
-            players_list_box = list_box
-
-    if not server_status_list_box:
-        raise Exception("server status list not found in condor server window")
-
-    parse_server_status_list_box_items(status, server_status_list_box.item_texts())
-    parse_players_list_box_items(status, players_list_box.item_texts())
-
-    return status, process
-
-
-def start_server(flight_plan_filename: str) -> bool:
-    status, process = get_server_status()
-
-    config = get_config()
-
-    if status.online_status != OnlineStatus.OFFLINE:
-        raise Exception("condor server is already running, should be stopped first")
-
-    flight_plan_filepath = get_flight_plan_path(flight_plan_filename)
-
-    if not os.path.isfile(flight_plan_filepath):
-        raise Exception(f"flight plan {flight_plan_filename} not found")
-
-    save_host_ini()
-    print("[blue]Host.ini[/blue] [yellow]saved[/yellow]")
-    save_flight_plans_list(flight_plans=[flight_plan_filename])
-    print(f"flight plans list [blue]{BOT_FLIGHT_PLAN_LIST}[/blue] [yellow]saved[/yellow]")
-
-    try:
-        old_path = os.getcwd()
-        os.chdir(config.condor_path)
-        app = Application().start(cmd_line=f"{config.condor_path}\\{CONDOR_DEDICATED_EXE}")
-        os.chdir(old_path)
-    except Exception:
-        os.chdir(old_path)
-        return False
-
-    window = app.window(title_re="Condor dedicated server.*", class_name="TDedicatedForm")
-    window.child_window(title="START", class_name="TspSkinButton").click()
-
-    return True
-
-
-def stop_server() -> None:
-    status, process = get_server_status()
-
-    if status.online_status == OnlineStatus.OFFLINE:
-        raise Exception("condor app is not running")
-
-    if process.app.window(title="STOP", class_name="TspSkinButton").exists():
-        process.app.window(title="STOP", class_name="TspSkinButton").click()
-
-        confirm_window = process.app.window(title="Confirm")
-        confirm_window.child_window(title="OK", class_name="TspSkinButton").click()
-
-        process.window.child_window(title="START", class_name="TspSkinButton").wait(wait_for="visible")
-
-    process.app.kill()
+def get_server_status(server_name: str | None = None) -> tuple[ServerStatus, object | None]:
+    backend = get_backend(server_name)
+    with measure(SERVER_CALL_SECONDS, "status", get_config().get_server(server_name).name):
+        return backend.get_status()
 
 
 if __name__ == "__main__":
-    status, process = get_server_status()
-    print(status)
+    for name in get_server_names():
+        status, process = get_server_status(name)
+        print(name, status)
@@ -1,11 +1,34 @@
+import sys
 import typer
 from rich import print
 from commands.flight_plan_command import app as flight_plan_commands
+from condor.config import ProfilingConfig, get_config
+from condor.profiling import PROFILING_MODES, ProfilingSession
 
 app = typer.Typer(no_args_is_help=True)
 app.add_typer(flight_plan_commands, name="flight-plan")
 
 
+@app.callback()
+def main(
+    ctx: typer.Context,
+    profile: bool = typer.Option(False, help="profile the command, see profiling in config.yaml"),
+    profile_mode: str | None = typer.Option(
+        None, help=f"profiler: {', '.join(PROFILING_MODES)} (default: config.yaml)"
+    ),
+):
+    if not profile:
+        return
+
+    config = get_config().profiling
+    if profile_mode is not None and profile_mode not in PROFILING_MODES:
+        raise typer.BadParameter(f"expected one of {', '.join(PROFILING_MODES)}", param_hint="--profile-mode")
+    update = {"interactions": 1} | ({"mode": profile_mode} if profile_mode else {})
+    session = ProfilingSession(ProfilingConfig.model_validate(config.model_dump() | update))
+    # stopped once the command is done
+    ctx.with_resource(session.profile(f"console-{ctx.invoked_subcommand}", " ".join(sys.argv[1:])))
+
+
 @app.command()
 def placeholder(flightplan: str):
     print("[yellow]placeholder for later usage[/yellow]")
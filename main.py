@@ -1,21 +1,33 @@
+# ruff: noqa: E402
+import time
+
+started = time.perf_counter()  # the imports below are part of the startup time
+
 import logging
 from rich import print
-from discord import Interaction, InteractionResponded, Message, Intents
+from discord import Interaction, InteractionResponded, Message, Intents, app_commands
 from discord.ext import commands
 from condor import release
-from condor.server_manager import (
-    OnlineStatus,
-    get_server_status,
-    start_server,
-    stop_server,
-)
+from condor.server_manager import OnlineStatus
+from condor.catalog import CATALOG_SORT_KEYS, get_catalog
 from condor.config import check_config, get_config
-from services.agent import on_files_upload, on_list_flight_plans, on_status
+from condor.metrics import COMMAND_SECONDS, configure_metrics, start_metrics_server, timed
+from condor.profiling import PROFILING_MODES, configure_profiling, profiled
+from services.agent import on_files_upload, on_list_flight_plans, on_metrics, on_profile, on_stats, on_status
+from services.flight_plan_list import EXPORT_FORMATS, SORT_LABELS, ListQuery
+from services.history import STATS_PERIODS, get_history
+from services.lifecycle import LifecycleBusyError, LifecycleOperation, ProgressCallback, get_lifecycle
+from services.startup import StartupTimer, sync_command_tree
+from services.status_service import get_status_service, get_status_services
+from services.workers import get_io_executor, shutdown_workers
 from services.dialogs import (
     SelectStartFlightPlan,
     SelectViewFlightPlan,
+    flight_plan_autocomplete,
     handle_error,
+    send_flight_plan,
     send_response,
+    server_autocomplete,
 )
 
 intents = Intents.default()
@@ -27,10 +39,31 @@ bot = commands.Bot(command_prefix="/", intents=intents)
 
 logger = logging.getLogger("main")
 
+startup_timer = StartupTimer(started)
+
+
+def command_name(interaction: Interaction, *args, **kwargs) -> str:
+    return interaction.command.name if interaction.command else "unknown"
+
+
+def command_labels(interaction: Interaction, *args, **kwargs) -> tuple[str]:
+    return (command_name(interaction),)
+
+
+timed_command = timed(COMMAND_SECONDS, command_labels)
+profiled_command = profiled(command_name)
+
+
+def instrumented_command(func):
+    """Slash commands are measured, and profiled when profiling is armed"""
+    return timed_command(profiled_command(func))
+
+
 prefix = get_config().command_prefix
 
 
 @bot.tree.command(name=f"{prefix}help", description="Display the help")
+@instrumented_command
 async def condor(interaction: Interaction):
     # cmd_prefix
     msg = f"""
@@ -54,32 +87,75 @@ Upload: just send a new Flight Plan (ex: MyFlightPlan.fpl) to this channel.
 
 @bot.event
 async def on_ready():
-    await bot.tree.sync()
+    # also called after each reconnection to the gateway
+    first_ready = not startup_timer.ready
+    if first_ready:
+        startup_timer.step("login")
+
+    synced = await sync_command_tree(bot.tree, bot.application_id, get_config().cache_path)
+    print(f"[yellow]commands[/yellow]: [blue]{'synced' if synced else 'unchanged, not synced'}[/blue]")
+    for status_service in get_status_services().values():
+        status_service.start()
     print(f"✅ bot is logged in as {bot.user}")
 
+    if first_ready:
+        startup_timer.step("commands sync" if synced else "commands hash")
+        startup_timer.report()
+
 
 @bot.tree.command(name=f"{prefix}ping", description="Simple Ping Pong Test command")
+@instrumented_command
 async def ping(interaction: Interaction):
     await send_response(interaction, "Pong! 🏓")
 
 
+def server_label(server_name: str | None) -> str:
+    """Name of the server in messages, when several servers are configured"""
+    if len(get_config().condor_servers) == 1:
+        return "server"
+    return f"server **{get_config().get_server(server_name).name}**"
+
+
+def lifecycle_progress(interaction: Interaction) -> ProgressCallback:
+    """Progress of a server start or stop, in the deferred response of the command"""
+
+    async def progress(operation: LifecycleOperation) -> None:
+        await interaction.edit_original_response(content=operation.describe())
+
+    return progress
+
+
 @bot.tree.command(name=f"{prefix}start", description="Start condor 3 server")
-async def start(interaction: Interaction):
-    status, _ = get_server_status()
-    if status.online_status != OnlineStatus.OFFLINE.value:
-        await handle_error(interaction, "server is already running, server should be stopped first")
-        return
+@app_commands.describe(
+    flight_plan="flight plan to start, search by name, landscape or turn point",
+    server="server to start, the first one by default",
+)
+@app_commands.autocomplete(flight_plan=flight_plan_autocomplete, server=server_autocomplete)
+@instrumented_command
+async def start(interaction: Interaction, flight_plan: str | None = None, server: str | None = None):
     try:
-        view = SelectStartFlightPlan(interaction.user)
-        await send_response(interaction, "📋 Select a flight plan:", view=view)
+        status = await get_status_service(server).get_status(force=True)
+        if status.online_status != OnlineStatus.OFFLINE.value:
+            await handle_error(interaction, f"{server_label(server)} is already running, it should be stopped first")
+            return
 
-        await view.wait()
-        if view.response:
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        if flight_plan is None:
+            view = await SelectStartFlightPlan.create(interaction.user)
+            await send_response(interaction, "📋 Select a flight plan:", view=view)
+            await view.wait()
             flight_plan = view.response
-            start_server(flight_plan)
+
+        if flight_plan and not get_catalog().get(flight_plan):
+            await handle_error(interaction, f"flight plan {flight_plan} not found")
+        elif flight_plan:
+            await get_lifecycle(server).start(
+                flight_plan, interaction.user.display_name, progress=lifecycle_progress(interaction)
+            )
             await send_response(
                 interaction,
-                f"✅ server started with flight plan {flight_plan} by **{interaction.user.display_name}**",
+                f"✅ {server_label(server)} started with flight plan {flight_plan}"
+                f" by **{interaction.user.display_name}**",
                 channel_message=True,
             )
             await interaction.delete_original_response()
@@ -89,51 +165,116 @@ async def start(interaction: Interaction):
     except InteractionResponded as already_responded:
         print(f"[red]{already_responded}[/red]")
 
+    except LifecycleBusyError as exc:
+        await handle_error(interaction, f"{exc}, server not started")
+
     except Exception as exc:
         print(f"[red]{exc}[/red]")
         await handle_error(interaction, f"an error occured, server not started: {exc}")
 
 
 @bot.tree.command(name=f"{prefix}status", description="Display condor 3 server status")
-async def status(interaction: Interaction):
-    await on_status(interaction)
+@app_commands.describe(server="server to show, all the servers by default")
+@app_commands.autocomplete(server=server_autocomplete)
+@instrumented_command
+async def status(interaction: Interaction, server: str | None = None):
+    await on_status(interaction, server)
 
 
 @bot.tree.command(name=f"{prefix}stop", description="Stop condor 3 server")
-async def stop(interaction: Interaction):
+@app_commands.describe(server="server to stop, the first one by default")
+@app_commands.autocomplete(server=server_autocomplete)
+@instrumented_command
+async def stop(interaction: Interaction, server: str | None = None):
     try:
-        status, _ = get_server_status()
+        status = await get_status_service(server).get_status(force=True)
         if status.online_status == OnlineStatus.OFFLINE.value:
-            await handle_error(interaction, "server is not running, so it couldn't be stopped")
+            await handle_error(interaction, f"{server_label(server)} is not running, so it couldn't be stopped")
             return
         if status.online_status == OnlineStatus.NOT_RUNNING.value or len(status.players) == 0:
-            await send_response(interaction, "stopping", delete_after=1)
-            stop_server()
+            await interaction.response.defer(ephemeral=True, thinking=True)
+            await get_lifecycle(server).stop(interaction.user.display_name, progress=lifecycle_progress(interaction))
             await send_response(
-                interaction, f"🔴 server stopped by **{interaction.user.display_name}**", channel_message=True
+                interaction,
+                f"🔴 {server_label(server)} stopped by **{interaction.user.display_name}**",
+                channel_message=True,
             )
+            await interaction.delete_original_response()
         else:
             await handle_error(
-                interaction, f"server couldn't be stopped, {len(status.players)} player(s) are connected"
+                interaction,
+                f"{server_label(server)} couldn't be stopped, {len(status.players)} player(s) are connected",
             )
 
     except InteractionResponded as already_responded:
         print(f"[red]{already_responded}[/red]")
 
+    except LifecycleBusyError as exc:
+        await handle_error(interaction, f"{exc}, server not stopped")
+
     except Exception as exc:
         print(f"[red]{exc}[/red]")
         await handle_error(interaction, f"an error occured, server not stopped: {exc}")
 
 
+@bot.tree.command(name=f"{prefix}stats", description="Display the sessions and pilots statistics")
+@app_commands.describe(period="sessions started in the last day, week, ...", server="all the servers by default")
+@app_commands.choices(period=[app_commands.Choice(name=period, value=period) for period in STATS_PERIODS])
+@app_commands.autocomplete(server=server_autocomplete)
+@instrumented_command
+async def stats(interaction: Interaction, period: str = "month", server: str | None = None):
+    try:
+        await on_stats(interaction, period, server)
+
+    except Exception as exc:
+        print(f"[red]{exc}[/red]")
+        await handle_error(interaction, f"an error occured, statistics not available: {exc}")
+
+
 @bot.tree.command(name=f"{prefix}list", description="List flight plans available")
-async def _list(interaction: Interaction):
-    await on_list_flight_plans(interaction)
+@app_commands.describe(
+    sort="order of the list",
+    reverse="reverse order",
+    search="only the flight plans matching a name, landscape or turn point",
+    landscape="only the flight plans of a landscape",
+    export="the whole list as an attachment",
+)
+@app_commands.choices(
+    sort=[app_commands.Choice(name=SORT_LABELS[key], value=key) for key in CATALOG_SORT_KEYS],
+    export=[app_commands.Choice(name=export_format, value=export_format) for export_format in EXPORT_FORMATS],
+)
+@instrumented_command
+async def _list(
+    interaction: Interaction,
+    sort: str = "filename",
+    reverse: bool = False,
+    search: str = "",
+    landscape: str = "",
+    export: str | None = None,
+):
+    try:
+        await on_list_flight_plans(interaction, ListQuery(sort, reverse, search, landscape), export)
+
+    except Exception as exc:
+        print(f"[red]{exc}[/red]")
+        await handle_error(interaction, f"an error occured, flight plans not listed: {exc}")
 
 
 @bot.tree.command(name=f"{prefix}show", description="Show informations about a flightplan")
-async def show(interaction: Interaction):
+@app_commands.describe(flight_plan="flight plan to show, search by name, landscape or turn point")
+@app_commands.autocomplete(flight_plan=flight_plan_autocomplete)
+@instrumented_command
+async def show(interaction: Interaction, flight_plan: str | None = None):
     try:
-        view = SelectViewFlightPlan(interaction.user)
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        if flight_plan and not get_catalog().get(flight_plan):
+            await handle_error(interaction, f"flight plan {flight_plan} not found")
+            return
+        if flight_plan:
+            await send_flight_plan(interaction, flight_plan)
+            return
+
+        view = await SelectViewFlightPlan.create(interaction.user)
         await send_response(interaction, "📋 Select a flight plan:", view=view)
         await view.wait()
         if not view.response:
@@ -147,6 +288,41 @@ async def show(interaction: Interaction):
         await handle_error(interaction, f"an error occured, server not started: {exc}")
 
 
+@bot.tree.command(name=f"{prefix}metrics", description="Display the bot metrics (admin)")
+@app_commands.default_permissions(administrator=True)
+@timed_command
+async def metrics(interaction: Interaction):
+    if interaction.channel_id != get_config().discord.admin_channel_id:
+        await handle_error(interaction, "metrics are only available in the admin channel")
+        return
+    try:
+        await on_metrics(interaction)
+
+    except Exception as exc:
+        print(f"[red]{exc}[/red]")
+        await handle_error(interaction, f"an error occured, metrics not available: {exc}")
+
+
+@bot.tree.command(name=f"{prefix}profile", description="Profile the next commands (admin)")
+@app_commands.describe(
+    interactions="number of commands to profile, 0 to stop profiling",
+    mode="profiler, the one of config.yaml by default",
+)
+@app_commands.choices(mode=[app_commands.Choice(name=mode, value=mode) for mode in PROFILING_MODES])
+@app_commands.default_permissions(administrator=True)
+@timed_command
+async def profile(interaction: Interaction, interactions: app_commands.Range[int, 0, 100] = 1, mode: str | None = None):
+    if interaction.channel_id != get_config().discord.admin_channel_id:
+        await handle_error(interaction, "profiling is only available in the admin channel")
+        return
+    try:
+        await on_profile(interaction, interactions, mode)
+
+    except Exception as exc:
+        print(f"[red]{exc}[/red]")
+        await handle_error(interaction, f"an error occured, profiling not armed: {exc}")
+
+
 @bot.event
 async def on_message(message: Message):
     config = get_config()
@@ -162,7 +338,21 @@ async def on_message(message: Message):
     await bot.process_commands(message)  # hack to propagate message to commands
 
 
+def refresh_catalog() -> None:
+    try:
+        refresh_started = time.perf_counter()
+        catalog = get_catalog()
+        catalog.refresh()
+        print(
+            f"[yellow]flight plans[/yellow]: [blue]{len(catalog.entries)}[/blue] indexed"
+            f" in {time.perf_counter() - refresh_started:.2f} s"
+        )
+    except Exception as exc:
+        print(f"[red]flight plans catalog not loaded[/red]: {exc}")
+
+
 def main():
+    startup_timer.step("imports")
     print(f"Starting Condor 3 Discord Bot - v{release.version}")
     try:
         config = get_config()
@@ -172,13 +362,30 @@ def main():
         print(f"[red]error loading configuration[/red]: {e}")
         return
 
+    if configure_metrics(config.metrics).enabled and config.metrics.http_port:
+        start_metrics_server(config.metrics.http_host, config.metrics.http_port)
+        print(
+            f"[yellow]metrics[/yellow]: [blue]http://{config.metrics.http_host}:{config.metrics.http_port}/metrics[/blue]"
+        )
+    if configure_profiling(config.profiling).remaining:
+        print(f"[yellow]profiling[/yellow]: next [blue]{config.profiling.interactions}[/blue] commands")
+    startup_timer.step("config")
+
     print(f"[yellow]admin channel[/yellow]: [blue]{config.discord.admin_channel_id}[/blue]")
+    print(f"[yellow]servers[/yellow]: [blue]{', '.join(server.name for server in config.condor_servers)}[/blue]")
     print(f"[yellow]command prefix[/yellow]: [blue]{config.command_prefix}[/blue]")
     print("[yellow]registered commands[/yellow]:")
     for command in bot.tree.get_commands():
         print(f"  - [blue]{command.name}[/blue]  {command.description}")
 
-    bot.run(config.discord.api_token)
+    # the catalog is loaded while the bot logs in
+    get_io_executor().submit(refresh_catalog)
+    try:
+        bot.run(config.discord.api_token)
+    finally:
+        if config.history.enabled:
+            get_history().close()
+        shutdown_workers()
 
 
 if __name__ == "__main__":
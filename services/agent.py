@@ -1,8 +1,27 @@
+import asyncio
+import io
 import os
-from discord import Interaction, Message, Attachment
+import time
+from discord import File, Interaction, Message
+from condor.catalog import get_catalog
 from condor.config import get_config
-from condor.flight_plan import FlightPlan, flight_plan_to_markdown, list_flight_plans, load_flight_plan
-from condor.server_manager import get_server_status, OnlineStatus
+from condor.metrics import get_metrics
+from condor.profiling import get_profiling
+from condor.flight_plan import flight_plan_to_markdown
+from condor.server_manager import OnlineStatus, ServerStatus, get_server_names
+from services.preview_cache import warm_flight_plan_preview
+from services.dialogs import FlightPlanListView, send_response
+from services.flight_plan_list import ListQuery, export_flight_plans, get_flight_plan_list
+from services.history import STATS_PERIODS, HistoryStats, get_history
+from services.status_service import get_all_statuses, get_status_service
+from services.upload_service import UploadReport, process_upload
+from services.workers import run_io
+
+# background tasks must be referenced until they are done
+background_tasks: set[asyncio.Task] = set()
+
+DISCORD_MESSAGE_LIMIT = 2000
+PREVIEW_WARM_LIMIT = 10  # previews rendered in advance after an upload, not the whole content of an archive
 
 SERVER_STATUS_ICONS = {
     OnlineStatus.OFFLINE: "❌",
@@ -13,58 +32,187 @@ SERVER_STATUS_ICONS = {
 }
 
 
-async def on_flight_plan_upload(message: Message, attachment: Attachment) -> None:
-    file_name = attachment.filename
+def format_duplicates(aliases: list[str]) -> str:
+    return f"same flight plan as {', '.join(aliases[:3])}{', ...' if len(aliases) > 3 else ''}"
 
-    print(f"a new flight plan was received: {file_name}")
 
-    local_filepath = f"{get_config().flight_plans_path}/{file_name}"
-    await attachment.save(local_filepath)
+def format_upload_report(author: str, report: UploadReport) -> str:
+    if len(report.accepted) == 1 and not report.rejected and not report.unchanged:
+        flight_plan = report.accepted[0]
+        msg = f"✅ {author} has uploaded a new flight plan:\n\n{flight_plan_to_markdown(flight_plan)}"
+        if flight_plan.filename in report.duplicates:
+            msg += f"♻️ {format_duplicates(report.duplicates[flight_plan.filename])}\n"
+        return msg
 
-    try:
-        flight_plan = load_flight_plan(local_filepath)
-
-        msg = f"✅ {message.author} has uploaded a new flight plan:\n\n"
-        msg += flight_plan_to_markdown(flight_plan)
+    lines = [f"📥 {author} has uploaded {len(report.accepted)} flight plan(s), {len(report.rejected)} refused:\n"]
+    for flight_plan in sorted(report.accepted, key=lambda fp: fp.filename.lower()):
+        line = f"✅ {flight_plan.filename} *{flight_plan.landscape} - {flight_plan.distance / 1000:.0f} km*"
+        if flight_plan.filename in report.duplicates:
+            line += f" ♻️ {format_duplicates(report.duplicates[flight_plan.filename])}"
+        lines.append(line)
+    for filename in report.unchanged:
+        lines.append(f"♻️ {filename}: already in the library")
+    for filename, reason in report.rejected:
+        lines.append(f"❌ {filename}: {reason}")
 
-        print(f"✅ flight plan [blue]{file_name}[/blue] [green]saved[/green]")
-        await message.channel.send(msg)
+    msg = ""
+    for index, line in enumerate(lines):
+        more = f"\n... and {len(lines) - index} more"
+        if len(msg) + len(line) + len(more) + 1 > DISCORD_MESSAGE_LIMIT:
+            return msg + more
+        msg += f"{line}\n"
 
-    except Exception as exc:
-        os.remove(local_filepath)
-        print(f"❌ flight plan [blue]{file_name}[/blue] [red]ignored[/red]")
-        await message.channel.send(f"your flight plan is refused: {exc}")
+    return msg
 
 
 async def on_files_upload(message: Message) -> None:
-    for attachment in message.attachments:
-        extension = ".fpl"
-        if attachment.filename.endswith(extension):
-            await on_flight_plan_upload(message, attachment)
-
-
-async def on_list_flight_plans(interaction: Interaction) -> None:
-    fpl = list_flight_plans()
-    msg = f"{'✅' if len(fpl) > 0 else '❌'} {len(fpl)} flight plans available:\n\n"
-    for fp in fpl:
-        msg += f"- {os.path.basename(fp.filename)} *{fp.landscape} - {fp.distance / 1000:.0f} km*\n"
-
-    await interaction.response.send_message(msg, ephemeral=True)
-
-
-async def on_status(interaction: Interaction) -> None:
-    try:
-        status, _ = get_server_status()
-
-        msg = f"{SERVER_STATUS_ICONS.get(status.online_status, '⁉️')} {status.online_status.name} - version {status.version}\n"
+    """All the flight plans of a message (attached, or in attached archives), then a single report message"""
+    report = await process_upload(message.attachments)
+    if not report.accepted and not report.rejected and not report.unchanged:
+        return
+
+    await message.channel.send(format_upload_report(str(message.author), report))
+
+    # first /condor-show of these flight plans will be a preview cache hit
+    for flight_plan in report.accepted[:PREVIEW_WARM_LIMIT]:
+        task = asyncio.create_task(warm_flight_plan_preview(flight_plan.filename))
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+
+async def on_list_flight_plans(interaction: Interaction, query: ListQuery, export_format: str | None = None) -> None:
+    """First page of the list (next pages are rendered on demand), or the whole list as an attachment"""
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    await run_io(get_catalog().refresh)
+
+    if export_format:
+        summaries = await run_io(get_flight_plan_list().flight_plans, query)
+        file = await run_io(export_flight_plans, summaries, export_format)
+        with file:
+            await interaction.followup.send(
+                f"📋 {len(summaries)} flight plans, {query.describe()}",
+                file=File(fp=file, filename=f"flight_plans.{export_format}"),
+                ephemeral=True,
+            )
+        return
+
+    view = await FlightPlanListView.create(interaction.user, query)
+    await interaction.followup.send(view.page.content, view=view, ephemeral=True)
+
+
+def format_status(status: ServerStatus, server_name: str | None = None) -> str:
+    msg = f"{SERVER_STATUS_ICONS.get(status.online_status, '⁉️')} {f'**{server_name}** ' if server_name else ''}"
+    msg += f"{status.online_status.name} - version {status.version}\n"
+    if status.time:
+        msg += f"**In game time**: {status.time}\n"
+    if status.stop_join_in:
+        msg += f"**Stop join in**: {status.stop_join_in}\n"
+
+    msg += f"\n{len(status.players)} connected player(s){':' if len(status.players) > 0 else ''}\n"
+    for player in status.players:
+        msg += f"\n- {player}"
+
+    return msg
+
+
+def format_all_statuses(statuses: dict[str, ServerStatus | Exception]) -> str:
+    """One line per server instance"""
+    lines = []
+    for server_name, status in statuses.items():
+        if isinstance(status, Exception):
+            lines.append(f"⁉️ **{server_name}** error: {status}")
+            continue
+
+        line = f"{SERVER_STATUS_ICONS.get(status.online_status, '⁉️')} **{server_name}** {status.online_status.name}"
+        if status.online_status != OnlineStatus.OFFLINE:
+            line += f" - {len(status.players)} player(s)"
         if status.time:
-            msg += f"**In game time**: {status.time}\n"
-        if status.stop_join_in:
-            msg += f"**Stop join in**: {status.stop_join_in}\n"
-
-        msg += f"\n{len(status.players)} connected player(s){':' if len(status.players) > 0 else ''}\n"
-        for player in status.players:
-            msg += f"\n- {player}"
+            line += f" - {status.time}"
+        lines.append(line)
+
+    return "\n".join(lines)
+
+
+def format_stats(stats: HistoryStats, period: str, server_name: str | None = None) -> str:
+    msg = f"📊 **Statistics** - {'all time' if period == 'all' else f'last {period}'}"
+    msg += f"{f' - server **{server_name}**' if server_name else ''}\n"
+    msg += f"{stats.sessions} session(s), {stats.pilots} pilot(s), {stats.flight_seconds / 3600:.1f} flight hours\n"
+
+    if stats.flight_plans:
+        msg += "\n**Flight plans** (biggest fields first):\n"
+        for flight_plan in stats.flight_plans:
+            msg += (
+                f"- {flight_plan.flight_plan or '*unknown*'}: {flight_plan.sessions} session(s),"
+                f" {flight_plan.mean_pilots:.1f} pilots per session, {flight_plan.max_pilots} max\n"
+            )
+    if stats.top_pilots:
+        msg += "\n**Pilots** (longest flight time first):\n"
+        for pilot in stats.top_pilots:
+            msg += f"- {pilot.player}: {pilot.flights} flight(s), {pilot.flight_seconds / 3600:.1f} h\n"
+
+    return msg[:DISCORD_MESSAGE_LIMIT]
+
+
+async def on_stats(interaction: Interaction, period: str, server_name: str | None = None) -> None:
+    """Sessions, pilots and flight plans statistics of a period, from the history rollups"""
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    if period not in STATS_PERIODS:
+        raise ValueError(f"unknown period {period}, expected one of {', '.join(STATS_PERIODS)}")
+    if server_name is not None:
+        server_name = get_config().get_server(server_name).name
+
+    days = STATS_PERIODS[period]
+    since = time.time() - days * 86400 if days else None
+    stats = await run_io(get_history().store.stats, since, server_name)
+    await send_response(interaction, format_stats(stats, period, server_name))
+
+
+async def on_metrics(interaction: Interaction) -> None:
+    """Summary of the metrics, and all of them in the Prometheus text format as an attachment"""
+    metrics = get_metrics()
+    if not metrics.enabled:
+        await interaction.response.send_message("❌ metrics are disabled, see metrics in config.yaml", ephemeral=True)
+        return
+
+    summary = metrics.summary() or "no metrics recorded yet"
+    more = "\n..."
+    if len(summary) > DISCORD_MESSAGE_LIMIT - 10:
+        summary = summary[: DISCORD_MESSAGE_LIMIT - 10 - len(more)].rsplit("\n", 1)[0] + more
+    file = File(fp=io.BytesIO(metrics.render().encode("utf-8")), filename="metrics.txt")
+    await interaction.response.send_message(f"```\n{summary}\n```", file=file, ephemeral=True)
+
+
+async def on_profile(interaction: Interaction, interactions: int, mode: str | None = None) -> None:
+    """Arm the profiling of the next commands, the summary of the last profile is attached"""
+    profiling = get_profiling()
+    profiling.arm(interactions, mode)
+    if interactions:
+        msg = f"🔬 next {interactions} command(s) profiled ({profiling.config.mode})"
+    else:
+        msg = "🔬 profiling stopped"
+    msg += f", profiles in `{os.path.abspath(profiling.config.output_path)}`"
+
+    files = []
+    if profiling.reports:
+        msg += "\nlast profiles:\n" + "\n".join(
+            f"- {report.name}: {report.duration:.3f} s, `{os.path.basename(report.summary_path)}`"
+            for report in profiling.reports[-5:]
+        )
+        last = profiling.reports[-1]
+        if os.path.isfile(last.summary_path):
+            files.append(File(fp=last.summary_path, filename=os.path.basename(last.summary_path)))
+    await interaction.response.send_message(msg, files=files, ephemeral=True)
+
+
+async def on_status(interaction: Interaction, server_name: str | None = None) -> None:
+    """Status of a server, or of all the servers if several are configured"""
+    try:
+        server_names = get_server_names()
+        if server_name is None and len(server_names) > 1:
+            msg = format_all_statuses(await get_all_statuses())
+        else:
+            status = await get_status_service(server_name).get_status()
+            msg = format_status(status, server_name if len(server_names) > 1 else None)
 
         await interaction.response.send_message(msg, ephemeral=True)
 
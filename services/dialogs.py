@@ -1,9 +1,15 @@
 from abc import abstractmethod
+from dataclasses import replace
 from io import BytesIO
-from discord import ui, Member, SelectOption, Interaction, File
+from discord import app_commands, ui, ButtonStyle, Member, SelectOption, Interaction, File
 from discord.integrations import MISSING
-from condor.flight_plan import flight_plan_to_markdown, get_flight_plan_path, list_flight_plans, load_flight_plan
-from services.flight_plan_service import get_image_of_flight_plan
+from condor.catalog import FlightPlanSummary, get_catalog, list_flight_plan_summaries
+from condor.flight_plan import flight_plan_to_markdown, get_flight_plan_path, load_flight_plan
+from condor.server_manager import get_server_names
+from services.flight_plan_list import SORT_LABELS, ListPage, ListQuery, get_flight_plan_list
+from services.preview_cache import get_flight_plan_preview
+from services.preview_encoding import image_extension
+from services.workers import run_io
 
 
 async def send_response(
@@ -16,11 +22,14 @@ async def send_response(
     view: ui.View | None = MISSING,
     follow_up: bool = False,
 ) -> None:
-    """Send a response either ephemerally via the interaction or publicly via the channel."""
+    """Send a response either ephemerally via the interaction or publicly via the channel.
+
+    Once the interaction is answered (or deferred), responses are sent as follow-up messages.
+    """
     if channel_message:
         await interaction.channel.send(content)
-    elif follow_up:
-        await interaction.followup.send(content, ephemeral=True, username=interaction.user.display_name)
+    elif follow_up or interaction.response.is_done():
+        await interaction.followup.send(content, ephemeral=True, username=interaction.user.display_name, view=view)
     else:
         await interaction.response.send_message(content, ephemeral=ephemeral, delete_after=delete_after, view=view)
 
@@ -30,7 +39,12 @@ async def handle_error(interaction: Interaction, error_msg: str) -> None:
     await send_response(interaction, f"❌ {error_msg}", ephemeral=True)
 
 
-def select_flight_plans_from_list() -> ui.Select:
+DISCORD_SELECT_LIMIT = 25  # options of a select menu, choices of an autocomplete
+
+
+def select_flight_plans_from_list(flight_plans: list[FlightPlanSummary]) -> ui.Select:
+    """Select menu of the flight plans, only the first ones if there are more than discord allows"""
+    flight_plans = flight_plans[:DISCORD_SELECT_LIMIT]
     return ui.Select(
         placeholder="Select a flight plan...",
         min_values=1,
@@ -41,21 +55,26 @@ def select_flight_plans_from_list() -> ui.Select:
                 value=fp.filename,
                 description=f"{fp.landscape} - {fp.distance / 1000:.0f} km",
             )
-            for fp in list_flight_plans()
+            for fp in flight_plans
         ],
     )
 
 
 class SelectFlightPlanViewAbstract(ui.View):
-    def __init__(self, user: Member):
+    def __init__(self, user: Member, flight_plans: list[FlightPlanSummary]):
         super().__init__()
         self.user = user
         self.response: str | None = None
 
-        self.select_menu = select_flight_plans_from_list()
+        self.select_menu = select_flight_plans_from_list(flight_plans)
         self.select_menu.callback = self.select_callback
         self.add_item(self.select_menu)
 
+    @classmethod
+    async def create(cls, user: Member) -> "SelectFlightPlanViewAbstract":
+        """Build the view, the flight plans catalog is refreshed in the I/O workers"""
+        return cls(user, await run_io(list_flight_plan_summaries))
+
     @abstractmethod
     async def select_callback(self, interaction: Interaction): ...
 
@@ -77,23 +96,102 @@ class SelectViewFlightPlan(SelectFlightPlanViewAbstract):
             return
         self.response = self.select_menu.values[0]
 
-        flight_plan = load_flight_plan(get_flight_plan_path(self.response))
-
-        msg = flight_plan_to_markdown(flight_plan)
-        file = MISSING
-
-        try:
-            image = get_image_of_flight_plan(flight_plan)
-            image_bytes = BytesIO()
-            image.save(image_bytes, format="PNG")
-            image_bytes.seek(0)
-            file = File(fp=image_bytes, filename="flight_plan.png")
-        except Exception as exc:
-            msg += f"*flight plan preview failed*: {exc}"
+        # loading and rendering can take a while
+        await interaction.response.defer()
 
         # remove original message
-        await interaction.response.defer()
         await interaction.delete_original_response()
 
-        await interaction.followup.send(msg, file=file, ephemeral=True)
+        await send_flight_plan(interaction, self.response)
         self.stop()
+
+
+async def send_flight_plan(interaction: Interaction, flight_plan_filename: str) -> None:
+    """Flight plan details and preview, as a follow-up of a deferred interaction"""
+    flight_plan = await run_io(load_flight_plan, get_flight_plan_path(flight_plan_filename), trusted=True)
+
+    msg = flight_plan_to_markdown(flight_plan)
+    file = MISSING
+
+    try:
+        data = await get_flight_plan_preview(flight_plan)
+        file = File(fp=BytesIO(data), filename=f"flight_plan.{image_extension(data)}")
+    except Exception as exc:
+        msg += f"*flight plan preview failed*: {exc}"
+
+    await interaction.followup.send(msg, file=file, ephemeral=True)
+
+
+async def flight_plan_autocomplete(interaction: Interaction, current: str) -> list[app_commands.Choice[str]]:
+    """Flight plans matching what the user typed so far (name, landscape or turnpoint names)"""
+    return [
+        app_commands.Choice(
+            name=f"{fp.human_filename} - {fp.landscape} - {fp.distance / 1000:.0f} km"[:100], value=fp.filename
+        )
+        for fp in get_catalog().search(current, limit=DISCORD_SELECT_LIMIT)
+    ]
+
+
+async def server_autocomplete(interaction: Interaction, current: str) -> list[app_commands.Choice[str]]:
+    """Server instances names (see condor_servers in config.yaml)"""
+    return [
+        app_commands.Choice(name=name, value=name) for name in get_server_names() if current.lower() in name.lower()
+    ][:DISCORD_SELECT_LIMIT]
+
+
+class FlightPlanListView(ui.View):
+    """Pages of the flight plans list, with previous/next buttons and the sort order"""
+
+    def __init__(self, user: Member, query: ListQuery, page: ListPage):
+        super().__init__()
+        self.user = user
+        self.query = query
+        self.page = page
+
+        self.sort_menu = ui.Select(
+            placeholder="Sort by...",
+            options=[
+                SelectOption(label=f"sort by {label}", value=key, default=key == query.sort)
+                for key, label in SORT_LABELS.items()
+            ],
+            row=1,
+        )
+        self.sort_menu.callback = self.sort_callback
+        self.add_item(self.sort_menu)
+        self._update_buttons()
+
+    @classmethod
+    async def create(cls, user: Member, query: ListQuery) -> "FlightPlanListView":
+        return cls(user, query, await run_io(get_flight_plan_list().page, query, 0))
+
+    def _update_buttons(self) -> None:
+        self.previous_page.disabled = not self.page.has_previous
+        self.next_page.disabled = not self.page.has_next
+
+    async def show(self, interaction: Interaction, query: ListQuery, number: int) -> None:
+        if interaction.user != self.user:
+            await send_response(interaction, "You are not granted to answer !")
+            return
+
+        self.query = query
+        self.page = await run_io(get_flight_plan_list().page, query, number)
+        self._update_buttons()
+        await interaction.response.edit_message(content=self.page.content, view=self)
+
+    @ui.button(label="◀", style=ButtonStyle.secondary)
+    async def previous_page(self, interaction: Interaction, button: ui.Button):
+        await self.show(interaction, self.query, self.page.number - 1)
+
+    @ui.button(label="▶", style=ButtonStyle.secondary)
+    async def next_page(self, interaction: Interaction, button: ui.Button):
+        await self.show(interaction, self.query, self.page.number + 1)
+
+    @ui.button(label="⇅", style=ButtonStyle.secondary)
+    async def reverse_order(self, interaction: Interaction, button: ui.Button):
+        await self.show(interaction, replace(self.query, reverse=not self.query.reverse), 0)
+
+    async def sort_callback(self, interaction: Interaction):
+        sort = self.sort_menu.values[0]
+        for option in self.sort_menu.options:
+            option.default = option.value == sort
+        await self.show(interaction, replace(self.query, sort=sort), 0)
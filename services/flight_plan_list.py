@@ -0,0 +1,184 @@
+"""Paginated flight plans list (/condor-list)
+
+Only the page requested is rendered, from the catalog sorted and filtered once per query. Rendered pages are cached
+until the catalog changes (catalog generation). The whole list can also be exported as CSV or JSON, written row by row
+to a temporary file (kept in memory while small) to be sent as an attachment.
+"""
+
+import csv
+import io
+import json
+import math
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cache
+from typing import IO
+
+from condor.catalog import CATALOG_SORT_KEYS, FlightPlanCatalog, FlightPlanSummary, get_catalog
+
+LIST_PAGE_SIZE = 15
+LIST_LINE_LIMIT = 120  # 15 lines and the header fit in a discord message
+LIST_CACHED_QUERIES = 16
+LIST_CACHED_PAGES = 256
+
+EXPORT_FORMATS = ("csv", "json")
+EXPORT_FIELDS = ("filename", "landscape", "distance", "turnpoints_count", "longest_leg", "version", "size", "sha256")
+EXPORT_SPOOL_BYTES = 4 * 2**20  # larger exports are written to disk
+
+SORT_LABELS = {
+    "filename": "name",
+    "landscape": "landscape",
+    "distance": "distance",
+    "turnpoints_count": "turn points",
+    "longest_leg": "longest leg",
+}
+
+
+@dataclass(frozen=True)
+class ListQuery:
+    sort: str = "filename"
+    reverse: bool = False
+    search: str = ""  # name, landscape or turnpoint names (see condor.search_index)
+    landscape: str = ""
+
+    def __post_init__(self) -> None:
+        if self.sort not in CATALOG_SORT_KEYS:
+            raise ValueError(f"unknown sort key {self.sort}, expected one of {', '.join(CATALOG_SORT_KEYS)}")
+
+    def describe(self) -> str:
+        description = f"sorted by {SORT_LABELS[self.sort]}{' (reverse)' if self.reverse else ''}"
+        if self.landscape:
+            description += f", landscape {self.landscape}"
+        if self.search:
+            description += f", matching '{self.search}'"
+        return description
+
+
+@dataclass(frozen=True)
+class ListPage:
+    number: int  # from 0
+    pages: int
+    total: int
+    content: str
+
+    @property
+    def has_previous(self) -> bool:
+        return self.number > 0
+
+    @property
+    def has_next(self) -> bool:
+        return self.number < self.pages - 1
+
+
+def format_list_line(position: int, summary: FlightPlanSummary) -> str:
+    line = f"{position}. {summary.filename} *{summary.landscape} - {summary.distance / 1000:.0f} km*"
+    if len(line) > LIST_LINE_LIMIT:
+        line = f"{position}. {summary.filename[: LIST_LINE_LIMIT - 30]}… *{summary.distance / 1000:.0f} km*"
+    return line
+
+
+class FlightPlanList:
+    """Flight plans of the catalog by query, and their rendered pages, as long as the catalog doesn't change"""
+
+    def __init__(self, catalog: FlightPlanCatalog, page_size: int = LIST_PAGE_SIZE):
+        self.catalog = catalog
+        self.page_size = page_size
+        self._generation = catalog.generation
+        self._queries: OrderedDict[ListQuery, list[FlightPlanSummary]] = OrderedDict()
+        self._pages: OrderedDict[tuple[ListQuery, int], ListPage] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _invalidate_if_changed(self) -> None:
+        if self.catalog.generation != self._generation:
+            self._generation = self.catalog.generation
+            self._queries.clear()
+            self._pages.clear()
+
+    def _filter(self, query: ListQuery) -> list[FlightPlanSummary]:
+        summaries = self.catalog.list(query.sort, query.reverse)
+        if query.landscape:
+            landscape = query.landscape.lower()
+            summaries = [summary for summary in summaries if (summary.landscape or "").lower() == landscape]
+        if query.search:
+            matching = {summary.filename for summary in self.catalog.search(query.search, len(self.catalog.entries))}
+            summaries = [summary for summary in summaries if summary.filename in matching]
+        return summaries
+
+    def _flight_plans(self, query: ListQuery) -> list[FlightPlanSummary]:
+        self._invalidate_if_changed()
+        summaries = self._queries.get(query)
+        if summaries is None:
+            summaries = self._queries[query] = self._filter(query)
+            while len(self._queries) > LIST_CACHED_QUERIES:
+                self._queries.popitem(last=False)
+        self._queries.move_to_end(query)
+        return summaries
+
+    def flight_plans(self, query: ListQuery) -> list[FlightPlanSummary]:
+        """Flight plans matching the query, in its order"""
+        with self._lock:
+            return self._flight_plans(query)
+
+    def page(self, query: ListQuery, number: int = 0) -> ListPage:
+        """A page of the list (the last one if number is too large)"""
+        with self._lock:
+            summaries = self._flight_plans(query)
+            generation = self._generation
+            pages = max(math.ceil(len(summaries) / self.page_size), 1)
+            number = min(max(number, 0), pages - 1)
+
+            page = self._pages.get((query, number))
+            if page is not None:
+                self._pages.move_to_end((query, number))
+                return page
+
+        start = number * self.page_size
+        lines = [f"{'✅' if summaries else '❌'} {len(summaries)} flight plans available, {query.describe()}:\n"]
+        lines += [
+            format_list_line(start + offset + 1, summary)
+            for offset, summary in enumerate(summaries[start : start + self.page_size])
+        ]
+        if pages > 1:
+            lines.append(f"\n*page {number + 1}/{pages}*")
+        page = ListPage(number=number, pages=pages, total=len(summaries), content="\n".join(lines))
+
+        with self._lock:
+            # the catalog may have changed while rendering, the page is only cached if it is still current
+            if generation == self._generation == self.catalog.generation:
+                self._pages[(query, number)] = page
+                while len(self._pages) > LIST_CACHED_PAGES:
+                    self._pages.popitem(last=False)
+
+        return page
+
+
+def export_flight_plans(summaries: list[FlightPlanSummary], export_format: str) -> IO[bytes]:
+    """The flight plans as a CSV or JSON file, written one flight plan at a time, rewound for reading"""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"unknown export format {export_format}, expected one of {', '.join(EXPORT_FORMATS)}")
+
+    file = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES)
+    text = io.TextIOWrapper(file, encoding="utf-8", newline="")
+    if export_format == "csv":
+        writer = csv.writer(text)
+        writer.writerow(EXPORT_FIELDS)
+        for summary in summaries:
+            writer.writerow([getattr(summary, field) for field in EXPORT_FIELDS])
+    else:
+        text.write("[")
+        for index, summary in enumerate(summaries):
+            row = {field: getattr(summary, field) for field in EXPORT_FIELDS}
+            text.write(f"{',' if index else ''}\n{json.dumps(row)}")
+        text.write("\n]\n")
+
+    text.flush()
+    text.detach()
+    file.seek(0)
+    return file
+
+
+@cache
+def get_flight_plan_list() -> FlightPlanList:
+    return FlightPlanList(get_catalog())
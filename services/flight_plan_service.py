@@ -1,29 +1,62 @@
 from PIL import Image, ImageDraw
-from rich import print
+from condor.config import get_config
 from condor.flight_plan import FlightPlan, get_landscape_image_filepath
+from services.landscape_bitmap import open_bitmap
+from services.landscape_pyramid import choose_level, get_landscape_pyramid, level_size
+from services.preview_encoding import EncodedPreview, EncodeOptions, encode_preview
 
 IMAGE_BORDER_PIXELS = 50
 FLIGHT_PLAN_PATH_COLOR = (255, 0, 0)
 
 
-def transpose_map_xy(image_size: tuple[int, int], x: float, y: float) -> tuple[int, int]:
-    return ((image_size[0] - 1 - int(x / 90)), image_size[1] - 1 - int(y / 90))
+def transpose_map_xy(image_size: tuple[int, int], x: float, y: float, level: int = 0) -> tuple[int, int]:
+    """Landscape position to pixel in the landscape image (image_size) or in one of its pyramid levels"""
+    return ((image_size[0] - 1 - int(x / 90)) >> level, (image_size[1] - 1 - int(y / 90)) >> level)
 
 
-def get_image_of_flight_plan(flight_plan: FlightPlan) -> Image:
-    image = Image.open(get_landscape_image_filepath(flight_plan.landscape))
+def get_flight_plan_area(image_size: tuple[int, int], points: list[tuple[int, int]]) -> tuple[int, int, int, int]:
+    """Bounding box of the flight plan on the landscape image, with a border"""
+    return (
+        max(min(p[0] for p in points) - IMAGE_BORDER_PIXELS, 0),
+        max(min(p[1] for p in points) - IMAGE_BORDER_PIXELS, 0),
+        min(max(p[0] for p in points) + IMAGE_BORDER_PIXELS, image_size[0] - 1),
+        min(max(p[1] for p in points) + IMAGE_BORDER_PIXELS, image_size[1] - 1),
+    )
 
-    draw = ImageDraw.Draw(image)
 
-    points = [transpose_map_xy(image.size, tp.pos_x, tp.pos_y) for tp in flight_plan.turnpoints]
+def get_image_of_flight_plan(flight_plan: FlightPlan, max_size: int = 0) -> Image:
+    """Landscape area of the flight plan with the task drawn on it.
 
-    draw.line(points, width=5, fill=FLIGHT_PLAN_PATH_COLOR)
+    With max_size, a lower resolution level of the landscape pyramid is used when the area doesn't fit in
+    max_size x max_size pixels.
+    """
+    # only the flight plan area of the landscape bitmap is decoded
+    with open_bitmap(get_landscape_image_filepath(flight_plan.landscape)) as bitmap:
+        landscape_size = bitmap.size
+        points = [transpose_map_xy(landscape_size, tp.pos_x, tp.pos_y) for tp in flight_plan.turnpoints]
+        area = get_flight_plan_area(landscape_size, points)
+
+        level = choose_level((area[2] - area[0], area[3] - area[1]), max_size, levels=32)
+        if level == 0:
+            image = bitmap.read_region(area)
+
+    if level > 0:
+        pyramid = get_landscape_pyramid(flight_plan.landscape)
+        level = min(level, pyramid.levels)
+        points = [transpose_map_xy(landscape_size, tp.pos_x, tp.pos_y, level) for tp in flight_plan.turnpoints]
+        area = get_flight_plan_area(level_size(landscape_size, level), points)
+        image = pyramid.read_region(level, area)
+
+    draw = ImageDraw.Draw(image)
+    draw.line([(x - area[0], y - area[1]) for x, y in points], width=5, fill=FLIGHT_PLAN_PATH_COLOR)
+
+    return image
 
-    area = (
-        max(min(p[0] for p in points) - IMAGE_BORDER_PIXELS, 0),
-        max(min(p[1] for p in points) - IMAGE_BORDER_PIXELS, 0),
-        min(max(p[0] for p in points) + IMAGE_BORDER_PIXELS, image.size[0] - 1),
-        min(max(p[1] for p in points) + IMAGE_BORDER_PIXELS, image.size[1] - 1),
-    )
 
-    return image.crop(area)
+def render_flight_plan_preview(
+    flight_plan: FlightPlan, max_size: int = 0, options: EncodeOptions | None = None
+) -> EncodedPreview:
+    """Preview image of the flight plan, encoded within the byte budget and dimensions of the options (from config)"""
+    if options is None:
+        options = EncodeOptions.from_config(get_config().preview)
+    return encode_preview(get_image_of_flight_plan(flight_plan, max_size=max_size), options)
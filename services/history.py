@@ -0,0 +1,330 @@
+"""History of the servers sessions and of their players, for /condor-stats
+
+Sessions (from the server start to its stop, with the flight plan started by the bot) and player intervals (from a
+player join to its leave) are built from the consecutive status snapshots, in memory. Finished sessions are appended to
+a SQLite database in batches, by the I/O threads: polling never waits for the disk.
+
+Each session also updates daily rollups (per day, server and flight plan, and per day, server and pilot), so the
+statistics of months of sessions are aggregated from a few hundred rows. Sessions still open when the bot stops are
+recorded as ended at the bot stop.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from functools import cache
+
+from condor.config import get_config
+from condor.server_manager import OnlineStatus, ServerStatus
+from services.workers import run_io
+
+logger = logging.getLogger("history")
+
+SCHEMA_VERSION = 1
+SESSION_STATUSES = {OnlineStatus.JOINING_ENABLED, OnlineStatus.RACE_IN_PROGRESS, OnlineStatus.JOINING_DISABLED}
+STATS_PERIODS = {"day": 1, "week": 7, "month": 30, "year": 365, "all": None}  # days
+MAX_PENDING_SESSIONS = 10_000  # kept in memory while the database can't be written
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    server TEXT NOT NULL,
+    flight_plan TEXT NOT NULL,  -- empty when not started by the bot
+    started REAL NOT NULL,
+    ended REAL NOT NULL,
+    pilots INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_started ON sessions (started);
+CREATE TABLE IF NOT EXISTS player_intervals (
+    session_id INTEGER NOT NULL REFERENCES sessions (id),
+    player TEXT NOT NULL,
+    joined REAL NOT NULL,
+    left REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS player_intervals_session ON player_intervals (session_id);
+CREATE TABLE IF NOT EXISTS daily_flight_plans (
+    day TEXT NOT NULL,
+    server TEXT NOT NULL,
+    flight_plan TEXT NOT NULL,
+    sessions INTEGER NOT NULL,
+    pilots INTEGER NOT NULL,
+    max_pilots INTEGER NOT NULL,
+    session_seconds REAL NOT NULL,
+    PRIMARY KEY (day, server, flight_plan)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS daily_pilots (
+    day TEXT NOT NULL,
+    server TEXT NOT NULL,
+    player TEXT NOT NULL,
+    flights INTEGER NOT NULL,
+    flight_seconds REAL NOT NULL,
+    PRIMARY KEY (day, server, player)
+) WITHOUT ROWID;
+"""
+
+
+def day_of(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime(timestamp))
+
+
+@dataclass
+class PlayerInterval:
+    player: str
+    joined: float
+    left: float
+
+
+@dataclass
+class SessionRecord:
+    server: str
+    flight_plan: str | None
+    started: float
+    ended: float
+    intervals: list[PlayerInterval]
+
+    @property
+    def pilots(self) -> dict[str, float]:
+        """Flight time of each pilot of the session"""
+        pilots: dict[str, float] = {}
+        for interval in self.intervals:
+            pilots[interval.player] = pilots.get(interval.player, 0.0) + interval.left - interval.joined
+        return pilots
+
+
+@dataclass
+class OpenSession:
+    server: str
+    flight_plan: str | None
+    started: float
+    players: dict[str, float] = field(default_factory=dict)  # connected players, and when they joined
+    intervals: list[PlayerInterval] = field(default_factory=list)
+
+    def end(self, ended: float) -> SessionRecord:
+        for player, joined in self.players.items():
+            self.intervals.append(PlayerInterval(player, joined, ended))
+        self.players.clear()
+        return SessionRecord(self.server, self.flight_plan, self.started, ended, self.intervals)
+
+
+@dataclass
+class FlightPlanStats:
+    flight_plan: str
+    sessions: int
+    pilots: int  # sum of the pilots of each session
+    max_pilots: int
+
+    @property
+    def mean_pilots(self) -> float:
+        return self.pilots / self.sessions if self.sessions else 0.0
+
+
+@dataclass
+class PilotStats:
+    player: str
+    flights: int
+    flight_seconds: float
+
+
+@dataclass
+class HistoryStats:
+    sessions: int
+    session_seconds: float
+    pilots: int  # distinct
+    flight_seconds: float
+    flight_plans: list[FlightPlanStats]  # biggest fields first
+    top_pilots: list[PilotStats]  # longest flight time first
+
+
+class HistoryStore:
+    """SQLite database of the finished sessions, opened on first use (one connection, used by one thread at a time)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                connection.executescript(SCHEMA)
+                connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            self._connection = connection
+        return self._connection
+
+    def write(self, records: list[SessionRecord]) -> None:
+        """Append finished sessions and update the rollups, in a single transaction"""
+        with self._lock, self._connect() as connection:
+            for record in records:
+                pilots = record.pilots
+                session_id = connection.execute(
+                    "INSERT INTO sessions (server, flight_plan, started, ended, pilots) VALUES (?, ?, ?, ?, ?)",
+                    (record.server, record.flight_plan or "", record.started, record.ended, len(pilots)),
+                ).lastrowid
+                connection.executemany(
+                    "INSERT INTO player_intervals (session_id, player, joined, left) VALUES (?, ?, ?, ?)",
+                    [(session_id, interval.player, interval.joined, interval.left) for interval in record.intervals],
+                )
+
+                day = day_of(record.started)
+                connection.execute(
+                    "INSERT INTO daily_flight_plans VALUES (?, ?, ?, 1, ?, ?, ?)"
+                    " ON CONFLICT (day, server, flight_plan) DO UPDATE SET"
+                    " sessions = sessions + 1, pilots = pilots + excluded.pilots,"
+                    " max_pilots = max(max_pilots, excluded.max_pilots),"
+                    " session_seconds = session_seconds + excluded.session_seconds",
+                    (
+                        day,
+                        record.server,
+                        record.flight_plan or "",
+                        len(pilots),
+                        len(pilots),
+                        record.ended - record.started,
+                    ),
+                )
+                connection.executemany(
+                    "INSERT INTO daily_pilots VALUES (?, ?, ?, 1, ?)"
+                    " ON CONFLICT (day, server, player) DO UPDATE SET"
+                    " flights = flights + 1, flight_seconds = flight_seconds + excluded.flight_seconds",
+                    [(day, record.server, player, seconds) for player, seconds in pilots.items()],
+                )
+
+    def stats(self, since: float | None = None, server: str | None = None, top: int = 5) -> HistoryStats:
+        """Aggregates of the sessions started since this time (days granularity), from the daily rollups"""
+        where = "WHERE day >= ?"
+        params: list = [day_of(since) if since is not None else ""]
+        if server is not None:
+            where += " AND server = ?"
+            params.append(server)
+
+        with self._lock:
+            connection = self._connect()
+            sessions, session_seconds = connection.execute(
+                f"SELECT COALESCE(SUM(sessions), 0), COALESCE(SUM(session_seconds), 0) FROM daily_flight_plans {where}",
+                params,
+            ).fetchone()
+            pilots, flight_seconds = connection.execute(
+                f"SELECT COUNT(DISTINCT player), COALESCE(SUM(flight_seconds), 0) FROM daily_pilots {where}", params
+            ).fetchone()
+            flight_plans = connection.execute(
+                f"SELECT flight_plan, SUM(sessions), SUM(pilots), MAX(max_pilots) FROM daily_flight_plans {where}"
+                " GROUP BY flight_plan ORDER BY SUM(pilots) DESC, flight_plan LIMIT ?",
+                [*params, top],
+            ).fetchall()
+            top_pilots = connection.execute(
+                f"SELECT player, SUM(flights), SUM(flight_seconds) FROM daily_pilots {where}"
+                " GROUP BY player ORDER BY SUM(flight_seconds) DESC, player LIMIT ?",
+                [*params, top],
+            ).fetchall()
+
+        return HistoryStats(
+            sessions=sessions,
+            session_seconds=session_seconds,
+            pilots=pilots,
+            flight_seconds=flight_seconds,
+            flight_plans=[FlightPlanStats(*row) for row in flight_plans],
+            top_pilots=[PilotStats(*row) for row in top_pilots],
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class HistoryRecorder:
+    """Sessions and player intervals from the status snapshots of each server, written in batches"""
+
+    def __init__(
+        self,
+        store: HistoryStore,
+        flush_interval: float = 60.0,
+        flush_sessions: int = 20,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.flush_sessions = flush_sessions
+        self.clock = clock
+        self.sessions: dict[str, OpenSession] = {}  # by server name
+        self.started_flight_plans: dict[str, str] = {}  # by server name, until its session opens
+        self.pending: list[SessionRecord] = []
+        self.last_flush = clock()
+        self._flush_task: asyncio.Task | None = None
+
+    def record_start(self, server: str, flight_plan: str) -> None:
+        """The bot started the server with this flight plan"""
+        self.started_flight_plans[server] = flight_plan
+
+    def observe(self, server: str, status: ServerStatus) -> None:
+        """Compare a status snapshot with the previous one: sessions opened or closed, players joined or left"""
+        now = self.clock()
+        running = status.online_status in SESSION_STATUSES
+        session = self.sessions.get(server)
+        if session is None:
+            if not running:
+                return
+            session = self.sessions[server] = OpenSession(server, self.started_flight_plans.pop(server, None), now)
+
+        if not running:
+            self.pending.append(self.sessions.pop(server).end(now))
+        else:
+            players = set(status.players)
+            for player in players.difference(session.players):
+                session.players[player] = now
+            for player in [player for player in session.players if player not in players]:
+                session.intervals.append(PlayerInterval(player, session.players.pop(player), now))
+
+        self.schedule_flush(now)
+
+    def schedule_flush(self, now: float) -> None:
+        if not self.pending or (self._flush_task is not None and not self._flush_task.done()):
+            return
+        if len(self.pending) < self.flush_sessions and now - self.last_flush < self.flush_interval:
+            return
+        try:
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+        except RuntimeError:
+            pass  # no event loop, written by the next flush
+
+    async def flush(self) -> None:
+        """Write the finished sessions in the I/O threads"""
+        batch, self.pending = self.pending, []
+        self.last_flush = self.clock()
+        if not batch:
+            return
+        try:
+            await run_io(self.store.write, batch)
+        except (sqlite3.Error, OSError) as exc:
+            logger.warning(f"{len(batch)} session(s) not written to the history: {exc}")
+            self.pending = (batch + self.pending)[-MAX_PENDING_SESSIONS:]
+
+    def close(self) -> None:
+        """End the open sessions and write everything (blocking, when the bot stops)"""
+        now = self.clock()
+        self.pending += [session.end(now) for session in self.sessions.values()]
+        self.sessions.clear()
+        if self.pending:
+            self.store.write(self.pending)
+            self.pending = []
+        self.store.close()
+
+
+@cache
+def get_history() -> HistoryRecorder:
+    config = get_config()
+
+    return HistoryRecorder(
+        HistoryStore(os.path.join(config.cache_path, config.history.path)),
+        flush_interval=config.history.flush_interval,
+        flush_sessions=config.history.flush_sessions,
+    )
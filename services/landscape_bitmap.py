@@ -0,0 +1,152 @@
+"""Region reads of Condor landscape bitmaps
+
+A landscape .bmp is an uncompressed bitmap of several hundred megabytes once decoded. The file is memory mapped and
+only the rows and columns of the requested region are decoded, so memory usage depends on the region size, not on
+the landscape size.
+"""
+
+import mmap
+import struct
+
+from PIL import Image
+
+BMP_SIGNATURE = b"BM"
+BI_RGB = 0
+BI_BITFIELDS = 3
+
+# bits per pixel => (PIL mode, PIL raw mode)
+RAW_MODES = {
+    8: ("P", "P"),
+    24: ("RGB", "BGR"),
+    32: ("RGB", "BGRX"),
+}
+
+
+class UnsupportedBitmapError(ValueError):
+    pass
+
+
+class LandscapeBitmap:
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self._file = open(filepath, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._parse_header()
+        except Exception:
+            self.close()
+            raise
+
+    def _parse_header(self) -> None:
+        if self._map[:2] != BMP_SIGNATURE:
+            raise UnsupportedBitmapError(f"{self.filepath} is not a bitmap file")
+
+        (self.pixels_offset,) = struct.unpack_from("<I", self._map, 10)
+        (dib_header_size,) = struct.unpack_from("<I", self._map, 14)
+        if dib_header_size < 40:
+            raise UnsupportedBitmapError(f"{self.filepath}: unsupported bitmap header ({dib_header_size} bytes)")
+
+        width, height, _, bits_per_pixel, compression = struct.unpack_from("<iiHHI", self._map, 18)
+        if bits_per_pixel not in RAW_MODES:
+            raise UnsupportedBitmapError(f"{self.filepath}: unsupported {bits_per_pixel} bits per pixel")
+        if compression != BI_RGB and not (compression == BI_BITFIELDS and bits_per_pixel == 32):
+            raise UnsupportedBitmapError(f"{self.filepath}: compressed bitmaps are not supported")
+
+        self.width = width
+        self.height = abs(height)
+        self.top_down = height < 0
+        self.bits_per_pixel = bits_per_pixel
+        self.row_stride = ((width * bits_per_pixel + 31) // 32) * 4
+
+        self.palette: list[int] | None = None
+        if bits_per_pixel == 8:
+            (colors,) = struct.unpack_from("<I", self._map, 46)
+            colors = colors or 256
+            palette_offset = 14 + dib_header_size
+            self.palette = []
+            for i in range(colors):
+                blue, green, red = self._map[palette_offset + i * 4 : palette_offset + i * 4 + 3]
+                self.palette.extend((red, green, blue))
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return self.width, self.height
+
+    def read_region(self, box: tuple[int, int, int, int]) -> Image.Image:
+        """Decode the (left, top, right, bottom) region, right and bottom excluded (like Image.crop)"""
+        left, top, right, bottom = (
+            max(box[0], 0),
+            max(box[1], 0),
+            min(box[2], self.width),
+            min(box[3], self.height),
+        )
+        if right <= left or bottom <= top:
+            raise ValueError(f"empty region {box} for a {self.width}x{self.height} bitmap")
+
+        bytes_per_pixel = self.bits_per_pixel // 8
+        column_start = left * bytes_per_pixel
+        column_end = right * bytes_per_pixel
+
+        # rows are stored bottom-up, unless the height is negative
+        if self.top_down:
+            first_row, last_row = top, bottom
+        else:
+            first_row, last_row = self.height - bottom, self.height - top
+
+        rows = []
+        for row in range(first_row, last_row):
+            row_offset = self.pixels_offset + row * self.row_stride
+            rows.append(self._map[row_offset + column_start : row_offset + column_end])
+
+        mode, raw_mode = RAW_MODES[self.bits_per_pixel]
+        orientation = 1 if self.top_down else -1
+        image = Image.frombytes(mode, (right - left, bottom - top), b"".join(rows), "raw", raw_mode, 0, orientation)
+
+        if self.palette is not None:
+            image.putpalette(self.palette)
+            image = image.convert("RGB")
+
+        return image
+
+    def close(self) -> None:
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self) -> "LandscapeBitmap":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class PillowBitmap:
+    """Same interface as LandscapeBitmap for the formats it doesn't handle, the whole image is decoded"""
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.image = Image.open(filepath)
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return self.image.size
+
+    def read_region(self, box: tuple[int, int, int, int]) -> Image.Image:
+        return self.image.crop(box).convert("RGB")
+
+    def close(self) -> None:
+        self.image.close()
+
+    def __enter__(self) -> "PillowBitmap":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def open_bitmap(filepath: str) -> LandscapeBitmap | PillowBitmap:
+    try:
+        return LandscapeBitmap(filepath)
+    except UnsupportedBitmapError:
+        return PillowBitmap(filepath)
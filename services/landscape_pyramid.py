@@ -0,0 +1,181 @@
+"""Multi-resolution tiles of Condor landscape bitmaps
+
+Level 0 is the landscape bitmap itself, each next level halves its size and is stored as PNG tiles. The pyramid is
+built once from the bitmap, and built again when the bitmap changes (size or modification time).
+
+Each build writes to its own directory, moved in place once complete: concurrent builds of the same pyramid (ex: in
+several render processes) keep the first one moved in place and discard the others.
+"""
+
+import json
+import os
+import shutil
+import uuid
+from math import ceil
+
+from PIL import Image
+from rich import print
+
+from condor.config import get_config
+from condor.flight_plan import get_landscape_image_filepath
+from services.landscape_bitmap import open_bitmap
+
+PYRAMID_MANIFEST = "manifest.json"
+PYRAMID_VERSION = 1
+
+
+def level_size(size: tuple[int, int], level: int) -> tuple[int, int]:
+    width, height = size
+    for _ in range(level):
+        width, height = ceil(width / 2), ceil(height / 2)
+
+    return width, height
+
+
+def choose_level(area_size: tuple[int, int], max_size: int, levels: int) -> int:
+    """Lowest level where the area fits in max_size x max_size pixels (0 for full resolution)"""
+    if max_size <= 0:
+        return 0
+
+    level = 0
+    width, height = area_size
+    while level < levels and (width > max_size or height > max_size):
+        width, height = ceil(width / 2), ceil(height / 2)
+        level += 1
+
+    return level
+
+
+class LandscapePyramid:
+    def __init__(self, bitmap_path: str, pyramid_path: str, tile_size: int = 512):
+        self.bitmap_path = bitmap_path
+        self.pyramid_path = pyramid_path
+        self.tile_size = tile_size
+        self.size: tuple[int, int] = (0, 0)
+        self.levels = 0
+
+    def _source_identity(self) -> dict:
+        stat = os.stat(self.bitmap_path)
+        return {"path": self.bitmap_path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def is_valid(self) -> bool:
+        manifest_path = os.path.join(self.pyramid_path, PYRAMID_MANIFEST)
+        try:
+            with open(manifest_path, "rt", encoding="utf-8") as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return False  # not built yet, or a truncated manifest (ex: crash, full disk): built again
+
+        if (
+            not isinstance(manifest, dict)
+            or manifest.get("version") != PYRAMID_VERSION
+            or manifest.get("tile_size") != self.tile_size
+            or manifest.get("source") != self._source_identity()
+        ):
+            return False
+
+        self.size = tuple(manifest["size"])
+        self.levels = manifest["levels"]
+        return True
+
+    def ensure(self) -> "LandscapePyramid":
+        """Build the pyramid if it doesn't exist yet, or if the landscape bitmap changed"""
+        if not self.is_valid():
+            self.build()
+
+        return self
+
+    def tile_path(self, level: int, tile_x: int, tile_y: int, root: str | None = None) -> str:
+        return os.path.join(root or self.pyramid_path, str(level), f"{tile_x}_{tile_y}.png")
+
+    def build(self) -> None:
+        print(f"building landscape tiles of [blue]{self.bitmap_path}[/blue]")
+        source = self._source_identity()
+        build_path = f"{self.pyramid_path}.building-{os.getpid()}-{uuid.uuid4().hex}"
+        try:
+            self._build(build_path, source)
+            self._move_in_place(build_path)
+        finally:
+            shutil.rmtree(build_path, ignore_errors=True)
+
+    def _build(self, build_path: str, source: dict) -> None:
+        with open_bitmap(self.bitmap_path) as bitmap:
+            self.size = bitmap.size
+            self.levels = 0
+            while max(level_size(self.size, self.levels)) > self.tile_size:
+                self.levels += 1
+
+            for level in range(1, self.levels + 1):
+                os.makedirs(os.path.join(build_path, str(level)))
+                width, height = level_size(self.size, level)
+                for tile_y in range(ceil(height / self.tile_size)):
+                    for tile_x in range(ceil(width / self.tile_size)):
+                        tile = self._read_upper_level(bitmap, build_path, level - 1, tile_x, tile_y).reduce(2)
+                        tile.save(self.tile_path(level, tile_x, tile_y, root=build_path), compress_level=1)
+
+        manifest = {
+            "version": PYRAMID_VERSION,
+            "source": source,
+            "size": self.size,
+            "tile_size": self.tile_size,
+            "levels": self.levels,
+        }
+        with open(os.path.join(build_path, PYRAMID_MANIFEST), "wt", encoding="utf-8") as file:
+            json.dump(manifest, file)
+
+    def _move_in_place(self, build_path: str) -> None:
+        """Move the built pyramid to its path, unless another build already put a valid one there"""
+        if self.is_valid():
+            return  # built concurrently, this copy is discarded
+
+        os.makedirs(os.path.dirname(self.pyramid_path) or ".", exist_ok=True)
+        stale_path = f"{build_path}.stale"
+        try:
+            os.replace(self.pyramid_path, stale_path)  # pyramid of a previous bitmap
+        except FileNotFoundError:
+            pass
+        try:
+            os.replace(build_path, self.pyramid_path)
+        except OSError:
+            if not self.is_valid():  # else moved in place by another build meanwhile
+                raise
+        finally:
+            shutil.rmtree(stale_path, ignore_errors=True)
+
+    def _read_upper_level(self, bitmap, root: str, level: int, tile_x: int, tile_y: int) -> Image.Image:
+        """Area of the (higher resolution) level covered by a tile of the next level"""
+        size = 2 * self.tile_size
+        width, height = level_size(self.size, level)
+        box = (tile_x * size, tile_y * size, min((tile_x + 1) * size, width), min((tile_y + 1) * size, height))
+        if level == 0:
+            return bitmap.read_region(box)
+
+        return self._assemble(level, box, root=root)
+
+    def _assemble(self, level: int, box: tuple[int, int, int, int], root: str | None = None) -> Image.Image:
+        left, top, right, bottom = box
+        image = Image.new("RGB", (right - left, bottom - top))
+        for tile_y in range(top // self.tile_size, (bottom - 1) // self.tile_size + 1):
+            for tile_x in range(left // self.tile_size, (right - 1) // self.tile_size + 1):
+                with Image.open(self.tile_path(level, tile_x, tile_y, root=root)) as tile:
+                    image.paste(tile, (tile_x * self.tile_size - left, tile_y * self.tile_size - top))
+
+        return image
+
+    def read_region(self, level: int, box: tuple[int, int, int, int]) -> Image.Image:
+        """Region of a level, only the tiles it overlaps are loaded"""
+        if level == 0:
+            with open_bitmap(self.bitmap_path) as bitmap:
+                return bitmap.read_region(box)
+
+        return self._assemble(level, box)
+
+
+def get_landscape_pyramid(landscape_name: str) -> LandscapePyramid:
+    config = get_config()
+
+    return LandscapePyramid(
+        bitmap_path=get_landscape_image_filepath(landscape_name),
+        pyramid_path=os.path.join(config.cache_path, "landscapes", landscape_name),
+        tile_size=config.preview.tile_size,
+    ).ensure()
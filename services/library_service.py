@@ -0,0 +1,184 @@
+"""Validation and bulk import of flight plans libraries (thousands of .fpl files in a directory tree)
+
+Files are parsed in a process pool, each result is a line of a JSON lines report. Valid flight plans can then be
+imported in the bot library, like uploads (added to the content-addressed store, their name linked atomically).
+"""
+
+import hashlib
+import os
+import time
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache
+
+from pydantic import BaseModel
+
+from condor.flight_plan import get_landscape_image_filepath, parse_flight_plan
+from condor.flight_plan_store import FlightPlanStore, hash_content
+from services.upload_service import FLIGHT_PLAN_EXTENSION
+
+VALIDATION_CHUNK_SIZE = 32  # files sent to a worker process at once
+
+
+class ValidationResult(BaseModel):
+    path: str
+    filename: str
+    valid: bool = False
+    error: str | None = None
+    size: int = 0
+    sha256: str | None = None
+    landscape: str | None = None
+    landscape_found: bool = False
+    turnpoints_count: int = 0
+    distance: float = 0.0
+    imported: bool | None = None  # None: not imported (validation only)
+    duplicate_of: str | None = None  # imported, same content as this flight plan of the import
+
+
+class LibraryReport(BaseModel):
+    files: int = 0
+    valid: int = 0
+    invalid: int = 0
+    missing_landscape: int = 0
+    imported: int = 0
+    duplicates: int = 0  # imported, their content was already imported under another name
+    duration: float = 0.0
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.duration if self.duration else 0.0
+
+    def add(self, result: ValidationResult) -> None:
+        self.files += 1
+        if not result.valid:
+            self.invalid += 1
+            return
+
+        self.valid += 1
+        if not result.landscape_found:
+            self.missing_landscape += 1
+        if result.imported:
+            self.imported += 1
+        if result.duplicate_of:
+            self.duplicates += 1
+
+
+def find_flight_plans(root: str) -> Iterator[str]:
+    for directory, directories, filenames in os.walk(root):
+        # hidden directories are not walked, ex: .store, the blobs of the flight plans (aliases of the library files)
+        directories[:] = sorted(name for name in directories if not name.startswith("."))
+        for filename in sorted(filenames):
+            if filename.lower().endswith(FLIGHT_PLAN_EXTENSION):
+                yield os.path.join(directory, filename)
+
+
+@cache
+def landscape_exists(landscape: str) -> bool:
+    return os.path.isfile(get_landscape_image_filepath(landscape))
+
+
+def validate_file(filepath: str) -> ValidationResult:
+    """Parse a flight plan and check its landscape is installed (runs in a worker process)"""
+    result = ValidationResult(path=filepath, filename=os.path.basename(filepath))
+    try:
+        with open(filepath, "rb") as file:
+            content = file.read()
+        result.size = len(content)
+        result.sha256 = hashlib.sha256(content).hexdigest()
+
+        flight_plan = parse_flight_plan(result.filename, content)
+        result.valid = True
+        result.landscape = flight_plan.landscape
+        result.landscape_found = landscape_exists(flight_plan.landscape)
+        result.turnpoints_count = len(flight_plan.turnpoints)
+        result.distance = flight_plan.distance
+    except (OSError, ValueError) as exc:
+        result.error = str(exc) or exc.__class__.__name__
+
+    return result
+
+
+def validate_library(root: str, workers: int = 0) -> Iterator[ValidationResult]:
+    """Validation results of the flight plans under root, in the walk order (workers=0: no process pool)"""
+    filepaths = find_flight_plans(root)
+    if workers <= 0:
+        yield from map(validate_file, filepaths)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(validate_file, filepaths, chunksize=VALIDATION_CHUNK_SIZE)
+
+
+def library_content_hash(filepath: str) -> str | None:
+    try:
+        with open(filepath, "rb") as file:
+            return hash_content(file.read())
+    except FileNotFoundError:
+        return None
+
+
+def library_hashes(flight_plans_path: str) -> set[str]:
+    """Hashes of the flight plans of the library (the aliases of the stored contents)"""
+    with os.scandir(flight_plans_path) as entries:
+        filepaths = [entry.path for entry in entries if entry.name.lower().endswith(FLIGHT_PLAN_EXTENSION)]
+
+    return {sha256 for sha256 in map(library_content_hash, filepaths) if sha256}
+
+
+def import_library(
+    root: str,
+    flight_plans_path: str,
+    workers: int = 0,
+    overwrite: bool = False,
+    require_landscape: bool = True,
+    store_path: str = ".store",
+) -> Iterator[ValidationResult]:
+    """Store the valid flight plans under root in the library, the first file wins when names are duplicated"""
+    store = FlightPlanStore(flight_plans_path, store_path)
+    imported: set[str] = set()
+    imported_hashes: dict[str, str] = {}  # hash => first filename
+    replaced: set[str] = set()  # hashes of the overwritten flight plans
+    for result in validate_library(root, workers):
+        if result.valid:
+            result.imported = False
+            library_hash = library_content_hash(store.alias_path(result.filename))
+            if result.filename in imported:
+                result.error = "duplicate name, already imported from another directory"
+            elif require_landscape and not result.landscape_found:
+                result.error = "landscape not installed"
+            elif library_hash == result.sha256 or (library_hash and not overwrite):
+                result.error = "already in the library"
+            else:
+                with open(result.path, "rb") as file:
+                    store.add(result.filename, file.read(), result.sha256)
+                if library_hash:
+                    replaced.add(library_hash)
+                imported.add(result.filename)
+                first = imported_hashes.setdefault(result.sha256, result.filename)
+                result.duplicate_of = first if first != result.filename else None
+                result.imported = True
+
+        yield result
+
+    # replaced contents no other name uses are removed, like after an upload
+    for sha256 in replaced - library_hashes(flight_plans_path):
+        store.remove_blob(sha256)
+
+
+def run_library_job(results: Iterator[ValidationResult], report_path: str | None = None) -> LibraryReport:
+    """Consume the results, write them in a JSON lines report (one result per line)"""
+    report = LibraryReport()
+    started = time.perf_counter()
+
+    report_file = open(report_path, "wt", encoding="utf-8") if report_path else None
+    try:
+        for result in results:
+            report.add(result)
+            if report_file:
+                report_file.write(result.model_dump_json() + "\n")
+    finally:
+        if report_file:
+            report_file.close()
+
+    report.duration = time.perf_counter() - started
+    return report
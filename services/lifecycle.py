@@ -0,0 +1,293 @@
+"""Server start and stop, one operation at a time per server, step by step off the event loop
+
+An operation (start or stop) reads the server status, then runs the steps of its backend (ex: writing configuration,
+launching, window ready, START clicked), each one in the I/O threads with its own timeout. A start then waits for the
+server to be joinable. The progress of each step is reported to a callback, to be shown in the command response.
+
+A start or stop requested while another operation runs on the same server is rejected, or queued (lifecycle.conflicts
+in config.yaml): queued operations run once the previous one is finished, their status check sees its result (a
+second start of a started server fails, instead of launching another process).
+
+A step that times out can't be interrupted (a thread), the operation fails at once but the server (and the exclusive
+key of the step) stays busy until the step returns: backends bound their own waits with the step timeout. The same
+goes for an operation cancelled during a step.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from functools import cache, partial
+
+from condor.config import LifecycleConfig, get_config
+from condor.metrics import SERVER_CALL_SECONDS, measure
+from condor.server_manager import LifecycleStep, OnlineStatus, ServerBackend, ServerStatus, get_backend
+from services.history import get_history
+from services.status_service import get_status_service
+from services.workers import get_io_executor
+
+logger = logging.getLogger("lifecycle")
+
+JOINABLE_STATUSES = {OnlineStatus.JOINING_ENABLED, OnlineStatus.RACE_IN_PROGRESS}
+STEP_ICONS = {"pending": "▫️", "running": "⏳", "done": "✅", "failed": "❌", "timeout": "⌛"}
+
+_exclusive_locks: dict[tuple[asyncio.AbstractEventLoop, str], asyncio.Lock] = {}
+
+
+class LifecycleError(Exception):
+    pass
+
+
+class LifecycleBusyError(LifecycleError):
+    """Another start or stop is in progress on the server"""
+
+
+@dataclass
+class StepProgress:
+    name: str
+    state: str = "pending"  # running, done, failed or timeout
+    seconds: float = 0.0
+    error: str | None = None
+
+    def describe(self) -> str:
+        msg = f"{STEP_ICONS[self.state]} {self.name}"
+        if self.state in ("done", "failed", "timeout"):
+            msg += f" ({self.seconds:.1f} s)"
+        if self.error:
+            msg += f": {self.error}"
+        return msg
+
+
+@dataclass
+class LifecycleOperation:
+    server: str
+    action: str  # start or stop
+    requested_by: str
+    flight_plan: str | None = None
+    steps: list[StepProgress] = field(default_factory=list)
+
+    @property
+    def current_step(self) -> str | None:
+        for step in self.steps:
+            if step.state == "running":
+                return step.name
+        return None
+
+    def describe(self) -> str:
+        """Progress of the operation, one line per step"""
+        title = f"**{self.server}** {self.action}"
+        if self.flight_plan:
+            title += f" with flight plan {self.flight_plan}"
+        return "\n".join([title, *(step.describe() for step in self.steps)])
+
+
+ProgressCallback = Callable[[LifecycleOperation], Awaitable[None]]
+
+
+def _exclusive_lock(key: str) -> asyncio.Lock:
+    """Lock shared by the servers for the steps of an exclusive key"""
+    lock_key = (asyncio.get_running_loop(), key)
+    if lock_key not in _exclusive_locks:
+        _exclusive_locks[lock_key] = asyncio.Lock()
+
+    return _exclusive_locks[lock_key]
+
+
+class ServerLifecycle:
+    """Start and stop of a server instance, serialized"""
+
+    def __init__(
+        self,
+        name: str,
+        backend: ServerBackend,
+        config: LifecycleConfig,
+        on_started: Callable[[str], None] | None = None,
+        on_stopped: Callable[[], None] | None = None,
+    ):
+        self.name = name
+        self.backend = backend
+        self.config = config
+        self.on_started = on_started  # called with the flight plan once the server is launched (in the event loop)
+        self.on_stopped = on_stopped
+        self.operation: LifecycleOperation | None = None  # in progress
+        self.queued = 0
+        self._lock = asyncio.Lock()
+        self._late_step: asyncio.Future | None = None  # step still running after its timeout
+
+    async def start(
+        self, flight_plan_filename: str, requested_by: str = "", progress: ProgressCallback | None = None
+    ) -> LifecycleOperation:
+        operation = LifecycleOperation(self.name, "start", requested_by, flight_plan_filename)
+        return await self._run(operation, progress)
+
+    async def stop(self, requested_by: str = "", progress: ProgressCallback | None = None) -> LifecycleOperation:
+        return await self._run(LifecycleOperation(self.name, "stop", requested_by), progress)
+
+    async def _run(self, operation: LifecycleOperation, progress: ProgressCallback | None) -> LifecycleOperation:
+        if self._lock.locked():
+            running = self.operation
+            busy = f"server {self.name} is busy"
+            if running:
+                busy = f"server {self.name} is {running.action}ing ({running.current_step or 'waiting'})"
+                if running.requested_by:
+                    busy += f", requested by {running.requested_by}"
+            if self.config.conflicts == "reject":
+                raise LifecycleBusyError(busy)
+            if self.queued >= self.config.max_queued:
+                raise LifecycleBusyError(f"{busy}, {self.queued} operation(s) already waiting")
+
+        self.queued += 1
+        try:
+            await self._lock.acquire()
+        finally:
+            self.queued -= 1
+
+        self.operation = operation
+        try:
+            with measure(SERVER_CALL_SECONDS, operation.action, self.name):
+                await self._operate(operation, progress)
+            return operation
+        finally:
+            self._release_after_step(self._release)
+
+    def _release(self) -> None:
+        self.operation = None
+        self._late_step = None
+        self._lock.release()
+
+    def _release_after_step(self, release: Callable[[], None]) -> None:
+        """Release now, or once the step still running after its timeout (or cancellation) returns"""
+        if self._late_step and not self._late_step.done():
+            self._late_step.add_done_callback(lambda future: release())
+        else:
+            release()
+
+    async def _operate(self, operation: LifecycleOperation, progress: ProgressCallback | None) -> None:
+        status, process = await self._run_step(
+            LifecycleStep("status", lambda timeout: self.backend.get_status(), self.config.action_timeout)
+        )
+        if operation.action == "start":
+            if status.online_status != OnlineStatus.OFFLINE:
+                raise LifecycleError(f"server {self.name} is already running, it should be stopped first")
+            steps = self.backend.start_steps(operation.flight_plan, self.config)
+        else:
+            if status.online_status == OnlineStatus.OFFLINE:
+                raise LifecycleError(f"server {self.name} is not running, so it couldn't be stopped")
+            steps = self.backend.stop_steps(process, self.config)
+
+        operation.steps = [StepProgress(step.name) for step in steps]
+        if operation.action == "start":
+            operation.steps.append(StepProgress("joinable"))
+        await self._report(operation, progress)
+
+        exclusive: tuple[str, asyncio.Lock] | None = None  # held while consecutive steps share their key
+        try:
+            for step, step_progress in zip(steps, operation.steps, strict=False):  # and the joinable step of a start
+                if exclusive and exclusive[0] != step.exclusive:
+                    exclusive[1].release()
+                    exclusive = None
+                if step.exclusive and not exclusive:
+                    lock = _exclusive_lock(step.exclusive)
+                    await lock.acquire()
+                    exclusive = (step.exclusive, lock)
+
+                await self._progress_step(step_progress, self._run_step(step), operation, progress)
+        finally:
+            if exclusive:
+                self._release_after_step(exclusive[1].release)
+
+        if operation.action == "start":
+            if self.on_started:
+                self.on_started(operation.flight_plan)
+            await self._progress_step(operation.steps[-1], self._wait_joinable(), operation, progress)
+        elif self.on_stopped:
+            self.on_stopped()
+
+    async def _progress_step(
+        self, step: StepProgress, run: Awaitable, operation: LifecycleOperation, progress: ProgressCallback | None
+    ) -> None:
+        step.state = "running"
+        await self._report(operation, progress)
+        started = time.monotonic()
+        try:
+            await run
+            step.state = "done"
+        except Exception as exc:
+            step.state = "timeout" if isinstance(exc, TimeoutError) else "failed"
+            step.error = str(exc) or exc.__class__.__name__
+            raise LifecycleError(f"{step.name}: {step.error}") from exc
+        finally:
+            step.seconds = time.monotonic() - started
+            await self._report(operation, progress)
+
+    async def _report(self, operation: LifecycleOperation, progress: ProgressCallback | None) -> None:
+        if progress is None:
+            return
+        try:
+            await progress(operation)
+        except Exception as exc:  # noqa: BLE001
+            # the operation goes on, even if its progress can't be shown (ex: interaction expired)
+            logger.warning(f"server {self.name} {operation.action} progress not reported: {exc}")
+
+    async def _run_step(self, step: LifecycleStep) -> object:
+        """Run a step in the I/O threads, a step still running after its timeout keeps the server busy"""
+        future = asyncio.get_running_loop().run_in_executor(get_io_executor(), step.run, step.timeout)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), step.timeout)
+        except TimeoutError:
+            logger.warning(f"server {self.name}: {step.name} still running after {step.timeout:g} s")
+            self._keep_late_step(step, future)
+            raise TimeoutError(f"timed out after {step.timeout:g} s") from None
+        except asyncio.CancelledError:
+            # the operation is cancelled (ex: bot shutdown), not the thread running the step
+            logger.warning(f"server {self.name}: {step.name} still running, its operation was cancelled")
+            self._keep_late_step(step, future)
+            raise
+
+    def _keep_late_step(self, step: LifecycleStep, future: asyncio.Future) -> None:
+        """The server (and the exclusive key of the step) stays busy until the step returns"""
+        self._late_step = future
+        future.add_done_callback(partial(self._late_step_returned, step.name))
+
+    def _late_step_returned(self, name: str, future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception():
+            logger.warning(f"server {self.name}: {name} failed after its operation ended: {future.exception()}")
+        else:
+            logger.info(f"server {self.name}: {name} returned after its operation ended")
+
+    async def _wait_joinable(self) -> None:
+        """Poll the status until players can join (or the race is already started)"""
+        deadline = time.monotonic() + self.config.joinable_timeout
+        step = LifecycleStep("joinable", lambda timeout: self.backend.get_status()[0], self.config.action_timeout)
+        while True:
+            status: ServerStatus = await self._run_step(step)
+            if status.online_status in JOINABLE_STATUSES:
+                return
+            if status.online_status == OnlineStatus.OFFLINE:
+                raise LifecycleError("condor server exited")
+            if time.monotonic() + self.config.joinable_poll_interval > deadline:
+                raise TimeoutError(f"not joinable after {self.config.joinable_timeout:g} s")
+            await asyncio.sleep(self.config.joinable_poll_interval)
+
+
+def server_started(server_name: str, flight_plan_filename: str) -> None:
+    if get_config().history.enabled:
+        get_history().record_start(server_name, flight_plan_filename)
+    get_status_service(server_name).invalidate()
+
+
+@cache
+def _create_lifecycle(server_name: str) -> ServerLifecycle:
+    return ServerLifecycle(
+        server_name,
+        get_backend(server_name),
+        get_config().lifecycle,
+        on_started=partial(server_started, server_name),
+        on_stopped=get_status_service(server_name).invalidate,
+    )
+
+
+def get_lifecycle(server_name: str | None = None) -> ServerLifecycle:
+    """Start and stop of a server instance, the first one by default"""
+    return _create_lifecycle(get_config().get_server(server_name).name)
@@ -0,0 +1,247 @@
+"""Cache of encoded flight plan previews
+
+Previews are keyed by the flight plan content hash and the landscape bitmap identity, so a preview is rendered again
+only when the task or the landscape changes. Recently used previews are kept in memory, and all of them on disk, both
+bounded by a size in bytes (least recently used are evicted first).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import asdict
+from functools import cache
+
+from pydantic import BaseModel
+from rich import print
+
+from condor.catalog import get_catalog
+from condor.config import get_config
+from condor.flight_plan import FlightPlan, get_flight_plan_path, get_landscape_image_filepath, load_flight_plan
+from condor.metrics import (
+    PREVIEW_BYTES,
+    PREVIEW_CACHE_LOOKUPS,
+    PREVIEW_ENCODE_SECONDS,
+    PREVIEW_RENDER_SECONDS,
+    count,
+    measure,
+    observe,
+)
+from services.preview_encoding import FORMAT_EXTENSIONS, EncodeOptions, image_extension
+from services.workers import run_io, run_render
+
+logger = logging.getLogger("preview_cache")
+
+PREVIEW_EXTENSIONS = tuple(sorted({f".{extension}" for extension in FORMAT_EXTENSIONS.values()}))
+
+
+class PreviewCacheStats(BaseModel):
+    hits: int = 0
+    misses: int = 0
+    memory_entries: int = 0
+    memory_bytes: int = 0
+    memory_budget: int = 0
+    disk_entries: int = 0
+    disk_bytes: int = 0
+    disk_budget: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class PreviewCache:
+    def __init__(self, cache_path: str, memory_budget: int, disk_budget: int):
+        self.cache_path = cache_path
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self.hits = 0
+        self.misses = 0
+
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_bytes = 0
+        # key => (file size, file extension of the encoded format), least recently used first
+        self._disk: OrderedDict[str, tuple[int, str]] = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+        self._load_disk_index()
+
+    def _load_disk_index(self) -> None:
+        if not os.path.isdir(self.cache_path):
+            return
+
+        files = []
+        with os.scandir(self.cache_path) as it:
+            for entry in it:
+                key, extension = os.path.splitext(entry.name)
+                if extension in PREVIEW_EXTENSIONS:
+                    stat = entry.stat()
+                    files.append((stat.st_mtime_ns, key, extension, stat.st_size))
+
+        for _, key, extension, size in sorted(files):
+            self._disk[key] = (size, extension)
+            self._disk_bytes += size
+
+    def _filepath(self, key: str, extension: str) -> str:
+        return os.path.join(self.cache_path, f"{key}{extension}")
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+            elif key in self._disk:
+                filepath = self._filepath(key, self._disk[key][1])
+                try:
+                    with open(filepath, "rb") as file:
+                        data = file.read()
+                    os.utime(filepath)
+                    self._disk.move_to_end(key)
+                    self._put_memory(key, data)
+                except OSError:
+                    self._disk_bytes -= self._disk.pop(key)[0]
+
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+            return data
+
+    def put(self, key: str, data: bytes) -> None:
+        with self._lock:
+            self._put_memory(key, data)
+            self._put_disk(key, data)
+
+    def _put_memory(self, key: str, data: bytes) -> None:
+        if len(data) > self.memory_budget:
+            return
+
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+
+        while self._memory_bytes > self.memory_budget:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _put_disk(self, key: str, data: bytes) -> None:
+        if len(data) > self.disk_budget:
+            return
+
+        os.makedirs(self.cache_path, exist_ok=True)
+        extension = f".{image_extension(data)}"
+        filepath = self._filepath(key, extension)
+        tmp_path = f"{filepath}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, filepath)
+
+        if key in self._disk:
+            size, previous_extension = self._disk.pop(key)
+            self._disk_bytes -= size
+            if previous_extension != extension:
+                self._remove_file(key, previous_extension)
+        self._disk[key] = (len(data), extension)
+        self._disk_bytes += len(data)
+
+        while self._disk_bytes > self.disk_budget:
+            evicted, (size, evicted_extension) = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            self._remove_file(evicted, evicted_extension)
+
+    def _remove_file(self, key: str, extension: str) -> None:
+        try:
+            os.remove(self._filepath(key, extension))
+        except OSError:
+            pass
+
+    def stats(self) -> PreviewCacheStats:
+        with self._lock:
+            return PreviewCacheStats(
+                hits=self.hits,
+                misses=self.misses,
+                memory_entries=len(self._memory),
+                memory_bytes=self._memory_bytes,
+                memory_budget=self.memory_budget,
+                disk_entries=len(self._disk),
+                disk_bytes=self._disk_bytes,
+                disk_budget=self.disk_budget,
+            )
+
+
+def preview_key(
+    flight_plan_sha256: str, landscape_filepath: str, max_size: int, options: EncodeOptions | None = None
+) -> str:
+    """Cache key of a preview: flight plan content, landscape bitmap identity, rendering and encoding options"""
+    if options is None:
+        options = EncodeOptions.from_config(get_config().preview)
+    stat = os.stat(landscape_filepath)
+    identity = [flight_plan_sha256, landscape_filepath, stat.st_size, stat.st_mtime_ns, max_size, asdict(options)]
+
+    return hashlib.sha256(json.dumps(identity).encode()).hexdigest()
+
+
+@cache
+def get_preview_cache() -> PreviewCache:
+    config = get_config()
+
+    return PreviewCache(
+        cache_path=os.path.join(config.cache_path, "previews"),
+        memory_budget=config.preview.memory_cache_bytes,
+        disk_budget=config.preview.disk_cache_bytes,
+    )
+
+
+def flight_plan_preview_key(flight_plan: FlightPlan, max_size: int, options: EncodeOptions) -> str:
+    """Key of the preview of a flight plan, by content: its other names and its re-uploads share the preview"""
+    sha256 = get_catalog().content_hash(flight_plan.filename)
+    if sha256 is None:
+        raise FileNotFoundError(get_flight_plan_path(flight_plan.filename))
+
+    return preview_key(
+        sha256,
+        get_landscape_image_filepath(flight_plan.landscape),
+        max_size,
+        options,
+    )
+
+
+async def get_flight_plan_preview(flight_plan: FlightPlan) -> bytes:
+    """Encoded preview of the flight plan (see image_extension), rendered in the render pool only if not in cache"""
+    max_size = get_config().preview.max_size
+    options = EncodeOptions.from_config(get_config().preview)
+    key = await run_io(flight_plan_preview_key, flight_plan, max_size, options)
+
+    preview_cache = get_preview_cache()
+    data = await run_io(preview_cache.get, key)
+    count(PREVIEW_CACHE_LOOKUPS, "miss" if data is None else "hit")
+    if data is None:
+        logger.debug(f"preview cache miss for {flight_plan.filename}")
+        # PIL and the landscapes stack are only imported by the first render, not at the bot startup
+        from services.flight_plan_service import render_flight_plan_preview
+
+        with measure(PREVIEW_RENDER_SECONDS):
+            preview = await run_render(render_flight_plan_preview, flight_plan, max_size, options)
+        logger.debug(f"preview of {flight_plan.filename}: {preview.describe()}")
+        observe(PREVIEW_ENCODE_SECONDS, preview.encode_seconds, preview.format)
+        count(PREVIEW_BYTES, preview.format, amount=len(preview.data))
+        data = preview.data
+        await run_io(preview_cache.put, key, data)
+
+    return data
+
+
+async def warm_flight_plan_preview(flight_plan_filename: str) -> None:
+    """Render the preview of a flight plan in advance (ex: just after its upload)"""
+    try:
+        flight_plan = await run_io(load_flight_plan, get_flight_plan_path(flight_plan_filename), trusted=True)
+        await get_flight_plan_preview(flight_plan)
+        print(f"preview of [blue]{flight_plan_filename}[/blue] [green]rendered[/green]")
+    except Exception as exc:  # noqa: BLE001 - a background task, its errors are only reported
+        print(f"[yellow]preview of [blue]{flight_plan_filename}[/blue] couldn't be rendered: {exc}[/yellow]")
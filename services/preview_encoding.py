@@ -0,0 +1,170 @@
+"""Flight plan previews encoding, within a byte budget and maximum dimensions
+
+The rendered preview is downscaled (Lanczos) to fit the maximum dimensions, then encoded with the formats of the
+configuration, in their order: the first encoding within the byte budget is kept. A lossless format whose size
+(estimated from the center of the image) is far over the budget is skipped without a full encoding. Lossy formats
+(WebP, JPEG) are tried at decreasing qualities. When nothing fits, the image is downscaled again and the formats are
+tried again; the smallest encoding is kept if the budget can't be reached.
+"""
+
+import time
+from dataclasses import dataclass
+from io import BytesIO
+from typing import TYPE_CHECKING
+
+from condor.config import PreviewConfig
+
+# PIL is imported by the encoding functions: the options and image_extension are used at the bot startup
+if TYPE_CHECKING:
+    from PIL import Image
+
+PREVIEW_FORMATS = ("png", "png8", "webp", "jpeg")  # png8: optimized 256 colors palette PNG
+LOSSY_FORMATS = ("webp", "jpeg")
+FORMAT_EXTENSIONS = {"png": "png", "png8": "png", "webp": "webp", "jpeg": "jpg"}
+QUALITY_STEP = 20
+MIN_QUALITY = 30
+ESTIMATE_SAMPLE_RATIO = 4  # lossless sizes are estimated from a sample of 1/4 x 1/4 of the image
+ESTIMATE_MARGIN = 1.25  # a lossless format is skipped when its estimated size is over the budget by this ratio
+SHRINK_RATIO = 0.75  # downscaling of the image when no encoding fits in the budget
+MIN_SHRINK_SIZE = 256  # pixels, the image is not downscaled below this size to fit the budget
+
+
+@dataclass(frozen=True)
+class EncodeOptions:
+    max_bytes: int = 0  # 0 for no budget
+    max_width: int = 0  # 0 for no limit
+    max_height: int = 0
+    formats: tuple[str, ...] = PREVIEW_FORMATS
+    quality: int = 85  # first quality tried by lossy formats
+
+    @classmethod
+    def from_config(cls, config: PreviewConfig) -> "EncodeOptions":
+        return cls(config.max_bytes, config.max_width, config.max_height, tuple(config.formats), config.quality)
+
+    def available_formats(self) -> tuple[str, ...]:
+        """Formats supported by this PIL build (WebP is optional)"""
+        from PIL import features
+
+        formats = tuple(fmt for fmt in self.formats if fmt != "webp" or features.check("webp"))
+        return formats or ("png",)
+
+
+@dataclass
+class EncodedPreview:
+    data: bytes
+    format: str
+    size: tuple[int, int]  # pixels
+    quality: int | None  # lossy formats
+    encode_seconds: float  # downscaling and all the encodings tried
+    attempts: int  # encodings tried
+    within_budget: bool
+
+    @property
+    def extension(self) -> str:
+        return FORMAT_EXTENSIONS[self.format]
+
+    def describe(self) -> str:
+        quality = f" q{self.quality}" if self.quality is not None else ""
+        budget = "" if self.within_budget else ", over budget"
+        return (
+            f"{self.format}{quality} {self.size[0]}x{self.size[1]}, {len(self.data)} bytes,"
+            f" {self.encode_seconds * 1000:.0f} ms ({self.attempts} encodings{budget})"
+        )
+
+
+def image_extension(data: bytes) -> str:
+    """Extension of an encoded image, from its signature"""
+    if data.startswith(b"\xff\xd8"):
+        return "jpg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return "png"
+
+
+def fit_image(image: "Image.Image", max_width: int, max_height: int) -> "Image.Image":
+    """Downscale (keeping the aspect ratio) to fit in max_width x max_height, 0 for no limit"""
+    from PIL import Image
+
+    width, height = image.size
+    ratio = min(max_width / width if max_width else 1.0, max_height / height if max_height else 1.0)
+    if ratio >= 1.0:
+        return image
+
+    return image.resize((max(int(width * ratio), 1), max(int(height * ratio), 1)), Image.Resampling.LANCZOS)
+
+
+def encode_image(image: "Image.Image", fmt: str, quality: int | None = None) -> bytes:
+    from PIL import Image
+
+    buffer = BytesIO()
+    if fmt == "png":
+        image.save(buffer, format="PNG")
+    elif fmt == "png8":
+        image.convert("RGB").quantize(256, method=Image.Quantize.FASTOCTREE).save(buffer, format="PNG", optimize=True)
+    elif fmt == "webp":
+        image.convert("RGB").save(buffer, format="WEBP", quality=quality, method=4)
+    elif fmt == "jpeg":
+        image.convert("RGB").save(buffer, format="JPEG", quality=quality, optimize=True)
+    else:
+        raise ValueError(f"unknown preview format {fmt}, expected one of {', '.join(PREVIEW_FORMATS)}")
+
+    return buffer.getvalue()
+
+
+def qualities(fmt: str, quality: int) -> list[int | None]:
+    if fmt not in LOSSY_FORMATS:
+        return [None]
+    return list(range(quality, MIN_QUALITY - 1, -QUALITY_STEP)) or [quality]
+
+
+def estimate_bytes(image: "Image.Image", fmt: str) -> int:
+    """Size of a lossless encoding of the image, extrapolated from the encoding of its center"""
+    width, height = image.size
+    sample_width, sample_height = width // ESTIMATE_SAMPLE_RATIO, height // ESTIMATE_SAMPLE_RATIO
+    left, top = (width - sample_width) // 2, (height - sample_height) // 2
+    sample = image.crop((left, top, left + sample_width, top + sample_height))
+
+    return len(encode_image(sample, fmt)) * (width * height) // (sample_width * sample_height)
+
+
+def skip_format(image: "Image.Image", fmt: str, max_bytes: int) -> bool:
+    """A lossless format that would be far over the budget, not worth a full encoding"""
+    if not max_bytes or fmt in LOSSY_FORMATS or min(image.size) < ESTIMATE_SAMPLE_RATIO * 64:
+        return False
+    return estimate_bytes(image, fmt) > max_bytes * ESTIMATE_MARGIN
+
+
+def encode_preview(image: "Image.Image", options: EncodeOptions) -> EncodedPreview:
+    from PIL import Image
+
+    started = time.perf_counter()
+    image = fit_image(image, options.max_width, options.max_height)
+    formats = options.available_formats()
+    attempts = 0
+    best: tuple[bytes, str, tuple[int, int], int | None] | None = None
+
+    while True:
+        # the smallest size is always encoded: the smallest encoding is kept when the budget can't be reached
+        smallest = max(image.size) * SHRINK_RATIO < MIN_SHRINK_SIZE
+        for fmt in formats:
+            if not smallest and skip_format(image, fmt, options.max_bytes):
+                continue
+            for quality in qualities(fmt, options.quality):
+                data = encode_image(image, fmt, quality)
+                attempts += 1
+                if best is None or len(data) < len(best[0]):
+                    best = (data, fmt, image.size, quality)
+                if not options.max_bytes or len(data) <= options.max_bytes:
+                    return EncodedPreview(
+                        data, fmt, image.size, quality, time.perf_counter() - started, attempts, within_budget=True
+                    )
+
+        if smallest:
+            break
+        width, height = image.size
+        image = image.resize(
+            (max(int(width * SHRINK_RATIO), 1), max(int(height * SHRINK_RATIO), 1)), Image.Resampling.LANCZOS
+        )
+
+    data, fmt, size, quality = best
+    return EncodedPreview(data, fmt, size, quality, time.perf_counter() - started, attempts, within_budget=False)
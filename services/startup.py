@@ -0,0 +1,78 @@
+"""Bot startup: slash commands synced with discord only when they changed, and timing of the startup steps
+
+Syncing the command tree is a slow and rate limited API call, and on_ready runs again on every gateway reconnection.
+The commands (names, descriptions, parameters, choices) are hashed with the application id, the hash of the last
+sync is kept in the cache directory: delete command_tree.json to force a sync.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+
+from discord import app_commands
+from rich import print
+
+logger = logging.getLogger("startup")
+
+COMMAND_TREE_FILENAME = "command_tree.json"
+
+
+def command_tree_hash(tree: app_commands.CommandTree, application_id: int | None) -> str:
+    """Hash of what discord knows about the commands (the command prefix is part of their names)"""
+    commands = sorted((command.to_dict(tree) for command in tree.get_commands()), key=lambda command: command["name"])
+    payload = json.dumps({"application_id": application_id, "commands": commands}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def read_synced_hash(cache_path: str) -> str | None:
+    try:
+        with open(os.path.join(cache_path, COMMAND_TREE_FILENAME), "rt", encoding="utf-8") as file:
+            return json.load(file).get("hash")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def write_synced_hash(cache_path: str, tree_hash: str) -> None:
+    os.makedirs(cache_path, exist_ok=True)
+    filename = os.path.join(cache_path, COMMAND_TREE_FILENAME)
+    with open(f"{filename}.tmp", "wt", encoding="utf-8") as file:
+        json.dump({"hash": tree_hash}, file)
+    os.replace(f"{filename}.tmp", filename)
+
+
+async def sync_command_tree(tree: app_commands.CommandTree, application_id: int | None, cache_path: str) -> bool:
+    """Sync the commands if they changed since the last sync, return True if they were synced"""
+    tree_hash = command_tree_hash(tree, application_id)
+    if read_synced_hash(cache_path) == tree_hash:
+        return False
+
+    await tree.sync()
+    write_synced_hash(cache_path, tree_hash)
+    return True
+
+
+class StartupTimer:
+    """Duration of each startup step, from the process start (or the timer creation) to the bot being ready"""
+
+    def __init__(self, started: float | None = None):
+        self.started = time.perf_counter() if started is None else started
+        self.steps: list[tuple[str, float]] = []
+        self.ready = False  # once reported
+        self._last = self.started
+
+    def step(self, name: str) -> None:
+        now = time.perf_counter()
+        self.steps.append((name, now - self._last))
+        self._last = now
+
+    @property
+    def total(self) -> float:
+        return self._last - self.started
+
+    def report(self) -> None:
+        self.ready = True
+        breakdown = ", ".join(f"{name} {duration * 1000:.0f} ms" for name, duration in self.steps)
+        logger.info(f"startup in {self.total:.2f} s: {breakdown}")
+        print(f"[yellow]startup[/yellow]: [blue]{self.total:.2f} s[/blue] ({breakdown})")
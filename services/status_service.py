@@ -0,0 +1,155 @@
+"""Condor server status, polled in background
+
+Reading the status through UI automation is slow, so the latest status is kept with its timestamp and refreshed at
+a regular interval. Commands read the cached status when it's recent enough, or force a refresh; concurrent
+refreshes share the same UI automation call.
+
+Each server instance has its own status service, all of them are polled concurrently (in the I/O threads).
+With status.source: log, the status is read from the server log instead of the server window (see condor.server_log).
+The statuses read feed the sessions history (see services.history).
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import cache, partial
+
+from condor.config import get_config
+from condor.metrics import STATUS_READS, count
+from condor.server_log import get_log_status_source
+from condor.server_manager import ServerStatus, get_server_names, get_server_status
+from services.history import get_history
+from services.workers import run_io
+
+logger = logging.getLogger("status_service")
+
+
+@dataclass(frozen=True)
+class StatusSnapshot:
+    status: ServerStatus
+    timestamp: float  # time.monotonic()
+
+    @property
+    def age_ms(self) -> float:
+        return (time.monotonic() - self.timestamp) * 1000
+
+
+class StatusService:
+    def __init__(
+        self,
+        fetch: Callable[[], ServerStatus],
+        poll_interval: float,
+        max_age_ms: float,
+        name: str = "default",
+        on_status: Callable[[ServerStatus], None] | None = None,
+    ):
+        self.fetch = fetch
+        self.name = name
+        self.on_status = on_status  # called with each status read (in the event loop)
+        self.poll_interval = poll_interval
+        self.max_age_ms = max_age_ms
+        self.snapshot: StatusSnapshot | None = None
+        self.generation = 0  # bumped by invalidate, a refresh started before is not kept
+
+        self._refresh_task: asyncio.Task | None = None
+        self._poll_task: asyncio.Task | None = None
+
+    async def _fetch(self) -> StatusSnapshot:
+        generation = self.generation
+        status = await run_io(self.fetch)
+        snapshot = StatusSnapshot(status=status, timestamp=time.monotonic())
+        if generation != self.generation:
+            return snapshot  # read before the server state changed: returned to its readers, not cached
+
+        self.snapshot = snapshot
+        if self.on_status:
+            self.on_status(status)
+        return snapshot
+
+    async def refresh(self) -> StatusSnapshot:
+        """Read the server status now, or wait for the refresh already in progress"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._fetch())
+
+        # a cancelled reader must not cancel the refresh of the others
+        return await asyncio.shield(self._refresh_task)
+
+    async def get_status(self, max_age_ms: float | None = None, force: bool = False) -> ServerStatus:
+        """Server status not older than max_age_ms (default from config), or a fresh one with force"""
+        if max_age_ms is None:
+            max_age_ms = self.max_age_ms
+
+        snapshot = self.snapshot
+        if force or snapshot is None or snapshot.age_ms > max_age_ms:
+            count(STATUS_READS, self.name, "refresh")
+            snapshot = await self.refresh()
+        else:
+            count(STATUS_READS, self.name, "cached")
+
+        return snapshot.status
+
+    def invalidate(self) -> None:
+        """The server state just changed (started, stopped), next readers get a fresh status"""
+        self.generation += 1
+        self.snapshot = None
+        self._refresh_task = None
+
+    async def _poll(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as exc:  # noqa: BLE001 - polling goes on, whatever the error of a reading
+                logger.warning(f"server status polling failed: {exc}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self) -> None:
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.create_task(self._poll())
+
+    async def stop(self) -> None:
+        if self._poll_task:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+            self._poll_task = None
+
+
+@cache
+def _create_status_service(server_name: str) -> StatusService:
+    config = get_config()
+    if config.status.source == "log":
+        fetch = get_log_status_source(server_name).get_status
+    else:
+
+        def fetch() -> ServerStatus:
+            return get_server_status(server_name)[0]
+
+    return StatusService(
+        fetch=fetch,
+        poll_interval=config.status.poll_interval,
+        max_age_ms=config.status.max_age_ms,
+        name=server_name,
+        on_status=partial(get_history().observe, server_name) if config.history.enabled else None,
+    )
+
+
+def get_status_service(server_name: str | None = None) -> StatusService:
+    """Status of a server instance, the first one by default"""
+    return _create_status_service(get_config().get_server(server_name).name)
+
+
+def get_status_services() -> dict[str, StatusService]:
+    return {name: _create_status_service(name) for name in get_server_names()}
+
+
+async def get_all_statuses(force: bool = False) -> dict[str, ServerStatus | Exception]:
+    """Status of every server instance, read concurrently (an error doesn't hide the other servers)"""
+    services = get_status_services()
+    statuses = await asyncio.gather(
+        *[service.get_status(force=force) for service in services.values()], return_exceptions=True
+    )
+    return dict(zip(services, statuses, strict=True))
@@ -0,0 +1,172 @@
+"""Flight plans upload: attachments (.fpl or .zip archives of .fpl) are added to the library in one batch
+
+Attachments are read in memory concurrently and validated with the flight plan parser before anything is written.
+Valid flight plans are added to the content-addressed store (see condor.flight_plan_store), their name is linked
+atomically: a flight plan being uploaded is never visible (or half written) to the commands listing the library. A
+content already in the library is detected by its hash: under the same name nothing is written, under another name
+it's only a new alias, and its summary and preview are reused.
+"""
+
+import asyncio
+import io
+import zipfile
+from dataclasses import dataclass, field
+
+from discord import Attachment, HTTPException
+from rich import print
+
+from condor.catalog import get_catalog
+from condor.config import UploadConfig, get_config
+from condor.flight_plan import FlightPlan, parse_flight_plan
+from condor.flight_plan_store import get_flight_plan_store, hash_content
+from services.workers import run_io
+
+FLIGHT_PLAN_EXTENSION = ".fpl"
+ARCHIVE_EXTENSION = ".zip"
+UPLOAD_EXTENSIONS = (FLIGHT_PLAN_EXTENSION, ARCHIVE_EXTENSION)
+
+
+class UploadError(ValueError):
+    pass
+
+
+@dataclass
+class UploadReport:
+    accepted: list[FlightPlan] = field(default_factory=list)
+    rejected: list[tuple[str, str]] = field(default_factory=list)  # (filename, reason)
+    duplicates: dict[str, list[str]] = field(default_factory=dict)  # accepted filename => other names of its content
+    unchanged: list[str] = field(default_factory=list)  # already in the library, with the same name and content
+
+
+def check_flight_plan_filename(filename: str) -> str:
+    """Name of the flight plan in the library, files from archives are flattened"""
+    name = filename.replace("\\", "/").split("/")[-1]
+    if not name.lower().endswith(FLIGHT_PLAN_EXTENSION) or name.startswith(".") or len(name) <= len(".fpl"):
+        raise UploadError(f"{filename} is not a valid flight plan name")
+
+    return name
+
+
+def extract_archive(filename: str, data: bytes, limits: UploadConfig) -> list[tuple[str, bytes]]:
+    """Flight plans of a .zip archive, sizes are checked before decompression"""
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(data))
+    except zipfile.BadZipFile as exc:
+        raise UploadError(f"{filename} is not a valid zip archive") from exc
+
+    with archive:
+        members = [
+            info
+            for info in archive.infolist()
+            if not info.is_dir() and info.filename.lower().endswith(FLIGHT_PLAN_EXTENSION)
+        ]
+        if len(members) > limits.max_files:
+            raise UploadError(f"{filename} contains {len(members)} flight plans, limit is {limits.max_files}")
+        if sum(info.file_size for info in members) > limits.max_archive_bytes:
+            raise UploadError(f"{filename} is too large once uncompressed")
+
+        files = []
+        for info in members:
+            if info.file_size > limits.max_file_bytes:
+                raise UploadError(f"{info.filename} in {filename} is too large ({info.file_size} bytes)")
+            files.append((info.filename, archive.read(info)))
+
+    return files
+
+
+def validate_upload(files: list[tuple[str, bytes]], limits: UploadConfig) -> tuple[dict[str, bytes], UploadReport]:
+    """Parse every file, return the valid ones (by library name) and the report of the batch"""
+    report = UploadReport()
+    valid: dict[str, bytes] = {}
+
+    for filename, content in files:
+        try:
+            name = check_flight_plan_filename(filename)
+            if name in valid:
+                raise UploadError(f"{name} is uploaded more than once")
+            if len(content) > limits.max_file_bytes:
+                raise UploadError(f"{name} is too large ({len(content)} bytes)")
+
+            report.accepted.append(parse_flight_plan(name, content))
+            valid[name] = content
+        except ValueError as exc:  # upload errors, invalid flight plans
+            report.rejected.append((filename, str(exc)))
+
+    return valid, report
+
+
+def store_upload(valid: dict[str, bytes], report: UploadReport) -> None:
+    store = get_flight_plan_store()
+    catalog = get_catalog()
+    stored: dict[str, str] = {}  # filename => hash, indexed at once (a single write of the catalog)
+    replaced: set[str] = set()
+
+    for flight_plan in list(report.accepted):
+        filename = flight_plan.filename
+        try:
+            sha256 = hash_content(valid[filename])
+            previous = catalog.content_hash(filename)
+            if previous == sha256:
+                report.accepted.remove(flight_plan)
+                report.unchanged.append(filename)
+                continue
+
+            aliases = [alias for alias in catalog.aliases(sha256) if alias != filename]
+            aliases += [alias for alias, stored_sha256 in stored.items() if stored_sha256 == sha256]
+            store.add(filename, valid[filename], sha256)
+            stored[filename] = sha256
+            if aliases:
+                report.duplicates[filename] = aliases
+            if previous:
+                replaced.add(previous)
+            print(f"✅ flight plan [blue]{filename}[/blue] [green]saved[/green]")
+        except OSError as exc:
+            report.accepted.remove(flight_plan)
+            report.rejected.append((filename, f"couldn't be saved: {exc}"))
+
+    catalog.update_files(list(stored))
+    for sha256 in replaced:
+        if not catalog.aliases(sha256):
+            store.remove_blob(sha256)  # replaced, no other name has its content
+
+
+async def read_attachments(attachments: list[Attachment], limits: UploadConfig) -> tuple[list, list]:
+    """Content of the flight plans attached (archives extracted), and the attachments refused"""
+    slots = asyncio.Semaphore(limits.concurrent_downloads)
+    files: list[tuple[str, bytes]] = []
+    rejected: list[tuple[str, str]] = []
+
+    async def read(attachment: Attachment) -> None:
+        is_archive = attachment.filename.lower().endswith(ARCHIVE_EXTENSION)
+        max_bytes = limits.max_archive_bytes if is_archive else limits.max_file_bytes
+        try:
+            if attachment.size > max_bytes:
+                raise UploadError(f"{attachment.filename} is too large ({attachment.size} bytes)")
+            async with slots:
+                data = await attachment.read()
+            if is_archive:
+                files.extend(await run_io(extract_archive, attachment.filename, data, limits))
+            else:
+                files.append((attachment.filename, data))
+        except (ValueError, OSError, zipfile.BadZipFile, HTTPException) as exc:
+            rejected.append((attachment.filename, str(exc)))
+
+    await asyncio.gather(*[read(attachment) for attachment in attachments])
+
+    return files, rejected
+
+
+async def process_upload(attachments: list[Attachment]) -> UploadReport:
+    limits = get_config().upload
+    attachments = [attachment for attachment in attachments if attachment.filename.lower().endswith(UPLOAD_EXTENSIONS)]
+
+    files, rejected = await read_attachments(attachments, limits)
+    if len(files) > limits.max_files:
+        rejected.append((f"{len(files)} flight plans", f"more than {limits.max_files} flight plans in one upload"))
+        files = []
+
+    valid, report = await run_io(validate_upload, files, limits)
+    report.rejected = rejected + report.rejected
+    await run_io(store_upload, valid, report)
+
+    return report
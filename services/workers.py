@@ -0,0 +1,61 @@
+"""Worker pools, to keep blocking work out of the discord event loop
+
+Disk I/O (catalog scans, flight plans loading, cache reads) runs in a thread pool. CPU heavy preview rendering runs
+in the same threads by default, or in a process pool (render_processes): on windows, the processes are spawned and
+import the bot main module again. Pool sizes and the number of renders in progress are set in the `workers` section
+of config.yaml.
+"""
+
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import cache, partial
+from typing import Any
+
+from condor.config import get_config
+
+_render_slots: dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+
+
+@cache
+def get_io_executor() -> Executor:
+    return ThreadPoolExecutor(max_workers=get_config().workers.io_threads, thread_name_prefix="condor-io")
+
+
+@cache
+def get_render_executor() -> Executor:
+    render_processes = get_config().workers.render_processes
+    if render_processes <= 0:
+        # rendering in threads (PIL releases the GIL for most operations)
+        return get_io_executor()
+
+    return ProcessPoolExecutor(max_workers=render_processes)
+
+
+def _get_render_slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    if loop not in _render_slots:
+        _render_slots[loop] = asyncio.Semaphore(get_config().workers.max_concurrent_renders)
+
+    return _render_slots[loop]
+
+
+async def run_io(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking I/O function in the I/O thread pool"""
+    return await asyncio.get_running_loop().run_in_executor(get_io_executor(), partial(func, *args, **kwargs))
+
+
+async def run_render(func: Callable, *args, **kwargs) -> Any:
+    """Run a CPU heavy function in the render pool, func and its arguments must be picklable"""
+    async with _get_render_slots():
+        return await asyncio.get_running_loop().run_in_executor(get_render_executor(), partial(func, *args, **kwargs))
+
+
+def shutdown_workers() -> None:
+    if get_render_executor.cache_info().currsize:
+        get_render_executor().shutdown(cancel_futures=True)
+        get_render_executor.cache_clear()
+    if get_io_executor.cache_info().currsize:
+        get_io_executor().shutdown(cancel_futures=True)
+        get_io_executor.cache_clear()
+    _render_slots.clear()
@@ -0,0 +1,127 @@
+import os
+import shutil
+from unittest.mock import patch
+
+import pytest
+
+from condor.catalog import FlightPlanCatalog, FlightPlanSummary
+from condor.fpl_parser import parse_flight_plan_header
+
+
+def make_catalog(tmp_path) -> FlightPlanCatalog:
+    library = tmp_path / "library"
+    library.mkdir(exist_ok=True)
+    return FlightPlanCatalog(flight_plans_path=str(library), index_path=str(tmp_path / "cache" / "catalog.json"))
+
+
+def test_catalog_refresh(tmp_path):
+    catalog = make_catalog(tmp_path)
+    shutil.copy("tests/files/test.fpl", tmp_path / "library" / "test.fpl")
+    shutil.copy("tests/files/test2.fpl", tmp_path / "library" / "test2.fpl")
+
+    assert catalog.refresh()
+
+    summaries = catalog.list()
+    assert len(summaries) == 2
+
+    summary = summaries[0]
+    assert isinstance(summary, FlightPlanSummary)
+    assert summary.filename == "test.fpl"
+    assert summary.human_filename == "test"
+    assert summary.landscape == "Slovenia3"
+    assert summary.turnpoints_count == 6
+    assert round(summary.distance) == 107855
+    assert os.path.isfile(catalog.index_path)
+
+
+def test_catalog_reload_does_not_parse_again(tmp_path):
+    catalog = make_catalog(tmp_path)
+    shutil.copy("tests/files/test.fpl", tmp_path / "library" / "test.fpl")
+    catalog.refresh()
+
+    reloaded = make_catalog(tmp_path)
+    reloaded.load()
+    with patch("condor.catalog.parse_flight_plan_header") as mock_load:
+        assert not reloaded.refresh()
+        mock_load.assert_not_called()
+
+    assert reloaded.get("test.fpl").landscape == "Slovenia3"
+
+
+def test_catalog_refresh_only_changed_files(tmp_path):
+    catalog = make_catalog(tmp_path)
+    shutil.copy("tests/files/test.fpl", tmp_path / "library" / "test.fpl")
+    shutil.copy("tests/files/test2.fpl", tmp_path / "library" / "test2.fpl")
+    catalog.refresh()
+
+    # same content under a new name, a modified file and a deleted one
+    shutil.copy("tests/files/test.fpl", tmp_path / "library" / "renamed.fpl")
+    os.remove(tmp_path / "library" / "test.fpl")
+    with open(tmp_path / "library" / "test2.fpl", "at") as file:
+        file.write("\n")
+
+    with patch("condor.catalog.parse_flight_plan_header", wraps=parse_flight_plan_header) as mock_load:
+        assert catalog.refresh()
+        assert mock_load.call_count == 1
+
+    assert [summary.filename for summary in catalog.list()] == ["renamed.fpl", "test2.fpl"]
+    assert catalog.get("renamed.fpl").landscape == "Slovenia3"
+
+
+def test_catalog_aliases(tmp_path):
+    catalog = make_catalog(tmp_path)
+    shutil.copy("tests/files/test.fpl", tmp_path / "library" / "test.fpl")
+    catalog.refresh()
+    sha256 = catalog.get("test.fpl").sha256
+
+    shutil.copy("tests/files/test.fpl", tmp_path / "library" / "copy.fpl")
+    with patch("condor.catalog.parse_flight_plan_header") as mock_load:
+        assert catalog.update_file("copy.fpl").landscape == "Slovenia3"
+        mock_load.assert_not_called()
+
+    assert catalog.aliases(sha256) == ["copy.fpl", "test.fpl"]
+    assert catalog.content_hash("copy.fpl") == sha256 and catalog.content_hash("missing.fpl") is None
+
+    shutil.copy("tests/files/test2.fpl", tmp_path / "library" / "test.fpl")
+    catalog.update_file("test.fpl")
+    assert catalog.aliases(sha256) == ["copy.fpl"]
+    assert catalog.find_hash(catalog.get("test.fpl").sha256).landscape == "AA3"
+
+
+def test_catalog_ignores_invalid_files(tmp_path):
+    catalog = make_catalog(tmp_path)
+    (tmp_path / "library" / "broken.fpl").write_text("not a flight plan")
+    (tmp_path / "library" / "readme.txt").write_text("not a flight plan")
+
+    catalog.refresh()
+
+    assert catalog.list() == []
+
+
+def test_catalog_cp1252_file(tmp_path):
+    catalog = make_catalog(tmp_path)
+    shutil.copy("tests/files/test_cp1252.fpl", tmp_path / "library" / "test_cp1252.fpl")
+
+    catalog.refresh()
+
+    assert catalog.get("test_cp1252.fpl").turnpoint_names[2] == "Nanos Tv Stolp (Vipava, Côte 1262)"
+    assert catalog.search("côte")[0].filename == "test_cp1252.fpl"
+
+
+def test_catalog_sort_and_stats(tmp_path):
+    catalog = make_catalog(tmp_path)
+    shutil.copy("tests/files/test.fpl", tmp_path / "library" / "b.fpl")
+    shutil.copy("tests/files/test2.fpl", tmp_path / "library" / "A.fpl")
+    catalog.refresh()
+
+    assert [summary.filename for summary in catalog.list()] == ["A.fpl", "b.fpl"]
+    by_distance = catalog.list(sort="distance", reverse=True)
+    assert by_distance[0].distance >= by_distance[1].distance
+
+    stats = catalog.stats()
+    assert stats.flight_plans == 2
+    assert stats.total_distance == pytest.approx(sum(summary.distance for summary in by_distance))
+    assert stats.landscapes == {"AA3": 1, "Slovenia3": 1}
+
+    with pytest.raises(ValueError):
+        catalog.list(sort="unknown")
@@ -1,3 +1,4 @@
+import pytest
 from condor.config import load_config, Config, CondorServerConfig
 
 def test_load_config():
@@ -7,3 +8,25 @@ def test_load_config():
     assert isinstance(config, Config)
     assert isinstance(config.condor_server, CondorServerConfig)
     assert config.condor_server.admin_password == "MyAdminPassword"
+
+
+def test_several_servers():
+    raw_config = {
+        "discord": {"api_token": "token", "admin_channel_id": 1},
+        "flight_plans_path": "tests/files",
+        "condor_path": "C:\\Condor3",
+        "condor_servers": [{"name": "race", "port": 56278}, {"name": "training", "port": 56288, "condor_path": "D:"}],
+    }
+    config = Config.model_validate(raw_config)
+
+    assert config.condor_server.name == "race"
+    assert config.get_server().name == "race"
+    assert config.get_server("training").port == 56288
+    assert config.get_condor_path(config.get_server("race")) == "C:\\Condor3"
+    assert config.get_condor_path(config.get_server("training")) == "D:"
+    with pytest.raises(ValueError):
+        config.get_server("unknown")
+
+    raw_config["condor_servers"].append({"name": "race"})
+    with pytest.raises(ValueError):
+        Config.model_validate(raw_config)
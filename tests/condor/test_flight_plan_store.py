@@ -0,0 +1,55 @@
+import os
+
+from condor.flight_plan_store import FlightPlanStore, hash_content
+
+with open("tests/files/test.fpl", "rb") as file:
+    FLIGHT_PLAN = file.read()
+with open("tests/files/test2.fpl", "rb") as file:
+    FLIGHT_PLAN_2 = file.read()
+
+
+def make_store(tmp_path) -> FlightPlanStore:
+    library = tmp_path / "library"
+    library.mkdir(exist_ok=True)
+    return FlightPlanStore(str(library))
+
+
+def test_aliases_of_a_blob(tmp_path):
+    store = make_store(tmp_path)
+
+    sha256 = store.add("a.fpl", FLIGHT_PLAN)
+    assert store.add("b.fpl", FLIGHT_PLAN) == sha256 == hash_content(FLIGHT_PLAN)
+    store.add("b.fpl", FLIGHT_PLAN)  # already linked
+
+    assert [blob for blob, _ in store.blobs()] == [sha256]
+    assert store.is_linked("a.fpl", sha256) and store.is_linked("b.fpl", sha256)
+    assert sorted(os.listdir(store.flight_plans_path)) == [".store", "a.fpl", "b.fpl"]
+    with open(store.alias_path("b.fpl"), "rb") as file:
+        assert file.read() == FLIGHT_PLAN
+
+
+def test_replace_and_prune(tmp_path):
+    store = make_store(tmp_path)
+    first = store.add("task.fpl", FLIGHT_PLAN)
+
+    second = store.add("task.fpl", FLIGHT_PLAN_2)
+
+    with open(store.alias_path("task.fpl"), "rb") as file:
+        assert file.read() == FLIGHT_PLAN_2
+    assert store.prune({second}) == 1
+    assert [blob for blob, _ in store.blobs()] == [second] and not store.has_blob(first)
+
+
+def test_adopt_and_edited_alias(tmp_path):
+    store = make_store(tmp_path)
+    (tmp_path / "library" / "manual.fpl").write_bytes(FLIGHT_PLAN)
+
+    sha256 = store.adopt("manual.fpl")
+    assert store.is_linked("manual.fpl", sha256)
+
+    # edited in place, the blob no longer has the content of its hash: stored again on the next add
+    with open(store.alias_path("manual.fpl"), "ab") as file:
+        file.write(b"\n")
+    assert not store.has_blob(sha256)
+    store.add("again.fpl", FLIGHT_PLAN)
+    assert store.has_blob(sha256) and not store.is_linked("manual.fpl", sha256)
@@ -0,0 +1,92 @@
+import glob
+
+import pytest
+
+from condor.flight_plan import FlightPlan, load_flight_plan, load_flight_plan_configparser, parse_flight_plan
+from condor.fpl_parser import FlightPlanParseError, parse_flight_plan_header, read_flight_plan_header, tokenize_fpl
+
+FIXTURES = sorted(glob.glob("tests/files/*.fpl"))
+
+
+@pytest.mark.parametrize("filepath", FIXTURES)
+def test_load_flight_plan_same_as_configparser(filepath):
+    expected = load_flight_plan_configparser(filepath)
+
+    assert load_flight_plan(filepath) == expected
+    assert load_flight_plan(filepath, trusted=True).model_dump() == expected.model_dump()
+
+
+@pytest.mark.parametrize("filepath", FIXTURES)
+def test_read_flight_plan_header(filepath):
+    expected = load_flight_plan_configparser(filepath)
+
+    header = read_flight_plan_header(filepath)
+
+    assert header.version == expected.version
+    assert header.landscape == expected.landscape
+    assert header.turnpoints_count == len(expected.turnpoints)
+    assert header.distance == pytest.approx(expected.distance)
+
+
+def test_load_flight_plan_trusted_skips_validation():
+    fp = load_flight_plan("tests/files/test.fpl", trusted=True)
+
+    assert isinstance(fp, FlightPlan)
+    assert fp.filename == "test.fpl"
+    assert fp.turnpoints[0].name == "Ajdovscina"
+    assert fp.turnpoints[0].radius == 3000
+
+
+def test_cp1252_flight_plan():
+    filepath = "tests/files/test_cp1252.fpl"
+    with open(filepath, "rb") as file:
+        content = file.read()
+
+    assert load_flight_plan(filepath).turnpoints[2].name == "Nanos Tv Stolp (Vipava, Côte 1262)"
+    assert read_flight_plan_header(filepath).turnpoint_names[4] == "Nanos Tv Stolp (Vipava, Côte 1262)"
+    assert parse_flight_plan("upload.fpl", content).turnpoints[2].name == "Nanos Tv Stolp (Vipava, Côte 1262)"
+
+
+def test_header_stops_after_task_geometry():
+    lines = ["[Version]", "Condor version=3000", "[Task]", "Landscape=AA3", "Count=1", "TPPosX0=1", "TPPosY0=2"]
+
+    def file_lines():
+        yield from lines
+        raise AssertionError("the end of the file should not be read")
+
+    header = parse_flight_plan_header(file_lines())
+
+    assert header.landscape == "AA3"
+    assert header.pos_x == [1.0]
+    assert header.pos_y == [2.0]
+
+
+def test_tokenize_fpl_like_configparser():
+    lines = [
+        "; comment",
+        "[Task]",
+        "  Landscape = AA3 ",
+        "TPName0: Start",
+        "[Weather]",
+        "ignored line",
+        "[Plane]",
+        "Name=LS8",
+    ]
+
+    sections = tokenize_fpl(lines)
+
+    assert sections == {"Task": {"landscape": "AA3", "tpname0": "Start"}, "Plane": {"name": "LS8"}}
+
+
+@pytest.mark.parametrize(
+    "lines",
+    [
+        ["Landscape=AA3"],
+        ["[Task]", "Landscape"],
+        ["[Task]", "Landscape=AA3", "landscape=AA3"],
+        ["[Task]", "[Task]"],
+    ],
+)
+def test_tokenize_fpl_errors(lines):
+    with pytest.raises(FlightPlanParseError):
+        tokenize_fpl(lines)
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from condor.geometry import compute_batch_geometry, compute_task_geometry
+
+
+def test_task_geometry():
+    # X grows to the west, Y to the north
+    geometry = compute_task_geometry([0.0, 0.0, -3000.0, 1000.0], [0.0, 4000.0, 4000.0, 1000.0])
+
+    assert geometry.legs.tolist() == pytest.approx([4000.0, 3000.0, 5000.0])
+    assert geometry.bearings.tolist() == pytest.approx([0.0, 90.0, 233.13], abs=0.01)
+    assert geometry.cumulative.tolist() == pytest.approx([0.0, 4000.0, 7000.0, 12000.0])
+    assert geometry.total == pytest.approx(12000.0)
+    assert geometry.bbox == (-3000.0, 0.0, 1000.0, 4000.0)
+
+
+def test_task_geometry_without_turnpoints():
+    geometry = compute_task_geometry([], [])
+
+    assert geometry.total == 0.0
+    assert len(geometry.legs) == 0
+
+
+def test_batch_geometry_matches_task_geometry():
+    rng = np.random.default_rng(0)
+    tasks = [
+        (rng.uniform(0, 1e5, count).tolist(), rng.uniform(0, 1e5, count).tolist()) for count in (5, 0, 1, 2, 30, 1)
+    ]
+
+    batch = compute_batch_geometry(tasks)
+
+    assert batch.turnpoints.tolist() == [5, 0, 1, 2, 30, 1]
+    for index, (pos_x, pos_y) in enumerate(tasks):
+        geometry = compute_task_geometry(pos_x, pos_y)
+        assert batch.total[index] == pytest.approx(geometry.total)
+        assert batch.longest_leg[index] == pytest.approx(geometry.legs.max() if len(geometry.legs) else 0.0)
+        bbox = (batch.min_x[index], batch.min_y[index], batch.max_x[index], batch.max_y[index])
+        assert bbox == pytest.approx(geometry.bbox)
+
+
+def test_batch_geometry_empty():
+    batch = compute_batch_geometry([])
+
+    assert len(batch.total) == 0
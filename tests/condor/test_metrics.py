@@ -0,0 +1,86 @@
+import asyncio
+import urllib.request
+
+import pytest
+
+from condor.config import MetricsConfig
+from condor.metrics import (
+    MetricSpec,
+    MetricsRegistry,
+    configure_metrics,
+    count,
+    get_metrics,
+    measure,
+    start_metrics_server,
+    timed,
+)
+
+SPEC = MetricSpec("test_call_seconds", "Test calls", ("call",))
+
+
+@pytest.fixture
+def metrics():
+    registry = configure_metrics(MetricsConfig(enabled=True))
+    registry.metrics.clear()
+    yield registry
+    registry.metrics.clear()
+    configure_metrics(MetricsConfig())
+
+
+def test_histogram():
+    histogram = MetricsRegistry().histogram("latency_seconds", "Latency", ("call",))
+    for value in (0.002, 0.003, 0.004, 0.2):
+        histogram.observe(value, "status")
+
+    lines = histogram.render()
+    assert "# TYPE latency_seconds histogram" in lines
+    assert 'latency_seconds_bucket{call="status",le="0.005"} 3' in lines
+    assert 'latency_seconds_bucket{call="status",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{call="status"} 4' in lines
+    assert 0.001 < histogram.quantile(("status",), 0.5) <= 0.005
+
+
+def test_disabled_metrics_record_nothing():
+    registry = get_metrics()
+    assert not registry.enabled
+
+    with measure(SPEC, "status"):
+        pass
+    count(SPEC, "status")
+
+    assert SPEC.name not in registry.metrics
+
+
+def test_measure_and_count(metrics):
+    with measure(SPEC, "start"):
+        pass
+    with pytest.raises(RuntimeError), measure(SPEC, "start"):
+        raise RuntimeError("server window not found")
+    count(MetricSpec("test_lookups_total", "Lookups", ("result",)), "hit")
+
+    text = metrics.render()
+    assert 'test_call_seconds_count{call="start"} 2' in text
+    assert 'test_call_errors_total{call="start"} 1' in text
+    assert 'test_lookups_total{result="hit"} 1' in text
+    assert 'test_call_seconds{call="start"} count=2' in metrics.summary()
+
+
+def test_timed(metrics):
+    @timed(SPEC, lambda name: (name,))
+    async def call(name: str) -> str:
+        return name
+
+    assert asyncio.run(call("show")) == "show"
+    assert 'test_call_seconds_count{call="show"} 1' in metrics.render()
+
+
+def test_http_endpoint(metrics):
+    count(MetricSpec("test_requests_total", "Requests"))
+    server = start_metrics_server("127.0.0.1", 0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert "test_requests_total 1" in response.read().decode("utf-8")
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,66 @@
+import asyncio
+import pstats
+import time
+
+from condor.config import ProfilingConfig
+from condor.profiling import ProfilingSession, configure_profiling, get_profiling, profiled
+
+
+def busy(duration: float) -> None:
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        pass
+
+
+def test_deterministic_profile(tmp_path):
+    session = ProfilingSession(ProfilingConfig(interactions=1, output_path=str(tmp_path), top=5))
+
+    with session.profile("condor-show", "flight_plan=test.fpl"):
+        busy(0.01)
+    with session.profile("condor-show"):  # not armed anymore
+        pass
+
+    assert session.remaining == 0 and len(session.reports) == 1
+    report = session.reports[0]
+    assert report.name == "condor-show" and report.dump_path.endswith("-condor-show.prof")
+    assert any(function[2] == "busy" for function in pstats.Stats(report.dump_path).stats)
+    with open(report.summary_path, encoding="utf-8") as file:
+        summary = file.read()
+    assert summary.startswith("condor-show (flight_plan=test.fpl):")
+    assert "top 5 functions by own time" in summary and "busy" in summary
+
+
+def test_sampling_profile(tmp_path):
+    session = ProfilingSession(
+        ProfilingConfig(interactions=1, mode="sampling", sample_interval_ms=1, output_path=str(tmp_path))
+    )
+
+    with session.profile("console flight-plan import"):
+        busy(0.1)
+
+    report = session.reports[0]
+    assert report.dump_path.endswith("-console_flight-plan_import.folded")
+    with open(report.dump_path, encoding="utf-8") as file:
+        stacks = file.read().splitlines()
+    assert any(stack.startswith("MainThread;") and ";busy (test_profiling.py:" in stack for stack in stacks)
+    with open(report.summary_path, encoding="utf-8") as file:
+        assert "top 30 functions by cumulative samples" in file.read()
+
+
+def test_profiled_commands(tmp_path):
+    @profiled(lambda name: name)
+    async def command(name: str) -> str:
+        busy(0.001)
+        return name
+
+    configure_profiling(ProfilingConfig(output_path=str(tmp_path)))
+    assert asyncio.run(command("condor-list")) == "condor-list"
+    assert not list(tmp_path.iterdir())
+
+    get_profiling().arm(2, "sampling")
+    for name in ("condor-list", "condor-show", "condor-status"):
+        asyncio.run(command(name))
+    assert [report.name for report in get_profiling().reports] == ["condor-list", "condor-show"]
+    assert len(list(tmp_path.iterdir())) == 4
+
+    configure_profiling(ProfilingConfig())
@@ -0,0 +1,54 @@
+from condor.search_index import SearchIndex, split_terms
+
+
+def make_index() -> SearchIndex:
+    index = SearchIndex()
+    index.add("ridge.fpl", "Evening ridge", "Slovenia3", ["Ajdovščina", "Nanos Tv Stolp"])
+    index.add("alps.fpl", "Alps 300km", "Alps", ["Bovec", "Kobarid"])
+    index.add("nanos.fpl", "Nanos out and return", "Slovenia3", ["Lesce", "Bled"])
+    return index
+
+
+def test_split_terms():
+    assert split_terms("Ajdovščina - Nanos_Tv") == ["ajdovscina", "nanos", "tv"]
+
+
+def test_search_by_name_prefix():
+    index = make_index()
+
+    assert index.search("ev") == ["ridge.fpl"]
+    assert index.search("alps 3") == ["alps.fpl"]
+    assert index.search("") == ["alps.fpl", "ridge.fpl", "nanos.fpl"]
+    assert index.search("", limit=1) == ["alps.fpl"]
+
+
+def test_search_ranking():
+    index = make_index()
+
+    # name matches come before landscape and turnpoint matches
+    assert index.search("nanos") == ["nanos.fpl", "ridge.fpl"]
+    assert index.search("slovenia") == ["ridge.fpl", "nanos.fpl"]
+    assert index.search("ajdovscina") == ["ridge.fpl"]
+    assert index.search("Ajdovščina stolp") == ["ridge.fpl"]
+
+
+def test_search_substring_needs_whole_word():
+    index = make_index()
+
+    # trigrams "bov" and "rid" exist, but not in the same term
+    assert index.search("bovrid") == []
+    assert index.search("obari") == ["alps.fpl"]
+    assert index.search("xyz") == []
+
+
+def test_incremental_updates():
+    index = make_index()
+
+    index.remove("alps.fpl")
+    assert index.search("alps") == []
+    assert "bov" not in index.postings[2] and len(index.ids) == 2
+
+    index.add("ridge.fpl", "Morning ridge", "Slovenia3")
+    assert index.search("evening") == []
+    assert index.search("morning") == ["ridge.fpl"]
+    assert len(index) == 2
@@ -0,0 +1,114 @@
+import os
+import shutil
+import tracemalloc
+
+from condor.config import ServerLogConfig
+from condor.server_log import LogStatusSource, LogTailer, ServerLogMonitor
+from condor.server_manager import OnlineStatus
+
+# tests/files/server.log is a synthetic log, in the format of the default (placeholder) patterns of ServerLogConfig:
+# these tests check the tailing and the events, not the format of a real CondorDedicated log
+SESSION_END = [
+    "18.10.2026 21:02:18 Race finished\n",
+    "18.10.2026 21:02:20 Player left: Jean DUPONT (JD)\n",
+    "18.10.2026 21:05:00 Server stopped\n",
+]
+
+
+def make_log(tmp_path) -> str:
+    path = str(tmp_path / "DedicatedServer.log")
+    shutil.copy("tests/files/server.log", path)
+    return path
+
+
+def append(path: str, *lines: str) -> None:
+    with open(path, "at", encoding="utf-8") as file:
+        file.writelines(lines)
+
+
+def test_recorded_session(tmp_path):
+    path = make_log(tmp_path)
+    monitor = ServerLogMonitor(path, ServerLogConfig())
+
+    status = monitor.poll()
+    assert status.version == "3.0.6"
+    assert status.online_status == OnlineStatus.RACE_IN_PROGRESS
+    assert status.players == ["Jean DUPONT (JD)"]
+
+    append(path, SESSION_END[0])
+    assert monitor.poll().online_status == OnlineStatus.JOINING_DISABLED
+    append(path, *SESSION_END[1:])
+    status = monitor.poll()
+    assert status.online_status == OnlineStatus.NOT_RUNNING and status.players == []
+    assert monitor.lines == 15
+
+
+def test_new_lines_only(tmp_path):
+    path = make_log(tmp_path)
+    tailer = LogTailer(path)
+
+    assert len(list(tailer.read_lines())) == 12
+    assert list(tailer.read_lines()) == []
+
+    append(path, "18.10.2026 21:00:00 Player joi")  # line being written
+    assert list(tailer.read_lines()) == []
+    append(path, "ned: Carl (C)\r\n")
+    assert list(tailer.read_lines()) == ["18.10.2026 21:00:00 Player joined: Carl (C)"]
+    assert tailer.offset == os.path.getsize(path)
+
+
+def test_rotation_and_truncation(tmp_path):
+    path = make_log(tmp_path)
+    monitor = ServerLogMonitor(path, ServerLogConfig())
+    monitor.poll()
+
+    os.replace(path, f"{path}.1")
+    assert monitor.poll().players == ["Jean DUPONT (JD)"]  # not created again yet
+    append(path, "18.10.2026 21:10:00 Server started on port 56278\n", "18.10.2026 21:10:30 Player joined: Carl (C)\n")
+    status = monitor.poll()
+    assert monitor.tailer.rotations == 1
+    assert status.online_status == OnlineStatus.JOINING_ENABLED and status.players == ["Carl (C)"]
+
+    with open(path, "wt", encoding="utf-8") as file:
+        file.write("18.10.2026 21:10:00 Server started on port 56278\n")
+    assert monitor.poll().players == []
+    assert monitor.tailer.truncations == 1
+
+
+def test_large_log_constant_memory(tmp_path):
+    path = str(tmp_path / "DedicatedServer.log")
+    with open(path, "wt", encoding="utf-8") as file:
+        file.write("18.10.2026 20:01:05 Server started on port 56278\n")
+        for index in range(30_000):
+            file.write(f"18.10.2026 20:02:41 Player joined: Pilot {index % 50}\n")
+            file.write(f"18.10.2026 20:02:42 Chat [Pilot {index % 50}]: {'x' * 40}\n")
+            file.write(f"18.10.2026 20:02:43 Player left: Pilot {index % 50}\n")
+        file.write("18.10.2026 20:02:41 Player joined: Last\n")
+        file.write("y" * 100_000 + "\n")  # not a server line, skipped
+    assert os.path.getsize(path) > 4_000_000
+
+    monitor = ServerLogMonitor(path, ServerLogConfig())
+    tracemalloc.start()
+    status = monitor.poll()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert status.players == ["Last"]
+    assert peak < 1_000_000
+
+
+def test_offline_when_process_not_running(tmp_path):
+    running = [True]
+    source = LogStatusSource("default", ServerLogMonitor(make_log(tmp_path), ServerLogConfig()), lambda: running[0])
+
+    assert source.get_status().online_status == OnlineStatus.RACE_IN_PROGRESS
+    running[0] = False
+    status = source.get_status()
+    assert status.online_status == OnlineStatus.OFFLINE and status.players == []
+
+
+def test_not_running_until_logged(tmp_path):
+    source = LogStatusSource(
+        "default", ServerLogMonitor(str(tmp_path / "missing.log"), ServerLogConfig()), lambda: True
+    )
+    assert source.get_status().online_status == OnlineStatus.NOT_RUNNING
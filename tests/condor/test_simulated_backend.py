@@ -0,0 +1,86 @@
+from condor.backends.simulated import SimulatedBackend, format_duration
+from condor.config import SimulatedServerConfig
+from condor.server_manager import OnlineStatus
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.slept = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept += seconds
+
+
+def create_backend(clock: FakeClock, **kwargs) -> SimulatedBackend:
+    config = SimulatedServerConfig(
+        status_latency_ms=10,
+        start_latency_ms=100,
+        stop_latency_ms=50,
+        startup_delay=5,
+        join_duration=60,
+        race_duration=600,
+        player_interval=10,
+        max_players=4,
+        **kwargs,
+    )
+    return SimulatedBackend(config, clock=clock, sleep=clock.sleep)
+
+
+def test_format_duration():
+    assert format_duration(0) == "00:00:00"
+    assert format_duration(3725.9) == "01:02:05"
+
+
+def test_timeline():
+    clock = FakeClock()
+    backend = create_backend(clock)
+
+    status, process = backend.get_status()
+    assert status.online_status == OnlineStatus.OFFLINE
+    assert process is None
+
+    assert backend.start("test.fpl")
+    assert backend.get_status()[0].online_status == OnlineStatus.NOT_RUNNING
+
+    clock.now += 5
+    status, process = backend.get_status()
+    assert status.online_status == OnlineStatus.JOINING_ENABLED
+    assert status.stop_join_in == "00:01:00"
+    assert status.players == ["Player 1"]
+    assert process is backend
+
+    clock.now += 25
+    assert len(backend.get_status()[0].players) == 3
+
+    clock.now += 35
+    status = backend.get_status()[0]
+    assert status.online_status == OnlineStatus.RACE_IN_PROGRESS
+    assert status.stop_join_in is None
+    assert len(status.players) == 4
+
+    clock.now += 20
+    assert len(backend.get_status()[0].players) == 2
+
+    clock.now += 600
+    status = backend.get_status()[0]
+    assert status.online_status == OnlineStatus.JOINING_DISABLED
+    assert status.players == []
+
+    backend.stop(process)
+    assert backend.get_status()[0].online_status == OnlineStatus.OFFLINE
+
+
+def test_latency():
+    clock = FakeClock()
+    backend = create_backend(clock, latency_jitter_ms=10, seed=1)
+
+    backend.get_status()
+    backend.start("test.fpl")
+    backend.stop(backend)
+
+    assert backend.calls == 3
+    assert 0.160 <= clock.slept <= 0.190
@@ -0,0 +1,15 @@
+from unittest.mock import patch
+
+import pytest
+
+from condor.config import WorkersConfig, load_config
+from services.workers import shutdown_workers
+
+
+@pytest.fixture
+def workers_config():
+    config = load_config("tests/config_test.yaml")
+    config.workers = WorkersConfig(io_threads=2, render_processes=1, max_concurrent_renders=1)
+    with patch("services.workers.get_config", return_value=config):
+        yield config
+        shutdown_workers()
@@ -0,0 +1,64 @@
+import csv
+import io
+import json
+import shutil
+from unittest.mock import patch
+
+from condor.catalog import FlightPlanCatalog
+from services.flight_plan_list import FlightPlanList, ListQuery, export_flight_plans
+
+
+def make_catalog(tmp_path, count: int) -> FlightPlanCatalog:
+    library = tmp_path / "library"
+    library.mkdir()
+    for index in range(count):
+        shutil.copy("tests/files/test.fpl", library / f"task{index:02d}.fpl")
+    shutil.copy("tests/files/test2.fpl", library / "other.fpl")
+
+    catalog = FlightPlanCatalog(flight_plans_path=str(library), index_path=str(tmp_path / "catalog.json"))
+    catalog.refresh()
+    return catalog
+
+
+def test_pages(tmp_path):
+    flight_plans = FlightPlanList(make_catalog(tmp_path, 9), page_size=4)
+
+    first = flight_plans.page(ListQuery())
+    assert (first.number, first.pages, first.total) == (0, 3, 10)
+    assert first.has_next and not first.has_previous
+    assert "1. other.fpl" in first.content
+    assert "4. task02.fpl" in first.content and "task03.fpl" not in first.content
+
+    last = flight_plans.page(ListQuery(), 10)
+    assert last.number == 2 and not last.has_next
+    assert "10. task08.fpl" in last.content
+
+    landscape = flight_plans.page(ListQuery(landscape="aa3"))
+    assert landscape.total == 1 and "other.fpl" in landscape.content
+    assert flight_plans.page(ListQuery(search="task0")).total == 9
+
+
+def test_pages_cached_until_catalog_changes(tmp_path):
+    catalog = make_catalog(tmp_path, 3)
+    flight_plans = FlightPlanList(catalog, page_size=2)
+
+    page = flight_plans.page(ListQuery(sort="distance", reverse=True))
+    with patch.object(catalog, "list") as mock_list:
+        assert flight_plans.page(ListQuery(sort="distance", reverse=True)) is page
+        mock_list.assert_not_called()
+
+    catalog.remove_file("task00.fpl")
+    assert flight_plans.page(ListQuery(sort="distance", reverse=True)).total == 3
+
+
+def test_export(tmp_path):
+    summaries = make_catalog(tmp_path, 2).list()
+
+    with export_flight_plans(summaries, "csv") as file:
+        rows = list(csv.DictReader(io.TextIOWrapper(file, encoding="utf-8")))
+    assert [row["filename"] for row in rows] == ["other.fpl", "task00.fpl", "task01.fpl"]
+    assert rows[1]["landscape"] == "Slovenia3"
+
+    with export_flight_plans(summaries, "json") as file:
+        entries = json.load(file)
+    assert len(entries) == 3 and entries[2]["turnpoints_count"] == 6
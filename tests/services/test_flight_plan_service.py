@@ -0,0 +1,64 @@
+from unittest.mock import patch
+
+import pytest
+from PIL import Image, ImageChops, ImageDraw
+
+from condor.flight_plan import load_flight_plan
+from services.flight_plan_service import (
+    FLIGHT_PLAN_PATH_COLOR,
+    get_flight_plan_area,
+    get_image_of_flight_plan,
+    transpose_map_xy,
+)
+from services.landscape_bitmap import LandscapeBitmap, PillowBitmap, open_bitmap
+
+
+def make_landscape(filepath, size: tuple[int, int] = (3000, 1000), mode: str = "RGB") -> None:
+    image = Image.linear_gradient("L").resize(size).convert("RGB")
+    ImageDraw.Draw(image).rectangle((100, 100, 400, 300), fill=(10, 200, 30))
+    if mode == "P":
+        image = image.quantize(64)
+    elif mode != "RGB":
+        image = image.convert(mode)
+    image.save(filepath)
+
+
+def assert_same_image(image: Image.Image, expected: Image.Image) -> None:
+    assert image.size == expected.size
+    assert ImageChops.difference(image.convert("RGB"), expected.convert("RGB")).getbbox() is None
+
+
+@pytest.mark.parametrize("mode", ["RGB", "RGBA", "P"])
+def test_landscape_bitmap_read_region(tmp_path, mode):
+    filepath = tmp_path / "landscape.bmp"
+    make_landscape(filepath, size=(301, 203), mode=mode)
+
+    with LandscapeBitmap(str(filepath)) as bitmap, Image.open(filepath) as expected:
+        assert bitmap.size == (301, 203)
+        for box in [(0, 0, 301, 203), (17, 5, 120, 99), (250, 150, 301, 203)]:
+            assert_same_image(bitmap.read_region(box), expected.crop(box))
+
+
+def test_open_bitmap_fallback(tmp_path):
+    filepath = tmp_path / "landscape.png"
+    make_landscape(filepath, size=(100, 100))
+
+    with open_bitmap(str(filepath)) as bitmap:
+        assert isinstance(bitmap, PillowBitmap)
+        assert bitmap.read_region((10, 10, 20, 30)).size == (10, 20)
+
+
+def test_get_image_of_flight_plan(tmp_path):
+    landscape_filepath = tmp_path / "Slovenia3.bmp"
+    make_landscape(landscape_filepath)
+    flight_plan = load_flight_plan("tests/files/test.fpl")
+
+    with patch("services.flight_plan_service.get_landscape_image_filepath", return_value=str(landscape_filepath)):
+        image = get_image_of_flight_plan(flight_plan)
+
+    # same result as drawing the task on the whole landscape image
+    with Image.open(landscape_filepath) as landscape:
+        expected = landscape.convert("RGB")
+    points = [transpose_map_xy(expected.size, tp.pos_x, tp.pos_y) for tp in flight_plan.turnpoints]
+    ImageDraw.Draw(expected).line(points, width=5, fill=FLIGHT_PLAN_PATH_COLOR)
+    assert_same_image(image, expected.crop(get_flight_plan_area(expected.size, points)))
@@ -0,0 +1,117 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+from condor.server_manager import OnlineStatus, ServerStatus
+from services.history import HistoryRecorder, HistoryStore, PlayerInterval, SessionRecord
+
+DAY = 86400
+START = 1_790_000_000.0  # 2026-09-21
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = START
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def status(online_status: OnlineStatus, *players: str) -> ServerStatus:
+    return ServerStatus(online_status=online_status, players=list(players))
+
+
+def test_sessions_from_snapshots(tmp_path, workers_config):
+    clock = FakeClock()
+    history = HistoryRecorder(HistoryStore(str(tmp_path / "history.sqlite3")), flush_interval=3600, clock=clock)
+
+    history.observe("race", status(OnlineStatus.OFFLINE))
+    history.record_start("race", "task.fpl")
+    snapshots = [
+        (0, status(OnlineStatus.NOT_RUNNING)),
+        (10, status(OnlineStatus.JOINING_ENABLED)),
+        (70, status(OnlineStatus.JOINING_ENABLED, "Jean", "Anna")),
+        (670, status(OnlineStatus.RACE_IN_PROGRESS, "Jean", "Anna")),
+        (1870, status(OnlineStatus.RACE_IN_PROGRESS, "Jean")),
+        (3670, status(OnlineStatus.JOINING_DISABLED)),
+        (3680, status(OnlineStatus.OFFLINE)),
+    ]
+    for elapsed, snapshot in snapshots:
+        clock.now = START + elapsed
+        history.observe("race", snapshot)
+
+    assert not history.sessions
+    [record] = history.pending
+    assert (record.flight_plan, record.ended - record.started) == ("task.fpl", 3670)
+    assert record.pilots == {"Anna": 1800, "Jean": 3600}
+
+    asyncio.run(history.flush())
+    stats = history.store.stats()
+    assert (stats.sessions, stats.pilots, stats.flight_seconds) == (1, 2, 5400)
+    assert stats.flight_plans[0].flight_plan == "task.fpl" and stats.flight_plans[0].max_pilots == 2
+    assert [pilot.player for pilot in stats.top_pilots] == ["Jean", "Anna"]
+
+
+def test_batched_writes(tmp_path, workers_config):
+    clock = FakeClock()
+    history = HistoryRecorder(
+        HistoryStore(str(tmp_path / "history.sqlite3")), flush_interval=3600, flush_sessions=3, clock=clock
+    )
+
+    async def sessions(count: int) -> None:
+        for _ in range(count):
+            for online_status in (OnlineStatus.JOINING_ENABLED, OnlineStatus.OFFLINE):
+                clock.now += 60
+                history.observe("race", status(online_status, "Jean"))
+        if history._flush_task:
+            await history._flush_task
+
+    with patch.object(history.store, "write", wraps=history.store.write) as mock_write:
+        asyncio.run(sessions(2))
+        mock_write.assert_not_called()
+        asyncio.run(sessions(1))
+        mock_write.assert_called_once()
+
+    assert not history.pending
+    assert history.store.stats().sessions == 3
+
+
+def test_close_ends_open_sessions(tmp_path):
+    clock = FakeClock()
+    history = HistoryRecorder(HistoryStore(str(tmp_path / "history.sqlite3")), clock=clock)
+    history.observe("race", status(OnlineStatus.RACE_IN_PROGRESS, "Jean"))
+    clock.now += 600
+
+    history.close()
+
+    stats = HistoryStore(str(tmp_path / "history.sqlite3")).stats()
+    assert stats.sessions == 1 and stats.flight_seconds == 600
+
+
+def test_stats_of_months(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    for day in range(365):
+        started = START - day * DAY
+        store.write(
+            [
+                SessionRecord(
+                    server=("race", "training")[session % 2],
+                    flight_plan=f"task{(day + session) % 40}.fpl",
+                    started=started + session * 3600,
+                    ended=started + session * 3600 + 3000,
+                    intervals=[
+                        PlayerInterval(f"pilot{(day + pilot) % 200}", started, started + 2400) for pilot in range(12)
+                    ],
+                )
+                for session in range(6)
+            ]
+        )
+
+    started = time.perf_counter()
+    stats = store.stats(since=START - 180 * DAY, server="race")
+    elapsed = time.perf_counter() - started
+
+    assert stats.sessions == 181 * 3
+    assert stats.pilots == 192  # pilot<day> to pilot<day + 11>, days 0 to 180
+    assert len(stats.flight_plans) == 5 and stats.flight_plans[0].max_pilots == 12
+    assert elapsed < 0.5
@@ -0,0 +1,99 @@
+import os
+from unittest.mock import patch
+
+from PIL import Image
+
+from condor.flight_plan import load_flight_plan
+from services.flight_plan_service import get_image_of_flight_plan
+from services.landscape_pyramid import LandscapePyramid, choose_level, level_size
+from tests.services.test_flight_plan_service import assert_same_image, make_landscape
+
+
+def make_pyramid(tmp_path, size: tuple[int, int] = (600, 301)) -> LandscapePyramid:
+    make_landscape(tmp_path / "landscape.bmp", size=size)
+    return LandscapePyramid(str(tmp_path / "landscape.bmp"), str(tmp_path / "pyramid"), tile_size=64)
+
+
+def test_level_size():
+    assert level_size((600, 301), 0) == (600, 301)
+    assert level_size((600, 301), 1) == (300, 151)
+    assert level_size((600, 301), 2) == (150, 76)
+
+
+def test_choose_level():
+    assert choose_level((3000, 1000), max_size=0, levels=5) == 0
+    assert choose_level((800, 600), max_size=1024, levels=5) == 0
+    assert choose_level((3000, 1000), max_size=1024, levels=5) == 2
+    assert choose_level((3000, 1000), max_size=1024, levels=1) == 1
+
+
+def test_pyramid_build(tmp_path):
+    pyramid = make_pyramid(tmp_path).ensure()
+
+    assert pyramid.levels == 4
+    assert pyramid.is_valid()
+
+    expected = Image.open(tmp_path / "landscape.bmp").convert("RGB")
+    for level in range(1, pyramid.levels + 1):
+        expected = expected.reduce(2)
+        width, height = level_size(pyramid.size, level)
+        assert expected.size == (width, height)
+        assert_same_image(pyramid.read_region(level, (0, 0, width, height)), expected)
+        assert_same_image(
+            pyramid.read_region(level, (5, 3, width // 2, height - 1)), expected.crop((5, 3, width // 2, height - 1))
+        )
+
+
+def test_pyramid_invalidated_when_landscape_changes(tmp_path):
+    pyramid = make_pyramid(tmp_path).ensure()
+
+    make_landscape(tmp_path / "landscape.bmp", size=(200, 100))
+    os.utime(tmp_path / "landscape.bmp", ns=(0, 0))
+
+    assert not pyramid.is_valid()
+    pyramid.ensure()
+    assert pyramid.size == (200, 100)
+    assert pyramid.levels == 2
+
+
+def test_corrupt_manifest_rebuilt(tmp_path):
+    pyramid = make_pyramid(tmp_path).ensure()
+    (tmp_path / "pyramid" / "manifest.json").write_text('{"version": 1, "sou')
+
+    assert not pyramid.is_valid()
+    pyramid.ensure()
+    assert pyramid.is_valid() and pyramid.levels == 4
+
+
+def test_concurrent_pyramid_builds(tmp_path):
+    pyramid = make_pyramid(tmp_path)
+    other = LandscapePyramid(pyramid.bitmap_path, pyramid.pyramid_path, tile_size=64)
+    manifest_path = tmp_path / "pyramid" / "manifest.json"
+
+    def build_other_first(build_path: str) -> None:
+        other.build()  # moved in place while this build runs
+        os.utime(manifest_path, ns=(0, 0))
+        move_in_place(build_path)
+
+    move_in_place = pyramid._move_in_place
+    with patch.object(pyramid, "_move_in_place", build_other_first):
+        pyramid.build()
+
+    assert os.stat(manifest_path).st_mtime_ns == 0  # the first pyramid is kept, the second one discarded
+    assert pyramid.is_valid() and pyramid.levels == 4
+    assert sorted(os.listdir(tmp_path)) == ["landscape.bmp", "pyramid"]  # no build directory left
+
+
+def test_get_image_of_flight_plan_uses_pyramid(tmp_path):
+    pyramid = make_pyramid(tmp_path, size=(3000, 1000))
+    flight_plan = load_flight_plan("tests/files/test.fpl")
+
+    with (
+        patch("services.flight_plan_service.get_landscape_image_filepath", return_value=pyramid.bitmap_path),
+        patch("services.flight_plan_service.get_landscape_pyramid", return_value=pyramid.ensure()),
+    ):
+        full_image = get_image_of_flight_plan(flight_plan)
+        image = get_image_of_flight_plan(flight_plan, max_size=200)
+
+    assert max(image.size) <= 200 + 2 * 50
+    assert max(image.size) < max(full_image.size)
@@ -0,0 +1,81 @@
+import json
+import os
+import shutil
+from unittest.mock import patch
+
+from condor.flight_plan_store import FlightPlanStore, hash_content
+from services.library_service import import_library, run_library_job, validate_library
+
+
+def make_tree(tmp_path) -> str:
+    root = tmp_path / "tasks"
+    (root / "2024").mkdir(parents=True)
+    (root / "2025").mkdir()
+    shutil.copy("tests/files/test.fpl", root / "2024" / "test.fpl")
+    shutil.copy("tests/files/test2.fpl", root / "2025" / "test2.fpl")
+    shutil.copy("tests/files/test2.fpl", root / "2025" / "test.fpl")
+    (root / "2025" / "broken.fpl").write_text("no section")
+    (root / "2025" / "notes.txt").write_text("not a flight plan")
+    (root / ".store" / "ab").mkdir(parents=True)  # blobs of a library, not walked
+    shutil.copy("tests/files/test.fpl", root / ".store" / "ab" / "ab12.fpl")
+    return str(root)
+
+
+def landscape_installed(landscape: str) -> bool:
+    return landscape == "Slovenia3"
+
+
+def test_validate_library(tmp_path):
+    root = make_tree(tmp_path)
+    report_path = str(tmp_path / "report.jsonl")
+
+    with patch("services.library_service.landscape_exists", landscape_installed):
+        report = run_library_job(validate_library(root), report_path=report_path)
+
+    assert (report.files, report.valid, report.invalid, report.missing_landscape) == (4, 3, 1, 2)
+    with open(report_path) as file:
+        lines = [json.loads(line) for line in file]
+    assert [line["filename"] for line in lines] == ["test.fpl", "broken.fpl", "test.fpl", "test2.fpl"]
+    assert lines[1]["error"] == "line 1: file contains no section headers"
+    assert lines[0]["landscape_found"] and not lines[3]["landscape_found"]
+
+
+def test_validate_library_in_processes(tmp_path):
+    root = make_tree(tmp_path)
+
+    results = list(validate_library(root, workers=2))
+
+    assert [result.valid for result in results] == [True, False, True, True]
+
+
+def test_import_library(tmp_path):
+    root = make_tree(tmp_path)
+    library = tmp_path / "library"
+    library.mkdir()
+
+    with patch("services.library_service.landscape_exists", landscape_installed):
+        report = run_library_job(import_library(root, str(library)))
+
+    # test2.fpl landscape isn't installed, the second test.fpl has the same name as the first one
+    assert report.imported == 1
+    assert sorted(os.listdir(library)) == [".store", "test.fpl"]
+
+    with patch("services.library_service.landscape_exists", landscape_installed):
+        results = list(import_library(root, str(library)))
+    assert results[0].error == "already in the library"
+
+
+def test_import_library_overwrite(tmp_path):
+    root = make_tree(tmp_path)
+    library = tmp_path / "library"
+    store = FlightPlanStore(str(library))
+    previous = store.add("test.fpl", (tmp_path / "tasks" / "2025" / "test2.fpl").read_bytes())
+    store.add("other.fpl", b"another content")
+
+    with patch("services.library_service.landscape_exists", landscape_installed):
+        report = run_library_job(import_library(root, str(library), overwrite=True))
+
+    assert report.imported == 1
+    assert store.is_linked("test.fpl", hash_content((tmp_path / "tasks" / "2024" / "test.fpl").read_bytes()))
+    assert not store.has_blob(previous)  # no other name uses the replaced content
+    assert len(list(store.blobs())) == 2
@@ -0,0 +1,182 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from condor.backends.simulated import SimulatedBackend
+from condor.config import LifecycleConfig, SimulatedServerConfig
+from condor.server_manager import LifecycleStep, OnlineStatus
+from services.lifecycle import (
+    LifecycleBusyError,
+    LifecycleError,
+    LifecycleOperation,
+    ServerLifecycle,
+    _exclusive_lock,
+)
+
+
+class StepCounter:
+    """Launch steps running at the same time, across servers"""
+
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self.launches = 0
+        self._lock = threading.Lock()
+
+    def enter(self) -> None:
+        with self._lock:
+            self.running += 1
+            self.launches += 1
+            self.max_running = max(self.max_running, self.running)
+
+    def leave(self) -> None:
+        with self._lock:
+            self.running -= 1
+
+
+class SlowLaunchBackend(SimulatedBackend):
+    """Simulated server with a launch step of a fixed duration, which ignores its timeout"""
+
+    def __init__(self, duration: float, counter: StepCounter, exclusive: str | None = None):
+        super().__init__(SimulatedServerConfig(status_latency_ms=0, start_latency_ms=0, startup_delay=0.02))
+        self.duration = duration
+        self.counter = counter
+        self.exclusive = exclusive
+
+    def start_steps(self, flight_plan_filename, config):
+        def launch(timeout: float) -> None:
+            self.counter.enter()
+            time.sleep(self.duration)
+            self.counter.leave()
+            self.start(flight_plan_filename)
+
+        return [LifecycleStep("launching", launch, config.launch_timeout, self.exclusive)]
+
+
+def create_lifecycle(backend: SimulatedBackend, **kwargs) -> ServerLifecycle:
+    config = LifecycleConfig(joinable_timeout=2.0, joinable_poll_interval=0.01, **kwargs)
+    return ServerLifecycle("race", backend, config)
+
+
+def test_start_and_stop_progress(workers_config):
+    backend = SimulatedBackend(
+        SimulatedServerConfig(status_latency_ms=0, start_latency_ms=20, stop_latency_ms=0, startup_delay=0.05)
+    )
+    lifecycle = create_lifecycle(backend)
+    started: list[str] = []
+    lifecycle.on_started = started.append
+    reports: list[str] = []
+
+    async def progress(operation: LifecycleOperation) -> None:
+        reports.append(operation.describe())
+
+    async def start_and_stop() -> tuple[LifecycleOperation, LifecycleOperation]:
+        return await lifecycle.start("task.fpl", "Jean", progress), await lifecycle.stop("Jean", progress)
+
+    start, stop = asyncio.run(start_and_stop())
+
+    assert [(step.name, step.state) for step in start.steps] == [("launching", "done"), ("joinable", "done")]
+    assert [(step.name, step.state) for step in stop.steps] == [("stopping", "done")]
+    assert started == ["task.fpl"]
+    assert reports[0] == "**race** start with flight plan task.fpl\n▫️ launching\n▫️ joinable"
+    assert reports[1].endswith("⏳ launching\n▫️ joinable")
+    assert backend.get_status()[0].online_status == OnlineStatus.OFFLINE
+
+
+def test_conflicts_rejected(workers_config):
+    counter = StepCounter()
+    lifecycle = create_lifecycle(SlowLaunchBackend(0.05, counter))
+
+    async def start_twice() -> list:
+        first = asyncio.create_task(lifecycle.start("task.fpl", "Jean"))
+        await asyncio.sleep(0.02)
+        return await asyncio.gather(first, lifecycle.start("task.fpl", "Anna"), return_exceptions=True)
+
+    first, second = asyncio.run(start_twice())
+
+    assert isinstance(first, LifecycleOperation)
+    assert isinstance(second, LifecycleBusyError)
+    assert str(second) == "server race is starting (launching), requested by Jean"
+    assert counter.launches == 1
+
+
+def test_conflicts_queued(workers_config):
+    counter = StepCounter()
+    backend = SlowLaunchBackend(0.05, counter)
+    lifecycle = create_lifecycle(backend, conflicts="queue", max_queued=1)
+
+    async def operations() -> list:
+        return await asyncio.gather(
+            lifecycle.start("task.fpl"), lifecycle.start("other.fpl"), lifecycle.stop(), return_exceptions=True
+        )
+
+    start, second_start, stop = asyncio.run(operations())
+
+    assert isinstance(start, LifecycleOperation)
+    assert isinstance(second_start, LifecycleError) and "already running" in str(second_start)
+    assert isinstance(stop, LifecycleBusyError) and "1 operation(s) already waiting" in str(stop)
+    assert counter.launches == 1 and backend.flight_plan_filename == "task.fpl"
+
+
+def test_step_timeout_keeps_server_busy(workers_config):
+    counter = StepCounter()
+    lifecycle = create_lifecycle(SlowLaunchBackend(0.3, counter), launch_timeout=0.05, conflicts="queue")
+    reports: list[str] = []
+
+    async def progress(operation: LifecycleOperation) -> None:
+        reports.append(operation.describe())
+
+    async def start_during_timeout() -> tuple:
+        started = time.monotonic()
+        (first,) = await asyncio.gather(lifecycle.start("task.fpl", progress=progress), return_exceptions=True)
+        failed_after = time.monotonic() - started  # timed out, the step is still running
+        (second,) = await asyncio.gather(lifecycle.start("task.fpl"), return_exceptions=True)
+        return first, failed_after, second
+
+    first, failed_after, second = asyncio.run(start_during_timeout())
+
+    assert isinstance(first, LifecycleError) and str(first) == "launching: timed out after 0.05 s"
+    assert failed_after < 0.2  # at the step timeout, without waiting for the step to return
+    assert "⌛ launching" in reports[-1]
+    # queued until the step returned: the server it launched is seen running, not launched again
+    assert isinstance(second, LifecycleError) and "already running" in str(second)
+    assert counter.launches == 1
+
+
+def test_cancelled_step_keeps_server_busy(workers_config):
+    counter = StepCounter()
+    lifecycles = [create_lifecycle(SlowLaunchBackend(0.2, counter, "host_ini"), conflicts="queue") for _ in range(2)]
+
+    async def cancel_during_step() -> tuple:
+        first = asyncio.create_task(lifecycles[0].start("task.fpl"))
+        await asyncio.sleep(0.05)  # launching
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        busy = lifecycles[0]._lock.locked(), _exclusive_lock("host_ini").locked()
+        results = await asyncio.gather(
+            lifecycles[0].start("task.fpl"), lifecycles[1].start("task.fpl"), return_exceptions=True
+        )
+        return first, busy, *results
+
+    first, busy, second, other_server = asyncio.run(cancel_during_step())
+
+    assert first.cancelled()
+    assert busy == (True, True)  # until the launch step returns
+    assert isinstance(second, LifecycleError) and "already running" in str(second)
+    assert isinstance(other_server, LifecycleOperation)
+    assert counter.max_running == 1 and counter.launches == 2
+
+
+@pytest.mark.parametrize("exclusive, max_running", [(None, 2), ("host_ini", 1)])
+def test_exclusive_steps(workers_config, exclusive, max_running):
+    counter = StepCounter()
+    lifecycles = [create_lifecycle(SlowLaunchBackend(0.1, counter, exclusive)) for _ in range(2)]
+
+    async def start_all() -> None:
+        await asyncio.gather(*(lifecycle.start("task.fpl") for lifecycle in lifecycles))
+
+    asyncio.run(start_all())
+
+    assert counter.launches == 2 and counter.max_running == max_running
@@ -0,0 +1,85 @@
+import os
+
+from services.preview_cache import PreviewCache, preview_key
+from services.preview_encoding import EncodeOptions
+
+
+def test_preview_cache_hit_and_miss(tmp_path):
+    cache = PreviewCache(str(tmp_path), memory_budget=100, disk_budget=1000)
+
+    assert cache.get("a") is None
+    cache.put("a", b"0123456789")
+    assert cache.get("a") == b"0123456789"
+
+    stats = cache.stats()
+    assert stats.hits == 1
+    assert stats.misses == 1
+    assert stats.hit_ratio == 0.5
+    assert stats.memory_bytes == 10
+    assert stats.disk_bytes == 10
+
+
+def test_preview_cache_memory_budget(tmp_path):
+    cache = PreviewCache(str(tmp_path), memory_budget=25, disk_budget=1000)
+
+    cache.put("a", b"a" * 10)
+    cache.put("b", b"b" * 10)
+    cache.get("a")  # "b" is now the least recently used
+    cache.put("c", b"c" * 10)
+
+    stats = cache.stats()
+    assert stats.memory_entries == 2
+    assert stats.memory_bytes == 20
+    assert stats.disk_entries == 3
+
+    # still available from the disk cache
+    assert cache.get("b") == b"b" * 10
+
+
+def test_preview_cache_disk_budget(tmp_path):
+    cache = PreviewCache(str(tmp_path), memory_budget=0, disk_budget=25)
+
+    cache.put("a", b"a" * 10)
+    cache.put("b", b"b" * 10)
+    cache.put("c", b"c" * 10)
+
+    assert cache.stats().disk_bytes == 20
+    assert not os.path.exists(tmp_path / "a.png")
+    assert cache.get("a") is None
+
+
+def test_preview_cache_reloaded_from_disk(tmp_path):
+    PreviewCache(str(tmp_path), memory_budget=100, disk_budget=1000).put("a", b"0123456789")
+
+    cache = PreviewCache(str(tmp_path), memory_budget=100, disk_budget=1000)
+
+    assert cache.stats().disk_bytes == 10
+    assert cache.get("a") == b"0123456789"
+
+
+def test_preview_cache_file_extension(tmp_path):
+    jpeg = b"\xff\xd8" + b"0" * 8
+    cache = PreviewCache(str(tmp_path), memory_budget=0, disk_budget=1000)
+    cache.put("a", jpeg)
+
+    assert os.listdir(tmp_path) == ["a.jpg"]
+    assert PreviewCache(str(tmp_path), memory_budget=0, disk_budget=1000).get("a") == jpeg
+
+    cache.put("a", b"png")
+    assert os.listdir(tmp_path) == ["a.png"]
+
+
+def test_preview_key(tmp_path):
+    landscape = tmp_path / "landscape.bmp"
+    landscape.write_bytes(b"BM")
+
+    options = EncodeOptions()
+    key = preview_key("hash", str(landscape), 1024, options)
+
+    assert key == preview_key("hash", str(landscape), 1024, options)
+    assert key != preview_key("other hash", str(landscape), 1024, options)
+    assert key != preview_key("hash", str(landscape), 512, options)
+    assert key != preview_key("hash", str(landscape), 1024, EncodeOptions(max_bytes=100_000))
+
+    os.utime(landscape, ns=(0, 0))
+    assert key != preview_key("hash", str(landscape), 1024, options)
@@ -0,0 +1,63 @@
+from io import BytesIO
+
+import pytest
+from PIL import Image, ImageDraw
+
+from services.preview_encoding import EncodeOptions, encode_image, encode_preview, fit_image, image_extension
+
+
+def make_preview(size: tuple[int, int] = (800, 600)) -> Image.Image:
+    # noisy like a landscape texture, with a task drawn on it
+    image = Image.merge("RGB", [Image.effect_noise(size, sigma) for sigma in (40, 60, 80)])
+    ImageDraw.Draw(image).line([(50, 50), (700, 300), (200, 550)], width=5, fill=(255, 0, 0))
+    return image
+
+
+def test_fit_image():
+    image = make_preview((800, 600))
+
+    assert fit_image(image, 400, 0).size == (400, 300)
+    assert fit_image(image, 1000, 300).size == (400, 300)
+    assert fit_image(image, 0, 0) is image
+
+
+def test_first_format_within_budget():
+    preview = encode_preview(make_preview(), EncodeOptions(max_width=1024, max_height=1024))
+
+    assert (preview.format, preview.size, preview.attempts) == ("png", (800, 600), 1)
+    assert preview.within_budget and preview.encode_seconds > 0
+    assert Image.open(BytesIO(preview.data)).size == (800, 600)
+
+
+def test_byte_budget():
+    image = make_preview()
+    png_bytes = len(encode_image(image, "png"))
+
+    preview = encode_preview(image, EncodeOptions(max_bytes=png_bytes // 4, formats=("png", "png8", "jpeg")))
+
+    assert preview.within_budget and len(preview.data) <= png_bytes // 4
+    assert preview.format in ("png8", "jpeg")
+    assert preview.extension == image_extension(preview.data)
+
+
+def test_budget_out_of_reach():
+    preview = encode_preview(make_preview(), EncodeOptions(max_bytes=100, formats=("jpeg",)))
+
+    assert not preview.within_budget
+    assert preview.format == "jpeg" and preview.quality == 45
+    assert max(preview.size) < 800  # downscaled as far as allowed
+    assert "over budget" in preview.describe()
+
+
+@pytest.mark.parametrize("fmt, extension", [("png", "png"), ("png8", "png"), ("jpeg", "jpg"), ("webp", "webp")])
+def test_image_extension(fmt, extension):
+    assert image_extension(encode_image(make_preview((64, 64)), fmt, quality=80)) == extension
+
+
+def test_lossless_budget_out_of_reach():
+    image = Image.effect_noise((1024, 1024), 80).convert("RGB")
+
+    preview = encode_preview(image, EncodeOptions(max_bytes=10000, formats=("png",)))
+
+    assert not preview.within_budget and preview.format == "png"
+    assert max(preview.size) < 1024 and preview.attempts >= 1
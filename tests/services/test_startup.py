@@ -0,0 +1,43 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from discord import Client, Intents, Interaction, app_commands
+
+from services.startup import StartupTimer, command_tree_hash, sync_command_tree
+
+
+def make_tree(description: str = "Ping") -> app_commands.CommandTree:
+    tree = app_commands.CommandTree(Client(intents=Intents.none()))
+
+    @tree.command(name="condor-ping", description=description)
+    async def ping(interaction: Interaction): ...
+
+    return tree
+
+
+def test_command_tree_hash():
+    assert command_tree_hash(make_tree(), 1) == command_tree_hash(make_tree(), 1)
+    assert command_tree_hash(make_tree(), 1) != command_tree_hash(make_tree("Pong"), 1)
+    assert command_tree_hash(make_tree(), 1) != command_tree_hash(make_tree(), 2)
+
+
+def test_sync_only_when_changed(tmp_path):
+    tree = make_tree()
+
+    async def sync_twice() -> list[bool]:
+        with patch.object(tree, "sync", new_callable=AsyncMock) as mock_sync:
+            results = [await sync_command_tree(tree, 1, str(tmp_path)) for _ in range(2)]
+            assert mock_sync.await_count == 1
+        return results
+
+    assert asyncio.run(sync_twice()) == [True, False]
+
+
+def test_startup_timer():
+    timer = StartupTimer(started=0.0)
+    timer.step("imports")
+    timer.report()
+
+    assert timer.ready
+    assert [name for name, _ in timer.steps] == ["imports"]
+    assert timer.total == timer.steps[0][1]
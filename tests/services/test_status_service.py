@@ -0,0 +1,158 @@
+import asyncio
+import shutil
+import time
+from unittest.mock import patch
+
+import pytest
+
+from condor.config import CondorServerConfig, SimulatedServerConfig
+from condor.server_log import get_log_status_source
+from condor.server_manager import OnlineStatus, ServerStatus, _create_backend, get_backend
+from services.history import get_history
+from services.status_service import StatusService, _create_status_service, get_all_statuses
+
+
+class FakeServer:
+    def __init__(self, duration: float = 0.05):
+        self.duration = duration
+        self.calls = 0
+
+    def fetch(self) -> ServerStatus:
+        self.calls += 1
+        time.sleep(self.duration)
+        return ServerStatus(players=[f"player {self.calls}"])
+
+
+def test_concurrent_readers_share_one_refresh(workers_config):
+    server = FakeServer()
+    service = StatusService(server.fetch, poll_interval=60, max_age_ms=1000)
+
+    async def readers():
+        return await asyncio.gather(*[service.get_status() for _ in range(20)])
+
+    statuses = asyncio.run(readers())
+
+    assert server.calls == 1
+    assert all(status.players == ["player 1"] for status in statuses)
+
+
+def test_cached_status(workers_config):
+    server = FakeServer(duration=0)
+    service = StatusService(server.fetch, poll_interval=60, max_age_ms=1000)
+
+    async def scenario():
+        await service.get_status()
+        await service.get_status()
+        await service.get_status(max_age_ms=0)
+        await service.get_status(force=True)
+        service.invalidate()
+        await service.get_status()
+
+    asyncio.run(scenario())
+
+    assert server.calls == 4
+    assert service.snapshot.status.players == ["player 4"]
+    assert service.snapshot.age_ms < 1000
+
+
+def test_invalidate_during_refresh(workers_config):
+    server = FakeServer()
+    statuses: list[ServerStatus] = []
+    service = StatusService(server.fetch, poll_interval=60, max_age_ms=1000, on_status=statuses.append)
+
+    async def scenario():
+        refresh = asyncio.create_task(service.refresh())
+        await asyncio.sleep(0.01)  # read in progress
+        service.invalidate()
+        stale = await refresh
+        return stale, await service.get_status()
+
+    stale, status = asyncio.run(scenario())
+
+    assert stale.status.players == ["player 1"]
+    assert status.players == ["player 2"]
+    assert server.calls == 2
+    assert statuses == [status]
+    assert service.snapshot.status is status
+
+
+def test_polling(workers_config):
+    server = FakeServer(duration=0)
+    service = StatusService(server.fetch, poll_interval=0.01, max_age_ms=1000)
+
+    async def scenario():
+        service.start()
+        await asyncio.sleep(0.1)
+        await service.stop()
+
+    asyncio.run(scenario())
+
+    assert server.calls > 3
+
+
+def test_refresh_error(workers_config):
+    def fetch():
+        raise RuntimeError("server window not found")
+
+    service = StatusService(fetch, poll_interval=60, max_age_ms=1000)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(service.get_status())
+    assert service.snapshot is None
+
+
+def test_all_statuses(workers_config):
+    workers_config.server_backend = "simulated"
+    workers_config.simulated_server = SimulatedServerConfig(status_latency_ms=50, serialize_calls=False)
+    workers_config.condor_servers = [CondorServerConfig(name="race"), CondorServerConfig(name="training")]
+
+    with (
+        patch("condor.server_manager.get_config", return_value=workers_config),
+        patch("services.status_service.get_config", return_value=workers_config),
+        patch("services.history.get_config", return_value=workers_config),
+    ):
+        try:
+            get_backend("training").start("test.fpl")
+
+            started = time.monotonic()
+            statuses = asyncio.run(get_all_statuses())
+            elapsed = time.monotonic() - started
+        finally:
+            _create_backend.cache_clear()
+            _create_status_service.cache_clear()
+            get_history.cache_clear()
+
+    assert list(statuses) == ["race", "training"]
+    assert statuses["race"].online_status == OnlineStatus.OFFLINE
+    assert statuses["training"].online_status == OnlineStatus.NOT_RUNNING
+    assert elapsed < 0.09  # read concurrently
+
+
+def test_status_from_log(workers_config, tmp_path):
+    workers_config.server_backend = "simulated"
+    workers_config.simulated_server = SimulatedServerConfig(status_latency_ms=0, start_latency_ms=0)
+    workers_config.condor_path = str(tmp_path)
+    workers_config.status.source = "log"
+    (tmp_path / "Logs").mkdir()
+    shutil.copy("tests/files/server.log", tmp_path / "Logs" / "DedicatedServer.log")
+
+    with (
+        patch("condor.server_manager.get_config", return_value=workers_config),
+        patch("condor.server_log.get_config", return_value=workers_config),
+        patch("services.status_service.get_config", return_value=workers_config),
+        patch("services.history.get_config", return_value=workers_config),
+    ):
+        try:
+            service = _create_status_service("default")
+            offline = asyncio.run(service.get_status())
+            get_backend().start("test.fpl")
+            status = asyncio.run(service.get_status(force=True))
+        finally:
+            _create_backend.cache_clear()
+            _create_status_service.cache_clear()
+            get_history.cache_clear()
+            get_log_status_source.cache_clear()
+
+    assert offline.online_status == OnlineStatus.OFFLINE
+    assert status.online_status == OnlineStatus.RACE_IN_PROGRESS
+    assert status.players == ["Jean DUPONT (JD)"]
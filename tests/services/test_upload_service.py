@@ -0,0 +1,129 @@
+import asyncio
+import io
+import os
+import zipfile
+from unittest.mock import patch
+
+import pytest
+
+from condor.catalog import FlightPlanCatalog
+from condor.config import UploadConfig
+from condor.flight_plan_store import FlightPlanStore
+from services.upload_service import UploadError, check_flight_plan_filename, extract_archive, process_upload
+
+with open("tests/files/test.fpl", "rb") as file:
+    FLIGHT_PLAN = file.read()
+
+
+class FakeAttachment:
+    def __init__(self, filename: str, data: bytes):
+        self.filename = filename
+        self.data = data
+        self.size = len(data)
+
+    async def read(self) -> bytes:
+        return self.data
+
+
+def make_zip(files: dict[str, bytes]) -> bytes:
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return data.getvalue()
+
+
+@pytest.fixture
+def library(tmp_path, workers_config):
+    workers_config.flight_plans_path = str(tmp_path / "library")
+    workers_config.upload = UploadConfig(max_file_bytes=64 * 1024, max_archive_bytes=256 * 1024, max_files=10)
+    os.makedirs(workers_config.flight_plans_path)
+    catalog = FlightPlanCatalog(workers_config.flight_plans_path, str(tmp_path / "catalog.json"))
+
+    with (
+        patch("services.upload_service.get_config", return_value=workers_config),
+        patch("services.upload_service.get_catalog", return_value=catalog),
+        patch("services.upload_service.get_flight_plan_store", return_value=FlightPlanStore(catalog.flight_plans_path)),
+    ):
+        yield catalog
+
+
+def test_check_flight_plan_filename():
+    assert check_flight_plan_filename("tasks/2024\\Task.fpl") == "Task.fpl"
+
+    for filename in ("task.txt", ".fpl", ".hidden.fpl"):
+        with pytest.raises(UploadError):
+            check_flight_plan_filename(filename)
+
+
+def test_extract_archive_limits():
+    limits = UploadConfig(max_file_bytes=64 * 1024, max_archive_bytes=100 * 1024, max_files=2)
+    archive = make_zip({"a.fpl": FLIGHT_PLAN, "folder/b.fpl": FLIGHT_PLAN, "readme.txt": b"hello"})
+
+    assert [name for name, _ in extract_archive("tasks.zip", archive, limits)] == ["a.fpl", "folder/b.fpl"]
+
+    with pytest.raises(UploadError, match="contains 3 flight plans"):
+        extract_archive("tasks.zip", make_zip({f"{i}.fpl": FLIGHT_PLAN for i in range(3)}), limits)
+
+    # highly compressible content, checked on its uncompressed size
+    with pytest.raises(UploadError, match="too large once uncompressed"):
+        extract_archive("bomb.zip", make_zip({"a.fpl": b" " * 101 * 1024}), limits)
+
+    with pytest.raises(UploadError, match="not a valid zip"):
+        extract_archive("broken.zip", b"not a zip", limits)
+
+
+def test_upload_batch(library):
+    attachments = [
+        FakeAttachment("single.fpl", FLIGHT_PLAN),
+        FakeAttachment("broken.fpl", b"no section"),
+        FakeAttachment("tasks.zip", make_zip({"a.fpl": FLIGHT_PLAN, "b.fpl": FLIGHT_PLAN})),
+        FakeAttachment("image.png", b"ignored"),
+    ]
+
+    report = asyncio.run(process_upload(attachments))
+
+    assert sorted(fp.filename for fp in report.accepted) == ["a.fpl", "b.fpl", "single.fpl"]
+    assert [filename for filename, _ in report.rejected] == ["broken.fpl"]
+    assert sorted(os.listdir(library.flight_plans_path)) == [".store", "a.fpl", "b.fpl", "single.fpl"]
+    assert library.get("a.fpl").landscape == "Slovenia3"
+
+
+def test_upload_limits(library):
+    attachments = [FakeAttachment(f"{i}.fpl", FLIGHT_PLAN) for i in range(11)]
+    attachments.append(FakeAttachment("huge.fpl", FLIGHT_PLAN * 20))
+
+    report = asyncio.run(process_upload(attachments))
+
+    assert report.accepted == []
+    assert len(report.rejected) == 2
+    assert os.listdir(library.flight_plans_path) == []
+
+
+def test_upload_duplicates(library):
+    asyncio.run(process_upload([FakeAttachment("task.fpl", FLIGHT_PLAN)]))
+    sha256 = library.get("task.fpl").sha256
+
+    with patch("condor.catalog.parse_flight_plan_header") as mock_parse:
+        report = asyncio.run(
+            process_upload([FakeAttachment("task.fpl", FLIGHT_PLAN), FakeAttachment("renamed.fpl", FLIGHT_PLAN)])
+        )
+        mock_parse.assert_not_called()
+
+    assert report.unchanged == ["task.fpl"]
+    assert [fp.filename for fp in report.accepted] == ["renamed.fpl"]
+    assert report.duplicates == {"renamed.fpl": ["task.fpl"]}
+    assert library.aliases(sha256) == ["renamed.fpl", "task.fpl"]
+
+    # new content under both names: the first content isn't used anymore
+    with open("tests/files/test2.fpl", "rb") as file:
+        new_content = file.read()
+    with patch.object(library, "save", wraps=library.save) as mock_save:
+        report = asyncio.run(
+            process_upload([FakeAttachment(name, new_content) for name in ("task.fpl", "renamed.fpl")])
+        )
+        mock_save.assert_called_once()  # one catalog write for the upload
+
+    assert report.duplicates == {"renamed.fpl": ["task.fpl"]}
+    assert library.aliases(sha256) == []
+    assert not os.path.exists(os.path.join(library.flight_plans_path, ".store", sha256[:2], f"{sha256}.fpl"))
@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+from PIL import Image, ImageFilter
+
+from services.workers import run_io, run_render
+
+
+def large_render() -> bytes:
+    image = Image.linear_gradient("L").resize((3000, 3000)).filter(ImageFilter.GaussianBlur(30))
+    return image.tobytes()[:16]
+
+
+def busy_loop(duration: float) -> None:
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        pass
+
+
+async def max_loop_lag(coroutine) -> tuple[float, float]:
+    """Run the coroutine while measuring how late a 10ms ticker is woken up"""
+    max_lag = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal max_lag
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            max_lag = max(max_lag, time.perf_counter() - start - 0.01)
+
+    ticker_task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await coroutine
+    duration = time.perf_counter() - start
+    done = True
+    await ticker_task
+
+    return duration, max_lag
+
+
+def test_event_loop_responsive_during_large_render(workers_config):
+    duration, max_lag = asyncio.run(max_loop_lag(run_render(large_render)))
+
+    assert duration > 0.1
+    assert max_lag < 0.1
+
+
+def test_run_io(workers_config):
+    assert asyncio.run(run_io(sum, [1, 2, 3])) == 6
+
+    duration, max_lag = asyncio.run(max_loop_lag(run_io(busy_loop, 0.3)))
+    assert duration >= 0.3
+    assert max_lag < 0.1
+
+
+def test_run_render_bounded(workers_config):
+    async def concurrent_renders():
+        start = time.perf_counter()
+        await asyncio.gather(run_render(time.sleep, 0.2), run_render(time.sleep, 0.2))
+        return time.perf_counter() - start
+
+    # only one render at a time
+    assert asyncio.run(concurrent_renders()) >= 0.4